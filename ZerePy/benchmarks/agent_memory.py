@@ -0,0 +1,89 @@
+"""Memory cost of hosting agents in one process.
+
+Loads the same agent file N times through each construction path in a fresh
+interpreter and reports the traced allocations retained per agent: the
+headless factory used by server2, and a full ZerePyCLI per agent as server2
+used to do.
+
+    python benchmarks/agent_memory.py --agent <name> --count 100
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PATHS = {
+    "headless": """
+from src.agent import load_agent_from_file
+def build(name):
+    return load_agent_from_file(name)
+""",
+    "cli": """
+from src.cli import ZerePyCLI
+def build(name):
+    cli = ZerePyCLI()
+    cli._load_agent_from_file(name)
+    return cli
+""",
+}
+
+PROBE = """
+import gc, json, tracemalloc
+{setup}
+build({agent!r})  # warm imports and module level caches
+gc.collect()
+tracemalloc.start()
+before = tracemalloc.take_snapshot()
+agents = [build({agent!r}) for _ in range({count})]
+gc.collect()
+after = tracemalloc.take_snapshot()
+retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+print(json.dumps({{"bytes_per_agent": retained / {count}}}))
+"""
+
+
+def measure(path: str, agent: str, count: int) -> float:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            PROBE.format(setup=PATHS[path], agent=agent, count=count),
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Building agents via {path} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])["bytes_per_agent"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--agent", required=True, help="Name of an agent file in agents/"
+    )
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {
+        path: measure(path, args.agent, args.count) for path in PATHS
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for path, per_agent in results.items():
+        print(f"{path:10} {per_agent / 1024:10.1f} KiB per agent")
+    if results["headless"]:
+        print(f"ratio      {results['cli'] / results['headless']:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
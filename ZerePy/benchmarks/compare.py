@@ -0,0 +1,80 @@
+"""Compare two end-to-end benchmark results, e.g. before and after a change.
+
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Prints every latency and throughput metric both runs share with the relative
+change. With --max-regression, exits non-zero when a latency grew or a
+throughput dropped by more than that fraction.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Metrics where a larger value is better, every other one is a latency
+HIGHER_IS_BETTER = ("requests_per_second", "iterations_per_second", "agents_per_core")
+COMPARED = ("p50_ms", "p99_ms", "cpu_ms_per_iteration") + HIGHER_IS_BETTER
+
+
+def metrics(results: dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Flatten the compared metrics of a result file into (path, value)"""
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from metrics(value, path)
+        elif key in COMPARED and isinstance(value, (int, float)):
+            yield path, float(value)
+
+
+def compare(old: dict, new: dict) -> Dict[str, Tuple[float, float, float]]:
+    """path -> (old, new, regression), regression > 0 means worse"""
+    old_metrics = dict(metrics(old))
+    changes = {}
+    for path, new_value in metrics(new):
+        old_value = old_metrics.get(path)
+        if not old_value:
+            continue
+        change = (new_value - old_value) / old_value
+        regression = -change if path.endswith(HIGHER_IS_BETTER) else change
+        changes[path] = (old_value, new_value, regression)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="Fail when a metric regressed by more than this fraction, e.g. 0.1",
+    )
+    args = parser.parse_args()
+
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+    print(f"old {old['meta']['commit'][:12]}  new {new['meta']['commit'][:12]}")
+    if old["meta"]["params"] != new["meta"]["params"]:
+        print("warning: the runs used different parameters")
+
+    changes = compare(old, new)
+    for path, (old_value, new_value, regression) in changes.items():
+        marker = "worse" if regression > 0 else "better"
+        print(f"{path:52} {old_value:10.2f} -> {new_value:10.2f}  {abs(regression):6.1%} {marker}")
+
+    if args.max_regression is not None:
+        regressed = [
+            path for path, (_, _, regression) in changes.items() if regression > args.max_regression
+        ]
+        if regressed:
+            print(f"Regressed by more than {args.max_regression:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""End-to-end benchmark of agent loops and server2 against local stand-ins.
+
+The LLM is a fake OpenAI-compatible server returning scripted strategy tool
+calls, Sonic RPC is an in-process EVM (eth-tester) and Mongo is in memory, so
+runs are repeatable and need no credentials or network.
+
+- loop: N agents run M iterations each concurrently. Reports p50/p99 per
+  stage (read inputs, decide, execute, record) and agents per core, the loop
+  delay divided by the CPU an iteration costs outside the local chain.
+- server: drives server2 endpoints in process and reports p50/p99 and
+  requests per second per endpoint.
+
+Results are written to benchmarks/results/<commit>.json, compare two runs
+with benchmarks/compare.py.
+
+    pip install mongomock mongomock-motor "eth-tester[py-evm]"
+    python benchmarks/e2e.py all --agents 50 --iterations 5 --llm-latency 0.2
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from benchmarks.fakes import FakeOpenAIServer, install_memory_mongo, local_chain, new_address
+
+STRATEGIES = {
+    "swap_to_single": ["Consolidate into one token when the trend is clear"],
+    "swap_to_many": ["Spread out of a token that turns volatile"],
+    "adjust_split_ratio": ["Rebalance the split when weights drift"],
+    "none": ["Hold when nothing changed"],
+}
+
+
+def agent_dict(strategy_address: str, loop_delay: int, decision_policy: str) -> Dict[str, Any]:
+    return {
+        "name": f"bench-{strategy_address[-6:].lower()}",
+        "state": "deployed",
+        "bio": ["You manage a two token vault on Sonic."],
+        "traits": ["Patient", "Risk aware"],
+        "examples": [],
+        "example_accounts": [],
+        "example_channels": [],
+        "loop_delay": loop_delay,
+        "config": [
+            {"name": "openai", "model": "gpt-4o-mini"},
+            {"name": "sonic", "network": "testnet"},
+        ],
+        "tasks": [],
+        "use_time_based_weights": False,
+        "time_based_multipliers": {},
+        "tokens": [],
+        "minimum_deposit": 0,
+        "visibility": "public",
+        "fork_cost": 0,
+        "strategy_address": strategy_address,
+        "creator": "0x000000000000000000000000000000000000bE4c",
+        "strategies": STRATEGIES,
+        "decision_cache": {"policy": decision_policy},
+    }
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Count, p50, p99 and mean of durations in seconds, reported in ms"""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p99_ms": None, "mean_ms": None}
+    ordered = sorted(samples)
+
+    def quantile(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": quantile(0.5),
+        "p99_ms": quantile(0.99),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+    }
+
+
+class StageTimer:
+    """Wall time samples per stage, fed by wrapped callables"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage, fn):
+        """Time calls of `fn`, `stage` may be a function of the call's kwargs"""
+        name = stage if callable(stage) else (lambda **_: stage)
+
+        if inspect.iscoroutinefunction(fn):
+
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.samples[name(**kwargs)].append(time.perf_counter() - started)
+
+            return timed_async
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.samples[name(**kwargs)].append(time.perf_counter() - started)
+
+        return timed
+
+    def reset(self) -> None:
+        self.samples.clear()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: summarize(samples) for stage, samples in sorted(self.samples.items())}
+
+
+def build_agents(count: int, web3, loop_delay: int, decision_policy: str) -> List[Any]:
+    from src.agent import ZerePyAgent
+
+    agents = []
+    for _ in range(count):
+        agent = ZerePyAgent()
+        agent.init(agent_dict(new_address(web3), loop_delay, decision_policy))
+        attach_chain(agent, web3)
+        agent._setup_llm_provider()
+        agents.append(agent)
+    return agents
+
+
+def attach_chain(agent, web3) -> None:
+    """Use the local chain as the agent's Sonic RPC, before it is first used"""
+    agent.connection_manager.connections["sonic"]._web3 = web3
+
+
+async def bench_loop(args, web3, provider) -> Dict[str, Any]:
+    import src.agent
+    from src.database.activity_writer import ActivityWriter
+    from src.helpers.llm_batch import DecisionBatcher
+    from src.helpers.llm_scheduler import LLMScheduler
+
+    agents = await asyncio.to_thread(
+        build_agents, args.agents, web3, args.loop_delay, args.decision_cache
+    )
+
+    timer = StageTimer()
+    for agent in agents:
+        agent._read_inputs = timer.wrap("read_inputs", agent._read_inputs)
+        agent.perform_strategy_async = timer.wrap("decide", agent.perform_strategy_async)
+    src.agent.execute_action_async = timer.wrap(
+        lambda action_name, **_: f"execute:{action_name}", src.agent.execute_action_async
+    )
+    writer = ActivityWriter.instance()
+    writer.write = timer.wrap("record", writer.write)
+
+    errors = 0
+
+    async def drive(agent, iterations: int):
+        nonlocal errors
+        for _ in range(iterations):
+            started = time.perf_counter()
+            try:
+                await agent.run_iteration()
+            except Exception as e:
+                errors += 1
+                logging.getLogger("benchmarks.e2e").warning(f"Iteration failed: {e}")
+                continue
+            timer.samples["iteration"].append(time.perf_counter() - started)
+
+    # One untimed iteration per agent warms clients, caches and the chain
+    await asyncio.gather(*(drive(agent, 1) for agent in agents))
+    timer.reset()
+    errors = 0
+
+    cpu_started = time.process_time()
+    chain_cpu_started = provider.cpu_seconds
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(drive(agent, args.iterations) for agent in agents))
+    wall = time.perf_counter() - wall_started
+    chain_cpu = provider.cpu_seconds - chain_cpu_started
+    cpu = time.process_time() - cpu_started - chain_cpu
+
+    iterations = len(timer.samples["iteration"])
+    cpu_per_iteration = cpu / iterations if iterations else None
+    return {
+        "stages": timer.report(),
+        "iterations": iterations,
+        "errors": errors,
+        "wall_seconds": wall,
+        "iterations_per_second": iterations / wall if wall else None,
+        "cpu_ms_per_iteration": cpu_per_iteration * 1000 if cpu_per_iteration else None,
+        "chain_cpu_ms_per_iteration": chain_cpu / iterations * 1000 if iterations else None,
+        # Agents one core keeps on schedule at the configured loop delay
+        "agents_per_core": args.loop_delay / cpu_per_iteration if cpu_per_iteration else None,
+        "llm_scheduler": LLMScheduler.instance().stats(),
+        "decision_batches": DecisionBatcher.for_loop().stats(),
+    }
+
+
+async def bench_server(args, web3) -> Dict[str, Any]:
+    import httpx
+    from src.agent import mongo_db
+    from src.server2.app import ZerePyServer
+
+    addresses = [new_address(web3) for _ in range(args.agents)]
+    mongo_db.sync_db["agents"].insert_many(
+        [agent_dict(address, args.loop_delay, args.decision_cache) for address in addresses]
+    )
+    now = int(time.time() * 1000)
+    mongo_db.sync_db["activities"].insert_many(
+        [
+            {
+                "initiator": address,
+                "action": "adjust-split-ratio",
+                "timestamp": now - i * 1000,
+                "tx_hash": f"0x{i:064x}",
+            }
+            for address in addresses
+            for i in range(args.activities)
+        ]
+    )
+
+    server = ZerePyServer()
+    for address in addresses:
+        await server.state.load_agent(address, database=True)
+        # Before yielding, so the background warm-up already sees the local chain
+        agent = server.state.get_agent(address).agent
+        attach_chain(agent, web3)
+        await asyncio.to_thread(agent._setup_llm_provider)
+
+    endpoints = {
+        "list_agents": lambda client, address: client.get(
+            "/agents", params={"visibility": "public", "database": True}
+        ),
+        "get_agent": lambda client, address: client.get(
+            f"/agents/{address}", params={"database": True}
+        ),
+        "activities_page": lambda client, address: client.get(
+            "/activities/page", params={"initiator": address}
+        ),
+        "chat": lambda client, address: client.post(
+            f"/agents/{address}/chat",
+            params={"user": "0xbench"},
+            json={"prompt": "How is the vault doing?"},
+        ),
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, request in endpoints.items():
+            limiter = asyncio.Semaphore(args.concurrency)
+            samples: List[float] = []
+            errors = 0
+
+            async def one(i: int):
+                nonlocal errors
+                async with limiter:
+                    started = time.perf_counter()
+                    response = await request(client, addresses[i % len(addresses)])
+                    samples.append(time.perf_counter() - started)
+                    if response.status_code >= 400:
+                        errors += 1
+
+            await one(0)  # warm caches, untimed
+            samples.clear()
+            errors = 0
+
+            wall_started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.requests)))
+            wall = time.perf_counter() - wall_started
+
+            results[name] = {
+                **summarize(samples),
+                "errors": errors,
+                "requests_per_second": len(samples) / wall if wall else None,
+            }
+
+    await server.state.shutdown()
+    return results
+
+
+def metadata(args) -> Dict[str, Any]:
+    def git(*command):
+        result = subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    return {
+        "commit": git("rev-parse", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--", "src")),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            key: value for key, value in vars(args).items() if key not in ("output", "json")
+        },
+    }
+
+
+def result_path(meta: Dict[str, Any]) -> Path:
+    name = meta["commit"][:12] + ("-dirty" if meta["dirty"] else "")
+    return RESULTS_DIR / f"{name}.json"
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    if loop := results.get("loop"):
+        print(f"loop: {loop['iterations']} iterations, {loop['errors']} errors")
+        for stage, stats in loop["stages"].items():
+            if stats["count"]:
+                print(
+                    f"  {stage:28} p50 {stats['p50_ms']:9.1f} ms  "
+                    f"p99 {stats['p99_ms']:9.1f} ms  n={stats['count']}"
+                )
+        if loop["agents_per_core"]:
+            print(
+                f"  cpu per iteration {loop['cpu_ms_per_iteration']:.2f} ms, "
+                f"{loop['agents_per_core']:.0f} agents per core "
+                f"at a {results['meta']['params']['loop_delay']}s loop delay"
+            )
+
+    if server := results.get("server"):
+        print("server:")
+        for name, stats in server.items():
+            print(
+                f"  {name:28} p50 {stats['p50_ms']:9.1f} ms  p99 {stats['p99_ms']:9.1f} ms  "
+                f"{stats['requests_per_second']:8.1f} req/s  {stats['errors']} errors"
+            )
+
+
+async def run(args) -> Dict[str, Any]:
+    web3, provider, _ = local_chain()
+    results = {}
+    if args.mode in ("loop", "all"):
+        results["loop"] = await bench_loop(args, web3, provider)
+    if args.mode in ("server", "all"):
+        results["server"] = await bench_server(args, web3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=["loop", "server", "all"], nargs="?", default="all")
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=5, help="Timed iterations per agent")
+    parser.add_argument("--loop-delay", type=int, default=60, help="Agents' loop delay in seconds")
+    parser.add_argument(
+        "--decision-cache",
+        default="always_call",
+        help="Decision cache policy, always_call measures every decision",
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per server endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent server requests")
+    parser.add_argument("--activities", type=int, default=50, help="Seeded activities per agent")
+    parser.add_argument("--output", type=Path, default=None, help="Result file, defaults to results/<commit>.json")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    # Agent and connection logs would dominate the measured time
+    logging.disable(logging.INFO)
+
+    install_memory_mongo()
+    with FakeOpenAIServer(latency=args.llm_latency) as llm:
+        llm.install()
+        results = {"meta": metadata(args), **asyncio.run(run(args))}
+
+    output = args.output or result_path(results["meta"])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, default=str))
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+    else:
+        print_report(results)
+        print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
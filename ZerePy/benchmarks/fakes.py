@@ -0,0 +1,248 @@
+"""Local stand-ins for the services an agent talks to, used by the benchmarks.
+
+- FakeOpenAIServer: an OpenAI-compatible HTTP server answering chat
+  completions with scripted strategy tool calls, with configurable latency.
+- local_chain: an in-process EVM (eth-tester) with a funded account, used as
+  the Sonic connection's web3 so strategy transactions are really signed,
+  estimated and mined.
+- install_memory_mongo: an in-memory Mongo behind MONGO_URL.
+
+Needs the bench-only packages: mongomock, mongomock-motor, eth-tester[py-evm]
+and httpx (already pulled in by the OpenAI SDK).
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Default decisions handed out in turn: a no-op and a rebalance, so both the
+# cheap path and the on-chain path of an iteration are exercised
+DEFAULT_SCRIPT: List[Tuple[str, Dict[str, Any]]] = [
+    ("none", {"message": "Market is flat, holding"}),
+    ("adjust-split-ratio", {"ratio": [6000, 4000]}),
+]
+
+MEMORY_MONGO_URL = "mongodb://bench-memory"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(
+                200,
+                {
+                    "object": "list",
+                    "data": [
+                        {"id": "bench", "object": "model", "created": 0, "owned_by": "bench"}
+                    ],
+                },
+            )
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        time.sleep(self.server.latency)
+        self._send(200, self.server.completion(request))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float, script: List[Tuple[str, Dict[str, Any]]]):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self._script = itertools.cycle(script)
+        self._lock = threading.Lock()
+
+    def completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request.get("tools"):
+            with self._lock:
+                name, arguments = next(self._script)
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(arguments)},
+                    }
+                ],
+            }
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "gm, the vault is doing fine."}
+            finish_reason = "stop"
+
+        prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "bench"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": 16,
+                "total_tokens": prompt_tokens + 16,
+            },
+        }
+
+
+def _serve(port, latency, script, ready) -> None:
+    server = _Server(("127.0.0.1", port), latency, script)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeOpenAIServer:
+    """OpenAI-compatible server in a child process, so its CPU is not billed to the agents
+
+    Tool-calling requests get the next decision of `script`, other requests a
+    short text reply. Every request is answered after `latency` seconds.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        script: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.script = script or DEFAULT_SCRIPT
+        self.port = port
+        self._process: Optional[multiprocessing.Process] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        ready = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve,
+            args=(self.port, self.latency, self.script, ready),
+            daemon=True,
+        )
+        self._process.start()
+        self.port = ready.get(timeout=30)
+        return self
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=5)
+            self._process = None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def install(self) -> None:
+        """Point the OpenAI SDK at this server, must run before connections are built"""
+        os.environ["OPENAI_BASE_URL"] = self.base_url
+        # Never send a real key anywhere from a benchmark
+        os.environ["OPENAI_API_KEY"] = "sk-bench"
+
+
+def install_memory_mongo() -> None:
+    """Serve MONGO_URL from an in-memory Mongo
+
+    Must run before src.agent is imported, since its module level MongoDB()
+    opens the clients for MONGO_URL.
+    """
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+    from src.database import mongo_db
+
+    os.environ["MONGO_URL"] = MEMORY_MONGO_URL
+    with mongo_db._clients_lock:
+        mongo_db._clients[MEMORY_MONGO_URL] = (
+            AsyncMongoMockClient(),
+            mongomock.MongoClient(),
+        )
+
+
+def _serial_tester_provider():
+    from web3 import EthereumTesterProvider
+
+    class SerialTesterProvider(EthereumTesterProvider):
+        """eth-tester is not thread safe, agents call it from worker threads
+
+        Also keeps the CPU spent inside the chain, so it can be told apart
+        from the agents' own cost.
+        """
+
+        def __init__(self):
+            super().__init__()
+            self._lock = threading.Lock()
+            self.cpu_seconds = 0.0
+            self.requests = 0
+
+        def make_request(self, method, params):
+            with self._lock:
+                started = time.thread_time()
+                try:
+                    return super().make_request(method, params)
+                finally:
+                    self.cpu_seconds += time.thread_time() - started
+                    self.requests += 1
+
+    return SerialTesterProvider()
+
+
+def local_chain(funding_ether: int = 1_000):
+    """An in-process EVM and a funded account to sign with
+
+    Returns (web3, provider, account). The account key is exported as
+    SONIC_PRIVATE_KEY so the Sonic connection signs with it.
+    """
+    from web3 import Web3
+
+    provider = _serial_tester_provider()
+    web3 = Web3(provider)
+    account = web3.eth.account.create()
+    tx_hash = web3.eth.send_transaction(
+        {
+            "from": web3.eth.accounts[0],
+            "to": account.address,
+            "value": web3.to_wei(funding_ether, "ether"),
+        }
+    )
+    web3.eth.wait_for_transaction_receipt(tx_hash)
+
+    os.environ["SONIC_PRIVATE_KEY"] = account.key.hex()
+    return web3, provider, account
+
+
+def new_address(web3) -> str:
+    """A fresh address to stand in for a strategy contract"""
+    return web3.eth.account.create().address
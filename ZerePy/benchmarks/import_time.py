@@ -0,0 +1,103 @@
+"""Cold-start benchmark for the CLI and server2 entry points.
+
+Each target is imported in a fresh interpreter so nothing is cached between
+runs. Also reports which heavy SDKs an import pulls in, since connection
+modules are expected to load only when an agent config names them.
+
+    python benchmarks/import_time.py --runs 5 --max-seconds 2.0
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    "connection_manager": "src.connection_manager",
+    "cli": "src.cli",
+    "server2": "src.server2.app",
+}
+
+HEAVY_MODULES = [
+    "web3",
+    "solana",
+    "solders",
+    "anthropic",
+    "openai",
+    "together",
+    "farcaster",
+    "goat",
+    "allora_sdk",
+    "tweepy",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Fail when a target's median import time exceeds this",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, module in TARGETS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        results[name] = {
+            "median_seconds": statistics.median(run["seconds"] for run in runs),
+            "min_seconds": min(run["seconds"] for run in runs),
+            "heavy_modules": runs[-1]["heavy"],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            heavy = ", ".join(result["heavy_modules"]) or "none"
+            print(
+                f"{name:20} median {result['median_seconds'] * 1000:8.1f} ms  "
+                f"min {result['min_seconds'] * 1000:8.1f} ms  heavy: {heavy}"
+            )
+
+    if args.max_seconds is not None:
+        slow = [
+            name
+            for name, result in results.items()
+            if result["median_seconds"] > args.max_seconds
+        ]
+        if slow:
+            print(f"Import time budget of {args.max_seconds}s exceeded by: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
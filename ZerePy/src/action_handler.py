@@ -1,4 +1,7 @@
 import logging
+from src.helpers import workers
+from src.helpers.metrics import EXECUTE_DURATION, EXECUTE_ERRORS, timed
+from src.helpers.tracing import span
 
 logger = logging.getLogger("action_handler")
 
@@ -12,9 +15,17 @@ def register_action(action_name):
 
 def execute_action(agent, action_name, **kwargs):
     if action_name in action_registry:
-       return action_registry[action_name](agent, **kwargs)
+        agent_label = getattr(agent, "strategy_address", "")
+        with timed(EXECUTE_DURATION, EXECUTE_ERRORS, agent_label, action_name), span(
+            f"action.{action_name}", agent=agent_label, action=action_name
+        ):
+            return action_registry[action_name](agent, **kwargs)
     else:
         logger.error(f"Action {action_name} not found")
         return None
+
+async def execute_action_async(agent, action_name, **kwargs):
+    # Registered actions are blocking, run them on the loop's worker pool
+    return await workers.to_thread(execute_action, agent, action_name, **kwargs)
     
 
@@ -55,6 +55,22 @@ def get_sonic_balance(agent, **kwargs):
         return None
 
 
+@register_action("get-portfolio")
+def get_portfolio(agent, **kwargs):
+    """Snapshot the balances of the agent's tokens held by its strategy contract."""
+    try:
+        address = kwargs.get("address") or agent.strategy_address
+        token_addresses = kwargs.get("token_addresses") or agent.tokens
+
+        return agent.connection_manager.connections["sonic"].get_portfolio(
+            token_addresses=token_addresses, address=address
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to get portfolio: {str(e)}")
+        return None
+
+
 @register_action("send-sonic")
 def send_sonic(agent, **kwargs):
     """Send $S tokens to an address.
@@ -18,24 +18,46 @@ def post_tweet(agent, **kwargs):
         print_h_bar()
 
         prompt = POST_TWEET_PROMPT.format(agent_name = agent.name)
+
+        if "post-tweet" in agent.batch_tasks:
+            # Not urgent, let the provider's batch API write it. The text comes
+            # back on a later loop iteration and is posted from there
+            if "post-tweet" in agent.pending_batch_tasks:
+                agent.logger.info("\n👀 Waiting for the batched tweet text...")
+                return False
+
+            def on_result(tweet_text):
+                agent.pending_batch_tasks.discard("post-tweet")
+                if tweet_text:
+                    _post_tweet_text(agent, tweet_text, time.time())
+
+            agent.pending_batch_tasks.add("post-tweet")
+            if agent.prompt_llm_batched(prompt, on_result):
+                agent.logger.info("\n📦 Tweet queued for batch generation")
+            return True
+
         tweet_text = agent.prompt_llm(prompt)
 
         if tweet_text:
-            agent.logger.info("\n🚀 Posting tweet:")
-            agent.logger.info(f"'{tweet_text}'")
-            agent.connection_manager.perform_action(
-                connection_name="twitter",
-                action_name="post-tweet",
-                params=[tweet_text]
-            )
-            agent.state["last_tweet_time"] = current_time
-            agent.logger.info("\n✅ Tweet posted successfully!")
-            return True
+            return _post_tweet_text(agent, tweet_text, current_time)
     else:
         agent.logger.info("\n👀 Delaying post until tweet interval elapses...")
         return False
 
 
+def _post_tweet_text(agent, tweet_text, current_time):
+    agent.logger.info("\n🚀 Posting tweet:")
+    agent.logger.info(f"'{tweet_text}'")
+    agent.connection_manager.perform_action(
+        connection_name="twitter",
+        action_name="post-tweet",
+        params=[tweet_text]
+    )
+    agent.state["last_tweet_time"] = current_time
+    agent.logger.info("\n✅ Tweet posted successfully!")
+    return True
+
+
 @register_action("reply-to-tweet")
 def reply_to_tweet(agent, **kwargs):
     if "timeline_tweets" in agent.state and agent.state["timeline_tweets"] is not None and len(agent.state["timeline_tweets"]) > 0:
@@ -1,19 +1,38 @@
+import asyncio
+import copy
+from collections import deque
 import json
 import random
 import time
 import logging
 import os
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Iterator, Optional
 from dotenv import load_dotenv
 from src.connection_manager import ConnectionManager
 from src.helpers import print_h_bar
-from src.action_handler import execute_action
+from src.action_handler import execute_action, execute_action_async
 import src.actions.twitter_actions
 import src.actions.sonic_actions
 import src.actions.strategy_actions
 from datetime import datetime
 from src.database.mongo_db import MongoDB
+from src.database.activity_writer import ActivityWriter
+from src.database.agent_cache import AgentCache
 from src.constants.strategy import BASE_STRATEGY_BIO, BASE_STRATEGY_PROMPT
+from src.helpers import workers
+from src.helpers.decision_cache import DecisionCache
+from src.helpers.llm_batch import DecisionBatcher, TextBatchQueue
+from src.helpers.llm_router import LLMRouter, NoProviderAvailable
+from src.helpers.llm_scheduler import PRIORITY_BACKGROUND
+from src.helpers.metrics import (
+    LOOP_ERRORS,
+    LOOP_ITERATION_DURATION,
+    LOOP_STAGE_DURATION,
+    timed,
+)
+from src.helpers.tracing import ITERATION_SPAN, span
 
 REQUIRED_FIELDS = [
     "name",
@@ -34,6 +53,20 @@ logger = logging.getLogger("agent")
 mongo_db = MongoDB()
 
 
+def load_agent_from_file(agent_name: str) -> "ZerePyAgent":
+    """Build an agent from agents/<agent_name>.json, without any CLI state"""
+    agent = ZerePyAgent()
+    agent.initFromFile(agent_name=agent_name)
+    return agent
+
+
+async def load_agent_from_database(strategy_address: str) -> "ZerePyAgent":
+    """Build an agent from its stored document, without any CLI state"""
+    agent = ZerePyAgent()
+    await agent.initFromDatabase(strategy_address=strategy_address)
+    return agent
+
+
 class ZerePyAgent:
     def initFromFile(self, agent_name: str):
         agent_path = Path("agents") / f"{agent_name}.json"
@@ -42,12 +75,12 @@ class ZerePyAgent:
         self.init(agent_dict=agent_dict)
 
     async def initFromDatabase(self, strategy_address: str):
-        agent_dict = await mongo_db.find_one(
-            collection_name="agents",
-            query={"strategy_address": strategy_address},
-        )
+        cached = await AgentCache.instance().get_agent(strategy_address)
+        if cached is None:
+            raise ValueError(f"Agent {strategy_address} not found")
 
-        self.init(agent_dict=agent_dict)
+        # The cached document is shared, keep the agent's copy separate
+        self.init(agent_dict=copy.deepcopy(cached.value))
 
     def init(self, agent_dict: dict):
         try:
@@ -68,7 +101,9 @@ class ZerePyAgent:
             self.fork_cost = agent_dict.get("fork_cost", 0)
             self.visibility = agent_dict["visibility"]
             self.loop_delay = agent_dict["loop_delay"]
-            self.connection_manager = ConnectionManager(agent_dict["config"])
+            self.connection_manager = ConnectionManager(
+                agent_dict["config"], agent=agent_dict["strategy_address"]
+            )
             self.use_time_based_weights = agent_dict["use_time_based_weights"]
             self.time_based_multipliers = agent_dict["time_based_multipliers"]
 
@@ -125,6 +160,24 @@ class ZerePyAgent:
             self.strategy_address = agent_dict["strategy_address"]
             self.strategies = agent_dict.get("strategies", {})
 
+            # Reuse strategy decisions while the observed state is unchanged
+            self.decision_cache = DecisionCache.from_config(
+                agent_dict.get("decision_cache")
+            )
+
+            # Failover order and hedging across the configured LLM providers
+            self.llm_routing = agent_dict.get("llm_routing")
+
+            # Tasks whose text may come from the provider's batch API, the
+            # ones still waiting on a result, and the results handed back for
+            # the loop to apply on its next iteration
+            self.batch_tasks = set(agent_dict.get("batch_tasks") or [])
+            self.pending_batch_tasks = set()
+            self._batch_results = deque()
+            # Bumped whenever the loop starts or stops, so results asked for
+            # by an earlier run are dropped
+            self._run_id = 0
+
             # Set up empty agent state
             self.state = {}
 
@@ -133,16 +186,23 @@ class ZerePyAgent:
             raise e
 
     def _setup_llm_provider(self):
-        # Get first available LLM provider and its model
+        # Route over every available LLM provider, the first one is the primary
         llm_providers = self.connection_manager.get_model_providers()
-        if not llm_providers:
-            raise ValueError("No configured LLM provider found")
-        self.model_provider = llm_providers[0]
+        self.llm_router = LLMRouter.from_config(
+            self.connection_manager,
+            llm_providers,
+            self.llm_routing,
+            owner=self.strategy_address,
+        )
+        self.model_provider = self.llm_router.primary
+        self.is_llm_set = True
 
     def _construct_system_prompt(self) -> str:
         """Construct the system prompt from agent configuration"""
         if self._system_prompt is None:
-            prompt_parts = []
+            # The static knowledge base goes first so every agent shares the
+            # same prompt prefix and providers can serve it from their cache
+            prompt_parts = [" ".join(BASE_STRATEGY_BIO)]
             prompt_parts.extend(self.bio)
 
             if self.traits:
@@ -164,7 +224,6 @@ class ZerePyAgent:
             if self.strategies:
                 prompt_parts.append(f"\nYour strategies are: {self.strategies}")
 
-            prompt_parts.append(" ".join(BASE_STRATEGY_BIO))
             self._system_prompt = "\n".join(prompt_parts)
 
         return self._system_prompt
@@ -198,33 +257,130 @@ class ZerePyAgent:
 
         return weights
 
-    def prompt_llm(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate text using the configured LLM provider"""
+    def prompt_llm(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Generate text using the configured LLM provider
+
+        `priority` is the LLMScheduler class of the call and `timeout` how long
+        it may wait for a slot, user-facing callers pass PRIORITY_INTERACTIVE.
+        """
         system_prompt = system_prompt or self._construct_system_prompt()
         system_prompt = f"{system_prompt} {' '.join(BASE_STRATEGY_PROMPT)}"
 
-        return self.connection_manager.perform_action(
-            connection_name=self.model_provider,
-            action_name="generate-text",
-            params=[prompt, system_prompt],
-        )
+        try:
+            return self.llm_router.perform(
+                "generate-text",
+                [prompt, system_prompt],
+                priority=priority,
+                timeout=timeout,
+            )
+        except NoProviderAvailable as e:
+            logger.error(str(e))
+            return None
+
+    def prompt_llm_stream(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+    ) -> Optional[Iterator[str]]:
+        """Stream text from the configured LLM provider chunk by chunk"""
+        system_prompt = system_prompt or self._construct_system_prompt()
+        system_prompt = f"{system_prompt} {' '.join(BASE_STRATEGY_PROMPT)}"
+
+        # A stream can't be raced chunk by chunk, only fail over before it starts
+        try:
+            return self.llm_router.perform(
+                "generate-text-stream",
+                [prompt, system_prompt],
+                hedge=False,
+                priority=priority,
+                timeout=timeout,
+            )
+        except NoProviderAvailable as e:
+            logger.error(str(e))
+            return None
+
+    def prompt_llm_batched(
+        self,
+        prompt: str,
+        on_result: Callable[[Optional[str]], None],
+        system_prompt: str = None,
+    ) -> bool:
+        """Generate text through the primary provider's batch API
+
+        `on_result` gets the text, or None on failure, on the first loop
+        iteration after the batch is done. Results arriving once the loop was
+        stopped are dropped. Providers without a batch API answer right away.
+
+        Returns:
+            bool: True if the request was queued, False if it already ran
+        """
+        system_prompt = system_prompt or self._construct_system_prompt()
+        connection = self.connection_manager.connections.get(self.llm_router.primary)
+
+        if connection is None or not TextBatchQueue.supports(connection):
+            on_result(self.prompt_llm(prompt, system_prompt))
+            return False
+
+        system_prompt = f"{system_prompt} {' '.join(BASE_STRATEGY_PROMPT)}"
+        run_id = self._run_id
+
+        def deliver(text: Optional[str]) -> None:
+            # Runs on the batch queue's thread, possibly hours later
+            if run_id != self._run_id:
+                logger.info(f"[{self.name}] Agent loop stopped, dropping a batch result")
+                return
+            self._batch_results.append((on_result, text))
+
+        TextBatchQueue.instance().submit(connection, prompt, system_prompt, deliver)
+        return True
+
+    def _apply_batch_results(self) -> None:
+        """Hand finished batch results to the actions that asked for them"""
+        while self._batch_results:
+            on_result, text = self._batch_results.popleft()
+            try:
+                on_result(text)
+            except Exception as e:
+                logger.error(f"[{self.name}] Applying a batch result failed: {e}")
+
+    def _reset_batch_results(self) -> None:
+        """Forget batch requests of the previous run when the loop starts or stops"""
+        self._run_id += 1
+        self._batch_results.clear()
+        self.pending_batch_tasks.clear()
 
     def prompt_llm_strategy(self, prompt: str, system_prompt: str = None) -> str:
         """Generate text using the configured LLM provider"""
         system_prompt = system_prompt or self._construct_system_prompt()
         strategies = self.strategies
 
-        return self.connection_manager.perform_action(
-            connection_name=self.model_provider,
-            action_name="generate-strategy-action",
-            params=[
-                prompt,
-                strategies,
-                system_prompt,
-            ],
+        return self.llm_router.perform(
+            "generate-strategy-action", [prompt, strategies, system_prompt]
         )
 
+    def _cached_decision(self, key: str):
+        decision = self.decision_cache.get(key)
+        if decision:
+            logger.info(
+                f"[{self.name}] State unchanged, reusing decision {decision[0]} "
+                f"({self.decision_cache.hits} hits / {self.decision_cache.misses} misses)"
+            )
+        return decision
+
     def perform_strategy(self, prompt: str, system_prompt: str = None):
+        system_prompt = system_prompt or self._construct_system_prompt()
+        key = self.decision_cache.make_key(prompt, system_prompt, self.strategies)
+        if decision := self._cached_decision(key):
+            return decision
+
         tool_calls = self.prompt_llm_strategy(prompt, system_prompt)
         tool_call = tool_calls[0]
 
@@ -233,8 +389,30 @@ class ZerePyAgent:
         function_name = function.name
         function_args = function.arguments
 
+        self.decision_cache.put(key, function_name, function_args)
         return function_name, function_args
 
+    async def perform_strategy_async(self, prompt: str, system_prompt: str = None):
+        system_prompt = system_prompt or self._construct_system_prompt()
+        key = self.decision_cache.make_key(prompt, system_prompt, self.strategies)
+        if decision := self._cached_decision(key):
+            return decision
+
+        # A decision still queued after a full loop delay is stale, drop it.
+        # Agents asking for an identical decision at once share one request
+        tool_calls = await DecisionBatcher.for_loop().submit(
+            f"{','.join(self.llm_router.providers)}:{key}",
+            lambda: self.llm_router.perform_async(
+                "generate-strategy-action",
+                [prompt, self.strategies, system_prompt],
+                timeout=self.loop_delay,
+            ),
+        )
+        function = tool_calls[0].function
+
+        self.decision_cache.put(key, function.name, function.arguments)
+        return function.name, function.arguments
+
     def perform_action(self, connection: str, action: str, **kwargs) -> None:
         return self.connection_manager.perform_action(connection, action, **kwargs)
 
@@ -247,6 +425,64 @@ class ZerePyAgent:
 
         return random.choices(self.tasks, weights=task_weights, k=1)[0]
 
+    def _read_inputs(self):
+        """Populate the agent state from its configured input connections"""
+        # TWITTER INPUTS
+        if (
+            "timeline_tweets" not in self.state
+            or self.state["timeline_tweets"] is None
+            or len(self.state["timeline_tweets"]) == 0
+        ):
+            if any("timeline" in task["name"] for task in self.tasks):
+                logger.info("\n👀 READING TIMELINE")
+                self.state["timeline_tweets"] = self.connection_manager.perform_action(
+                    connection_name="twitter",
+                    action_name="read-timeline",
+                    params=[],
+                )
+
+        # DISCORD INPUTS
+        if (
+            "discord_messages" not in self.state
+            or self.state["discord_messages"] is None
+            or len(self.state["discord_messages"]) == 0
+        ):
+            if any("messages" in task["name"] for task in self.tasks):
+                logger.info("\n👀 READING DISCORD MESSAGES")
+                for example_channel in self.example_channels:
+                    self.state["discord_messages"] = (
+                        self.connection_manager.perform_action(
+                            connection_name="discord",
+                            action_name="read-messages",
+                            params=[example_channel],
+                        )
+                    )
+
+    def _build_activity(self, action: str, tx_hash: Optional[str]) -> dict:
+        return {
+            "initiator": self.strategy_address,
+            "action": action,
+            "timestamp": int(time.time() * 1000),
+            "tx_hash": tx_hash,
+        }
+
+    @contextmanager
+    def _iteration(self):
+        """Time and trace one loop iteration, the root span of its trace"""
+        agent = self.strategy_address
+        with timed(LOOP_ITERATION_DURATION, LOOP_ERRORS, agent), span(
+            ITERATION_SPAN, agent=agent, name=self.name
+        ):
+            yield
+
+    @contextmanager
+    def _stage(self, stage: str):
+        """Time and trace one stage of a loop iteration"""
+        with timed(LOOP_STAGE_DURATION, None, self.strategy_address, stage), span(
+            f"agent.{stage}"
+        ):
+            yield
+
     def loop(self):
         """Main agent loop for autonomous behavior"""
         if not self.is_llm_set:
@@ -263,67 +499,38 @@ class ZerePyAgent:
             logger.info(f"{i}...")
             time.sleep(1)
 
+        self._reset_batch_results()
         try:
             while True:
                 try:
-                    # TWITTER INPUTS
-                    if (
-                        "timeline_tweets" not in self.state
-                        or self.state["timeline_tweets"] is None
-                        or len(self.state["timeline_tweets"]) == 0
-                    ):
-                        if any("timeline" in task["name"] for task in self.tasks):
-                            logger.info("\n👀 READING TIMELINE")
-                            self.state["timeline_tweets"] = (
-                                self.connection_manager.perform_action(
-                                    connection_name="twitter",
-                                    action_name="read-timeline",
-                                    params=[],
-                                )
-                            )
+                    with self._iteration():
+                        self._apply_batch_results()
 
-                    # DISCORD INPUTS
-                    if (
-                        "discord_messages" not in self.state
-                        or self.state["discord_messages"] is None
-                        or len(self.state["discord_messages"]) == 0
-                    ):
-                        if any("messages" in task["name"] for task in self.tasks):
-                            logger.info("\n👀 READING DISCORD MESSAGES")
-                            for example_channel in self.example_channels:
-                                self.state["discord_messages"] = (
-                                    self.connection_manager.perform_action(
-                                        connection_name="discord",
-                                        action_name="read-messages",
-                                        params=[example_channel],
-                                    )
-                                )
-
-                    # CHOOSE A STRATEGY
-
-                    action, arguments = self.perform_strategy(
-                        prompt=f"Events: {json.dumps(self.state)}"
-                    )
+                        with self._stage("read_inputs"):
+                            self._read_inputs()
 
-                    logger.info(f"Chosen action: {action}")
+                        # CHOOSE A STRATEGY
 
-                    # EXECUTE THE STRATEGY
+                        with self._stage("decide"):
+                            action, arguments = self.perform_strategy(
+                                prompt=f"Events: {json.dumps(self.state, sort_keys=True)}"
+                            )
 
-                    tx_hash = execute_action(
-                        agent=self, action_name=action, arguments=arguments
-                    )
+                        logger.info(f"Chosen action: {action}")
 
-                    # SAVE ACTION ACTIVITY
+                        # EXECUTE THE STRATEGY
 
-                    mongo_db.insert_one_sync(
-                        collection_name="activities",
-                        data={
-                            "initiator": self.strategy_address,
-                            "action": action,
-                            "timestamp": int(time.time() * 1000),
-                            "tx_hash": tx_hash,
-                        },
-                    )
+                        with self._stage("execute"):
+                            tx_hash = execute_action(
+                                agent=self, action_name=action, arguments=arguments
+                            )
+
+                        # SAVE ACTION ACTIVITY
+
+                        with self._stage("record"):
+                            ActivityWriter.instance().write(
+                                "activities", self._build_activity(action, tx_hash)
+                            )
 
                     logger.info(
                         f"\n⏳ Waiting {self.loop_delay} seconds before next loop..."
@@ -343,3 +550,93 @@ class ZerePyAgent:
         except KeyboardInterrupt:
             logger.info("\n🛑 Agent loop stopped by user.")
             return
+        finally:
+            self._reset_batch_results()
+
+    async def _wait(self, stop_event: asyncio.Event, delay: float) -> None:
+        """Sleep for `delay` seconds or until the stop event is set"""
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run_iteration(self) -> Optional[str]:
+        """Run a single loop iteration without blocking the event loop"""
+        with self._iteration():
+            if self._batch_results:
+                await workers.to_thread(self._apply_batch_results)
+
+            with self._stage("read_inputs"):
+                await workers.to_thread(self._read_inputs)
+
+            # CHOOSE A STRATEGY
+
+            with self._stage("decide"):
+                action, arguments = await self.perform_strategy_async(
+                    prompt=f"Events: {json.dumps(self.state, sort_keys=True)}"
+                )
+
+            logger.info(f"[{self.name}] Chosen action: {action}")
+
+            # EXECUTE THE STRATEGY
+
+            with self._stage("execute"):
+                tx_hash = await execute_action_async(
+                    agent=self, action_name=action, arguments=arguments
+                )
+
+            # SAVE ACTION ACTIVITY
+
+            with self._stage("record"):
+                ActivityWriter.instance().write(
+                    "activities", self._build_activity(action, tx_hash)
+                )
+
+        self.state = {}
+        return tx_hash
+
+    async def run(
+        self,
+        stop_event: Optional[asyncio.Event] = None,
+        limiter: Optional[asyncio.Semaphore] = None,
+        initial_delay: float = 0,
+    ):
+        """Asyncio-native agent loop, meant to be scheduled as a task
+
+        Args:
+            stop_event: Event that ends the loop once set
+            limiter: Optional semaphore bounding how many iterations run at once
+            initial_delay: Seconds to wait before the first iteration
+        """
+        stop_event = stop_event or asyncio.Event()
+
+        if not self.is_llm_set:
+            await workers.to_thread(self._setup_llm_provider)
+
+        logger.info(f"\n🚀 Starting async agent loop for {self.name}...")
+        self._reset_batch_results()
+        try:
+            await self._wait(stop_event, initial_delay)
+
+            while not stop_event.is_set():
+                try:
+                    if limiter:
+                        async with limiter:
+                            await self.run_iteration()
+                    else:
+                        await self.run_iteration()
+
+                    logger.info(
+                        f"\n⏳ [{self.name}] Waiting {self.loop_delay} seconds before next loop..."
+                    )
+                except Exception as e:
+                    logger.error(f"\n❌ [{self.name}] Error in agent loop iteration: {e}")
+                    logger.info(
+                        f"⏳ [{self.name}] Waiting {self.loop_delay} seconds before retrying..."
+                    )
+
+                await self._wait(stop_event, self.loop_delay)
+        finally:
+            self._reset_batch_results()
+
+        logger.info(f"\n🛑 Agent loop for {self.name} stopped.")
@@ -11,8 +11,9 @@ from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.styles import Style
 from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.history import FileHistory
-from src.agent import ZerePyAgent
+from src.agent import load_agent_from_database, load_agent_from_file
 from src.helpers import print_h_bar
+from src.helpers.llm_scheduler import PRIORITY_INTERACTIVE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(message)s")
@@ -376,16 +377,14 @@ class ZerePyCLI:
 
     async def _load_agent_from_database(self, strategy_address):
         try:
-            self.agent = ZerePyAgent()
-            await self.agent.initFromDatabase(strategy_address=strategy_address)
+            self.agent = await load_agent_from_database(strategy_address)
             logger.info(f"\n✅ Successfully loaded agent: {self.agent.name}")
         except Exception as e:
             logger.error(f"Error loading agent: {e}")
 
     def _load_agent_from_file(self, agent_name):
         try:
-            self.agent = ZerePyAgent()
-            self.agent.initFromFile(agent_name=agent_name)
+            self.agent = load_agent_from_file(agent_name)
             logger.info(f"\n✅ Successfully loaded agent: {self.agent.name}")
         except FileNotFoundError:
             logger.error(f"Agent file not found: {agent_name}")
@@ -593,7 +592,9 @@ class ZerePyCLI:
                 if user_input.lower() == "exit":
                     break
 
-                response = self.agent.prompt_llm(user_input)
+                response = self.agent.prompt_llm(
+                    user_input, priority=PRIORITY_INTERACTIVE
+                )
                 logger.info(f"\n{self.agent.name}: {response}")
                 print_h_bar()
 
@@ -1,73 +1,35 @@
+import asyncio
 import logging
-from typing import Any, List, Optional, Type, Dict
+from typing import Any, List, Optional, Tuple, Type, Dict
 from src.connections.base_connection import BaseConnection
-from src.connections.anthropic_connection import AnthropicConnection
-from src.connections.eternalai_connection import EternalAIConnection
-from src.connections.goat_connection import GoatConnection
-from src.connections.groq_connection import GroqConnection
-from src.connections.openai_connection import OpenAIConnection
-from src.connections.twitter_connection import TwitterConnection
-from src.connections.farcaster_connection import FarcasterConnection
-from src.connections.ollama_connection import OllamaConnection
-from src.connections.echochambers_connection import EchochambersConnection
-from src.connections.solana_connection import SolanaConnection
-from src.connections.hyperbolic_connection import HyperbolicConnection
-from src.connections.galadriel_connection import GaladrielConnection
-from src.connections.sonic_connection import SonicConnection
-from src.connections.discord_connection import DiscordConnection
-from src.connections.allora_connection import AlloraConnection
-from src.connections.xai_connection import XAIConnection
-from src.connections.ethereum_connection import EthereumConnection
-from src.connections.together_connection import TogetherAIConnection
+from src.connections import get_connection_class
+from src.helpers import workers
+from src.helpers.metrics import ACTION_DURATION, ACTION_ERRORS, current_agent, timed
+from src.helpers.tracing import span
 
 logger = logging.getLogger("connection_manager")
 
 
+class ActionUnavailableError(Exception):
+    """Raised when a connection is not ready or cannot run the requested action"""
+
+    def __init__(self, connection_name: str, action_name: str):
+        super().__init__(
+            f"Connection '{connection_name}' cannot perform '{action_name}'"
+        )
+
+
 class ConnectionManager:
-    def __init__(self, agent_config):
+    def __init__(self, agent_config, agent: str = ""):
         self.connections: Dict[str, BaseConnection] = {}
+        # Agent the connections act for, used to label metrics
+        self.agent = agent
         for config in agent_config:
             self._register_connection(config)
 
     @staticmethod
-    def _class_name_to_type(class_name: str) -> Type[BaseConnection]:
-        if class_name == "twitter":
-            return TwitterConnection
-        elif class_name == "anthropic":
-            return AnthropicConnection
-        elif class_name == "openai":
-            return OpenAIConnection
-        elif class_name == "farcaster":
-            return FarcasterConnection
-        elif class_name == "groq":
-            return GroqConnection
-        elif class_name == "eternalai":
-            return EternalAIConnection
-        elif class_name == "ollama":
-            return OllamaConnection
-        elif class_name == "echochambers":
-            return EchochambersConnection
-        elif class_name == "goat":
-            return GoatConnection
-        elif class_name == "solana":
-            return SolanaConnection
-        elif class_name == "hyperbolic":
-            return HyperbolicConnection
-        elif class_name == "galadriel":
-            return GaladrielConnection
-        elif class_name == "sonic":
-            return SonicConnection
-        elif class_name == "discord":
-            return DiscordConnection
-        elif class_name == "allora":
-            return AlloraConnection
-        elif class_name == "xai":
-            return XAIConnection
-        elif class_name == "ethereum":
-            return EthereumConnection
-        elif class_name == "together":
-            return TogetherAIConnection
-        return None
+    def _class_name_to_type(class_name: str) -> Optional[Type[BaseConnection]]:
+        return get_connection_class(class_name)
 
     def _register_connection(self, config_dic: Dict[str, Any]) -> None:
         """
@@ -81,6 +43,8 @@ class ConnectionManager:
         try:
             name = config_dic["name"]
             connection_class = self._class_name_to_type(name)
+            if connection_class is None:
+                raise ValueError(f"Unknown connection type '{name}'")
             connection = connection_class(config_dic)
             self.connections[name] = connection
         except Exception as e:
@@ -104,6 +68,7 @@ class ConnectionManager:
         try:
             connection = self.connections[connection_name]
             success = connection.configure()
+            connection.invalidate_health()
 
             if success:
                 logging.info(
@@ -160,62 +125,162 @@ class ConnectionManager:
         except Exception as e:
             logging.error(f"\nAn error occurred: {e}")
 
-    def perform_action(
+    def _resolve_action(
         self, connection_name: str, action_name: str, params: List[Any]
+    ) -> Optional[Tuple[BaseConnection, Dict[str, Any]]]:
+        """Look up a healthy connection and map positional params to action kwargs"""
+        connection = self.connections[connection_name]
+
+        # Connections set up remote resources lazily, on first use at the latest
+        if not connection.prepare():
+            logging.error(
+                f"\nError: Connection '{connection_name}' is not ready: {connection.readiness()['error']}"
+            )
+            return None
+
+        if not connection.is_healthy():
+            logging.error(
+                f"\nError: Connection '{connection_name}' is not configured"
+            )
+            return None
+
+        if action_name not in connection.actions:
+            logging.error(
+                f"\nError: Unknown action '{action_name}' for connection '{connection_name}'"
+            )
+            return None
+
+        action = connection.actions[action_name]
+
+        # Convert list of params to kwargs dictionary, handling both required and optional params
+        kwargs = {}
+        param_index = 0
+
+        # Add provided parameters up to the number provided
+        for i, param in enumerate(action.parameters):
+            if param_index < len(params):
+                kwargs[param.name] = params[param_index]
+                param_index += 1
+
+        # Validate all required parameters are present
+        missing_required = [
+            param.name
+            for param in action.parameters
+            if param.required and param.name not in kwargs
+        ]
+
+        if missing_required:
+            logging.error(
+                f"\nError: Missing required parameters: {', '.join(missing_required)}"
+            )
+            return None
+
+        return connection, kwargs
+
+    def _handle_action_error(
+        self, connection_name: str, action_name: str, e: Exception
+    ) -> None:
+        # A failed call may mean the connection went bad, re-check next time
+        if connection := self.connections.get(connection_name):
+            connection.invalidate_health()
+        logging.error(
+            f"\nAn error occurred while trying action {action_name} for {connection_name} connection: {e}"
+        )
+
+    def perform_action(
+        self,
+        connection_name: str,
+        action_name: str,
+        params: List[Any],
+        raise_errors: bool = False,
     ) -> Optional[Any]:
-        """Perform an action on a specific connection with given parameters"""
+        """Perform an action on a specific connection with given parameters
+
+        Errors are logged and None is returned, unless `raise_errors` is set
+        for callers that fail over to another connection.
+        """
+        token = current_agent.set(self.agent)
         try:
-            connection = self.connections[connection_name]
+            with timed(
+                ACTION_DURATION, ACTION_ERRORS, self.agent, connection_name, action_name
+            ), span(f"{connection_name}.{action_name}", connection=connection_name, action=action_name):
+                resolved = self._resolve_action(connection_name, action_name, params)
+                if resolved is None:
+                    raise ActionUnavailableError(connection_name, action_name)
 
-            if not connection.is_configured():
-                logging.error(
-                    f"\nError: Connection '{connection_name}' is not configured"
-                )
-                return None
+                connection, kwargs = resolved
+                return connection.perform_action(action_name, kwargs)
 
-            if action_name not in connection.actions:
-                logging.error(
-                    f"\nError: Unknown action '{action_name}' for connection '{connection_name}'"
-                )
-                return None
-
-            action = connection.actions[action_name]
-
-            # Convert list of params to kwargs dictionary, handling both required and optional params
-            kwargs = {}
-            param_index = 0
-
-            # Add provided parameters up to the number provided
-            for i, param in enumerate(action.parameters):
-                if param_index < len(params):
-                    kwargs[param.name] = params[param_index]
-                    param_index += 1
-
-            # Validate all required parameters are present
-            missing_required = [
-                param.name
-                for param in action.parameters
-                if param.required and param.name not in kwargs
-            ]
-
-            if missing_required:
-                logging.error(
-                    f"\nError: Missing required parameters: {', '.join(missing_required)}"
+        except Exception as e:
+            if not isinstance(e, ActionUnavailableError):
+                self._handle_action_error(connection_name, action_name, e)
+            if raise_errors:
+                raise
+            return None
+        finally:
+            current_agent.reset(token)
+
+    async def perform_action_async(
+        self,
+        connection_name: str,
+        action_name: str,
+        params: List[Any],
+        raise_errors: bool = False,
+    ) -> Optional[Any]:
+        """Awaitable variant of perform_action for callers running on an event loop
+
+        Connections with a native async implementation run on the caller's
+        loop, the rest are offloaded to a worker thread.
+        """
+        # Set in this task's context only, worker threads inherit it
+        token = current_agent.set(self.agent)
+        try:
+            with timed(
+                ACTION_DURATION, ACTION_ERRORS, self.agent, connection_name, action_name
+            ), span(f"{connection_name}.{action_name}", connection=connection_name, action=action_name):
+                # The health check may hit the network on a cold cache
+                resolved = await workers.to_thread(
+                    self._resolve_action, connection_name, action_name, params
                 )
-                return None
+                if resolved is None:
+                    raise ActionUnavailableError(connection_name, action_name)
 
-            return connection.perform_action(action_name, kwargs)
+                connection, kwargs = resolved
+                return await connection.perform_action_async(action_name, kwargs)
 
         except Exception as e:
-            logging.error(
-                f"\nAn error occurred while trying action {action_name} for {connection_name} connection: {e}"
-            )
+            if not isinstance(e, ActionUnavailableError):
+                self._handle_action_error(connection_name, action_name, e)
+            if raise_errors:
+                raise
             return None
+        finally:
+            current_agent.reset(token)
+
+    async def warm_up_async(self) -> Dict[str, bool]:
+        """Warm up every connection concurrently, each on a worker thread
+
+        Returns:
+            Dict[str, bool]: connection name -> whether it is ready
+        """
+        names = list(self.connections)
+        results = await asyncio.gather(
+            *(workers.to_thread(self.connections[name].prepare) for name in names),
+            return_exceptions=True,
+        )
+        return {name: result is True for name, result in zip(names, results)}
+
+    def readiness(self) -> Dict[str, Dict[str, Any]]:
+        """Readiness state of every registered connection"""
+        return {
+            name: connection.readiness()
+            for name, connection in self.connections.items()
+        }
 
     def get_model_providers(self) -> List[str]:
         """Get a list of all LLM provider connections"""
         return [
             name
             for name, conn in self.connections.items()
-            if conn.is_configured() and getattr(conn, "is_llm_provider", lambda: False)
+            if conn.is_healthy() and getattr(conn, "is_llm_provider", lambda: False)
         ]
@@ -0,0 +1,83 @@
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional, Type, Union
+
+logger = logging.getLogger("connections")
+
+# Third-party packages register connectors under this entry point group, e.g.
+#   [tool.poetry.plugins."zerepy.connections"]
+#   mychain = "zerepy_mychain.connection:MyChainConnection"
+ENTRY_POINT_GROUP = "zerepy.connections"
+
+# Connection name -> "module:Class". A module is imported only when an agent
+# config names its connection, so unused SDKs never load.
+CONNECTIONS: Dict[str, Union[str, type]] = {
+    "twitter": "src.connections.twitter_connection:TwitterConnection",
+    "anthropic": "src.connections.anthropic_connection:AnthropicConnection",
+    "openai": "src.connections.openai_connection:OpenAIConnection",
+    "farcaster": "src.connections.farcaster_connection:FarcasterConnection",
+    "groq": "src.connections.groq_connection:GroqConnection",
+    "eternalai": "src.connections.eternalai_connection:EternalAIConnection",
+    "ollama": "src.connections.ollama_connection:OllamaConnection",
+    "echochambers": "src.connections.echochambers_connection:EchochambersConnection",
+    "goat": "src.connections.goat_connection:GoatConnection",
+    "solana": "src.connections.solana_connection:SolanaConnection",
+    "hyperbolic": "src.connections.hyperbolic_connection:HyperbolicConnection",
+    "galadriel": "src.connections.galadriel_connection:GaladrielConnection",
+    "sonic": "src.connections.sonic_connection:SonicConnection",
+    "discord": "src.connections.discord_connection:DiscordConnection",
+    "allora": "src.connections.allora_connection:AlloraConnection",
+    "xai": "src.connections.xai_connection:XAIConnection",
+    "ethereum": "src.connections.ethereum_connection:EthereumConnection",
+    "together": "src.connections.together_connection:TogetherAIConnection",
+}
+
+# Shipped connections can't be replaced by a registration or a plugin
+BUILTIN_CONNECTIONS = frozenset(CONNECTIONS)
+
+_plugins_loaded = False
+
+
+def register_connection(name: str, target: Union[str, type]) -> None:
+    """Register a connection class, or its "module:Class" path, under a name"""
+    if name in BUILTIN_CONNECTIONS:
+        raise ValueError(f"Connection '{name}' is built in and can't be replaced")
+    CONNECTIONS[name] = target
+
+
+def _load_plugins() -> None:
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name in CONNECTIONS:
+            logger.warning(
+                f"Ignoring plugin connection '{entry_point.name}', the name is already registered"
+            )
+            continue
+        CONNECTIONS[entry_point.name] = entry_point.value
+
+
+def available_connections() -> List[str]:
+    _load_plugins()
+    return list(CONNECTIONS)
+
+
+def get_connection_class(name: str) -> Optional[Type]:
+    """Resolve a connection name to its class, importing the module on first use"""
+    if name not in CONNECTIONS:
+        _load_plugins()
+
+    target = CONNECTIONS.get(name)
+    if target is None:
+        return None
+
+    if isinstance(target, str):
+        module_name, _, class_name = target.partition(":")
+        target = getattr(importlib.import_module(module_name), class_name)
+        CONNECTIONS[name] = target
+
+    return target
@@ -1,12 +1,22 @@
+import json
 import logging
 import os
-from typing import Dict, Any
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv, set_key
-from anthropic import Anthropic, NotFoundError
+from anthropic import Anthropic, DefaultHttpxClient, NotFoundError
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.rate_limiter import RateLimiter, rate_limited_http_client
+from src.helpers.llm_usage import record_anthropic_usage
+from src.helpers.strategy_tools import get_anthropic_strategy_tools
 
 logger = logging.getLogger("connections.anthropic_connection")
 
+# One pooled client per API key, shared by every agent using it
+_clients: Dict[str, Anthropic] = {}
+_clients_lock = threading.Lock()
+
 class AnthropicConnectionError(Exception):
     """Base exception for Anthropic connection errors"""
     pass
@@ -19,6 +29,30 @@ class AnthropicAPIError(AnthropicConnectionError):
     """Raised when Anthropic API requests fail"""
     pass
 
+@dataclass
+class ToolFunction:
+    name: str
+    arguments: str
+
+
+@dataclass
+class ToolCall:
+    """Tool use block shaped like an OpenAI tool call, as the agent expects"""
+    id: str
+    function: ToolFunction
+
+
+def _cached_system(system_prompt: str) -> List[Dict[str, Any]]:
+    """System prompt as a cacheable block, reused across calls with the same prefix"""
+    return [
+        {
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }
+    ]
+
+
 class AnthropicConnection(BaseConnection):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
@@ -53,6 +87,25 @@ class AnthropicConnection(BaseConnection):
                 ],
                 description="Generate text using Anthropic models"
             ),
+            "generate-text-stream": Action(
+                name="generate-text-stream",
+                parameters=[
+                    ActionParameter("prompt", True, str, "The input prompt for text generation"),
+                    ActionParameter("system_prompt", True, str, "System prompt to guide the model"),
+                    ActionParameter("model", False, str, "Model to use for generation")
+                ],
+                description="Stream generated text using Anthropic models"
+            ),
+            "generate-strategy-action": Action(
+                name="generate-strategy-action",
+                parameters=[
+                    ActionParameter("prompt", True, str, "The input prompt for text generation"),
+                    ActionParameter("strategies", True, dict, "A dictionary of strategy action description"),
+                    ActionParameter("system_prompt", True, str, "System prompt to guide the model"),
+                    ActionParameter("model", False, str, "Model to use for generation")
+                ],
+                description="Generate strategy action using Anthropic models"
+            ),
             "check-model": Action(
                 name="check-model",
                 parameters=[
@@ -73,9 +126,74 @@ class AnthropicConnection(BaseConnection):
             api_key = os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
                 raise AnthropicConfigurationError("Anthropic API key not found in environment")
-            self._client = Anthropic(api_key=api_key)
+            with _clients_lock:
+                if api_key not in _clients:
+                    _clients[api_key] = Anthropic(
+                        api_key=api_key,
+                        http_client=rate_limited_http_client(
+                            "anthropic", api_key, DefaultHttpxClient
+                        ),
+                    )
+                self._client = _clients[api_key]
         return self._client
 
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        return RateLimiter.for_key("anthropic", api_key) if api_key else None
+
+    def batch_key(self) -> Tuple[str, str, int]:
+        """Requests with the same key can go into one provider batch"""
+        return ("anthropic", self.config["model"], id(self._get_client()))
+
+    def submit_text_batch(self, requests: List[Tuple[str, str, str]], model: str = None) -> str:
+        """Queue (custom_id, prompt, system_prompt) requests as an Anthropic Message Batch
+
+        Returns:
+            str: The batch id to poll with get_text_batch_results
+        """
+        client = self._get_client()
+        model = model or self.config["model"]
+
+        try:
+            batch = client.messages.batches.create(
+                requests=[
+                    {
+                        "custom_id": custom_id,
+                        "params": {
+                            "model": model,
+                            "max_tokens": 1000,
+                            "temperature": 0,
+                            "system": _cached_system(system_prompt),
+                            "messages": [{"role": "user", "content": prompt}],
+                        },
+                    }
+                    for custom_id, prompt, system_prompt in requests
+                ]
+            )
+            return batch.id
+        except Exception as e:
+            raise AnthropicAPIError(f"Batch submission failed: {e}")
+
+    def get_text_batch_results(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """Generated text per custom_id once a batch has ended, None while it runs
+
+        Requests that errored, expired or were canceled are missing from the result.
+        """
+        client = self._get_client()
+        try:
+            batch = client.messages.batches.retrieve(batch_id)
+            if batch.processing_status != "ended":
+                return None
+
+            results = {}
+            for entry in client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    record_anthropic_usage(entry.result.message)
+                    results[entry.custom_id] = entry.result.message.content[0].text
+            return results
+        except Exception as e:
+            raise AnthropicAPIError(f"Reading batch {batch_id} failed: {e}")
+
     def configure(self) -> bool:
         """Sets up Anthropic API authentication"""
         logger.info("\n🤖 ANTHROPIC API SETUP")
@@ -141,7 +259,7 @@ class AnthropicConnection(BaseConnection):
                 model=model,
                 max_tokens=1000,
                 temperature=0,
-                system=system_prompt,
+                system=_cached_system(system_prompt),
                 messages=[
                     {
                         "role": "user",
@@ -154,11 +272,88 @@ class AnthropicConnection(BaseConnection):
                     }
                 ]
             )
+            record_anthropic_usage(message)
             return message.content[0].text
             
         except Exception as e:
             raise AnthropicAPIError(f"Text generation failed: {e}")
 
+    def generate_text_stream(self, prompt: str, system_prompt: str, model: str = None, **kwargs) -> Iterator[str]:
+        """Stream text generated by Anthropic models as it is produced"""
+        client = self._get_client()
+
+        # Use configured model if none provided
+        if not model:
+            model = self.config["model"]
+
+        try:
+            with client.messages.stream(
+                model=model,
+                max_tokens=1000,
+                temperature=0,
+                system=_cached_system(system_prompt),
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": prompt
+                            }
+                        ]
+                    }
+                ]
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+                record_anthropic_usage(stream.get_final_message())
+
+        except Exception as e:
+            raise AnthropicAPIError(f"Text streaming failed: {e}")
+
+    def generate_strategy_action(self, prompt: str, strategies: dict, system_prompt: str, model: str = None, **kwargs) -> List[ToolCall]:
+        """Generate strategy action using Anthropic models"""
+        try:
+            client = self._get_client()
+
+            # Use configured model if none provided
+            if not model:
+                model = self.config["model"]
+
+            # Tools and system prompt form the stable, cached prefix of the request
+            message = client.messages.create(
+                model=model,
+                max_tokens=1000,
+                temperature=0,
+                system=_cached_system(system_prompt),
+                tools=get_anthropic_strategy_tools(strategies),
+                tool_choice={"type": "any"},
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": prompt
+                            }
+                        ]
+                    }
+                ]
+            )
+            record_anthropic_usage(message)
+
+            return [
+                ToolCall(
+                    id=block.id,
+                    function=ToolFunction(name=block.name, arguments=json.dumps(block.input))
+                )
+                for block in message.content
+                if block.type == "tool_use"
+            ]
+
+        except Exception as e:
+            raise AnthropicAPIError(f"Strategy generation failed: {e}")
+
     def check_model(self, model: str, **kwargs) -> bool:
         """Check if a specific model is available"""
         try:
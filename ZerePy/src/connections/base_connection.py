@@ -1,7 +1,11 @@
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Callable
+from typing import Any, Dict, List, Callable, Optional
 from dataclasses import dataclass
+from src.helpers import workers
+from src.helpers.rate_limiter import RateLimiter, estimate_tokens
 
 @dataclass
 class ActionParameter:
@@ -28,13 +32,42 @@ class Action:
                     errors.append(f"Invalid type for {param.name}. Expected {param.type.__name__}")
         return errors
 
+# Seconds a successful / failed is_configured() result stays valid
+DEFAULT_HEALTH_TTL = 300
+HEALTH_FAILURE_TTL = 15
+
+# Readiness states of a connection's remote resources (RPC endpoints, plugins, ...)
+READY_PENDING = "pending"
+READY_WARMING = "warming"
+READY_OK = "ready"
+READY_FAILED = "failed"
+
 class BaseConnection(ABC):
+    # Health cache state, declared on the class so connections that do not
+    # call BaseConnection.__init__ still get working defaults
+    health_ttl: float = DEFAULT_HEALTH_TTL
+    _health = None
+    _health_checked_at: float = 0.0
+    _health_refreshing: bool = False
+
+    # Readiness state, also declared on the class for the same reason. Remote
+    # resources are set up by warm_up(), never in the constructor
+    _ready_state: str = READY_PENDING
+    _ready_error: Optional[str] = None
+    _ready_checked_at: float = 0.0
+    _locks_guard = threading.Lock()
+
     def __init__(self, config):
         try:
             # Dictionary to store action name -> handler method mapping
             self.actions: Dict[str, Callable] = {}
             # Dictionary to store some essential configuration
             self.config = self.validate_config(config) 
+            # How long a health check result is reused before it is refreshed
+            # (0 refreshes it on every call)
+            self.health_ttl = float(self.config.get("health_check_ttl", DEFAULT_HEALTH_TTL))
+            if self.health_ttl < 0:
+                raise ValueError("health_check_ttl must not be negative")
             # Register actions during initialization
             self.register_actions()
         except Exception as e:
@@ -84,6 +117,117 @@ class BaseConnection(ABC):
         """
         pass
 
+    def is_healthy(self, verbose = False) -> bool:
+        """
+        Cached variant of is_configured() for hot paths.
+
+        A fresh result is reused for `health_ttl` seconds. Once a healthy result
+        goes stale it keeps being served while a background thread refreshes it;
+        unhealthy or invalidated results are re-checked synchronously.
+
+        Returns:
+            bool: True if the connection was last seen configured, False otherwise
+        """
+        age = time.monotonic() - self._health_checked_at
+
+        if self._health is None:
+            return self._check_health(verbose)
+
+        if self._health:
+            if age >= self.health_ttl:
+                self._refresh_health_in_background()
+            return True
+
+        if age >= min(self.health_ttl, HEALTH_FAILURE_TTL):
+            return self._check_health(verbose)
+        return False
+
+    def invalidate_health(self) -> None:
+        """Drop the cached health state, e.g. after a failed call or a reconfigure"""
+        self._health = None
+        self._health_checked_at = 0.0
+
+    def _check_health(self, verbose = False) -> bool:
+        healthy = bool(self.is_configured(verbose=verbose))
+        self._health = healthy
+        self._health_checked_at = time.monotonic()
+        return healthy
+
+    def _refresh_health_in_background(self) -> None:
+        with self._get_lock("_health_lock"):
+            if self._health_refreshing:
+                return
+            self._health_refreshing = True
+
+        def refresh():
+            try:
+                self._check_health()
+            except Exception as e:
+                logging.debug(f"Background health check failed: {e}")
+                self.invalidate_health()
+            finally:
+                self._health_refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def warm_up(self) -> None:
+        """
+        Establish remote resources (RPC connections, plugins, ...) ahead of first use.
+
+        Constructors must not do network I/O, connections that need it do it
+        here instead. Raise to report the connection as failed.
+        """
+        pass
+
+    def prepare(self) -> bool:
+        """
+        Run warm_up() once and record the outcome.
+
+        Safe to call from several threads, concurrent callers wait for the
+        running warm-up. A failed warm-up is retried once HEALTH_FAILURE_TTL
+        seconds have passed.
+
+        Returns:
+            bool: True if the connection is ready for use, False otherwise
+        """
+        if self._ready_state == READY_OK:
+            return True
+
+        with self._get_lock("_ready_lock"):
+            if self._ready_state == READY_OK:
+                return True
+            if (
+                self._ready_state == READY_FAILED
+                and time.monotonic() - self._ready_checked_at < HEALTH_FAILURE_TTL
+            ):
+                return False
+
+            self._ready_state = READY_WARMING
+            try:
+                self.warm_up()
+                self._ready_state = READY_OK
+                self._ready_error = None
+            except Exception as e:
+                logging.warning(f"Warm-up of {type(self).__name__} failed: {e}")
+                self._ready_state = READY_FAILED
+                self._ready_error = str(e)
+            self._ready_checked_at = time.monotonic()
+
+        return self._ready_state == READY_OK
+
+    def _get_lock(self, name: str) -> threading.Lock:
+        # Per instance, so warm-ups and health refreshes of different
+        # connections don't serialize on each other
+        with self._locks_guard:
+            lock = self.__dict__.get(name)
+            if lock is None:
+                lock = self.__dict__[name] = threading.Lock()
+        return lock
+
+    def readiness(self) -> Dict[str, Any]:
+        """Current readiness state of the connection and the last warm-up error, if any"""
+        return {"state": self._ready_state, "error": self._ready_error}
+
     @abstractmethod
     def register_actions(self) -> None:
         """
@@ -112,3 +256,24 @@ class BaseConnection(ABC):
             
         handler = self.actions[action_name]
         return handler(**kwargs)
+
+    async def perform_action_async(self, action_name: str, kwargs) -> Any:
+        """
+        Awaitable variant of perform_action.
+
+        Runs the blocking implementation on a worker thread. Connections with
+        a native async client override this to run on the caller's loop.
+        Rate limit waits, including 429 back-offs, are awaited here first, so
+        they don't hold a worker thread.
+        """
+        limiter = self.rate_limiter()
+        if limiter is None:
+            return await workers.to_thread(self.perform_action, action_name, kwargs)
+
+        await limiter.acquire_async(estimate_tokens(kwargs))
+        with limiter.prepaid():
+            return await workers.to_thread(self.perform_action, action_name, kwargs)
+
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """Limiter shared by every request of this connection, if it has one"""
+        return None
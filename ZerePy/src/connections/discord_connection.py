@@ -1,10 +1,11 @@
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import set_key, load_dotenv
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 from src.helpers import print_h_bar
-import requests
+from src.helpers import http
+from src.helpers.rate_limiter import RateLimiter
 import json
 
 logger = logging.getLogger("connections.discord_connection")
@@ -390,7 +391,7 @@ class DiscordConnection(BaseConnection):
             "Accept": "application/json",
             "Authorization": self._get_request_auth_token(),
         }
-        response = requests.request("PUT", url, headers=headers, data={})
+        response = self._request("PUT", url, headers=headers, data={})
         if response.status_code != 204:
             raise DiscordAPIError(
                 f"Failed to called PUT to Discord: {response.status_code} - {response.text}"
@@ -405,7 +406,7 @@ class DiscordConnection(BaseConnection):
             "Accept": "application/json",
             "Authorization": self._get_request_auth_token(),
         }
-        response = requests.request("POST", url, headers=headers, data=payload)
+        response = self._request("POST", url, headers=headers, data=payload)
         if response.status_code != 200:
             raise DiscordAPIError(
                 f"Failed to call POST to Discord: {response.status_code} - {response.text}"
@@ -420,13 +421,24 @@ class DiscordConnection(BaseConnection):
             "Authorization": self._get_request_auth_token(),
         }
         print(headers)
-        response = requests.request("GET", url, headers=headers, data={})
+        response = self._request("GET", url, headers=headers, data={})
         if response.status_code != 200:
             raise DiscordAPIError(
                 f"Failed to call GET to Discord: {response.status_code} - {response.text}"
             )
         return json.loads(response.text)
 
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        return RateLimiter.for_key("discord", os.getenv("DISCORD_TOKEN"))
+
+    def _request(self, method: str, url: str, **kwargs):
+        """Send a request through the limiter shared by every user of this bot token"""
+        limiter = self.rate_limiter()
+        with limiter.limit():
+            response = http.request(method, url, **kwargs)
+        limiter.observe(response.headers, response.status_code)
+        return response
+
     def _get_request_auth_token(self) -> str:
         return f"Bot {os.getenv('DISCORD_TOKEN')}"
 
@@ -435,7 +447,7 @@ class DiscordConnection(BaseConnection):
         try:
             url = f"{self.base_url}/users/@me"
             headers = {"Accept": "application/json", "Authorization": f"Bot {api_key}"}
-            response = requests.request("GET", url, headers=headers, data={})
+            response = http.request("GET", url, headers=headers, data={})
             if response.status_code != 200:
                 raise DiscordAPIError(
                     f"Failed to call GET to Discord: {response.status_code} - {response.text}"
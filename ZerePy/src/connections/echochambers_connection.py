@@ -1,9 +1,11 @@
 import logging
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from collections import deque
 
 import requests
+from src.helpers import http
+from src.helpers.rate_limiter import RateLimiter
 from dotenv import load_dotenv
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 
@@ -201,6 +203,9 @@ class EchochambersConnection(BaseConnection):
             self._handle_error("Failed to process room history", e)
             raise
 
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        return RateLimiter.for_key("echochambers", self.api_key)
+
     def _make_request(self, method: str, url: str, **kwargs) -> Any:
         """Make HTTP request with retries and error handling"""
         headers = {
@@ -209,13 +214,15 @@ class EchochambersConnection(BaseConnection):
         }
         kwargs['headers'] = headers
 
+        # Shared by every agent posting with this key, a 429 pauses all of them
+        limiter = self.rate_limiter()
+
         for attempt in range(3):
             try:
-                response = requests.request(method, url, timeout=10, **kwargs)
-                if response.status_code == 429:  # Rate limit
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    logger.warning(f"Rate limit hit, waiting {retry_after}s")
-                    time.sleep(retry_after)
+                with limiter.limit():
+                    response = http.request(method, url, timeout=10, **kwargs)
+                limiter.observe(response.headers, response.status_code)
+                if response.status_code == 429:  # Rate limit, the limiter waits it out
                     continue
                 response.raise_for_status()
                 return response.json()
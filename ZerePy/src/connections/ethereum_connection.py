@@ -1,14 +1,17 @@
 import logging
 import os
 import time
-import requests
+from src.helpers import http
 from typing import Dict, Any, Optional, Union
 from dotenv import load_dotenv, set_key
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from src.constants.networks import EVM_NETWORKS
-from src.constants.abi import ERC20_ABI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.metrics import rpc_middleware
+from src.helpers.tracing import rpc_span_middleware
+from src.helpers.evm.token_registry import TokenRegistry
+from src.helpers.ticker_index import RANK_ACTIVITY, TickerIndex
 
 logger = logging.getLogger("connections.ethereum_connection")
 
@@ -47,38 +50,50 @@ class EthereumConnection(BaseConnection):
         return f"https://{self.scanner_url}/tx/{tx_hash}"
 
     def _initialize_web3(self) -> None:
-        """Initialize Web3 connection with retry logic"""
+        """Create the Web3 client, the provider only connects on first request"""
         if not self._web3:
-            for attempt in range(3):
-                try:
-                    self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
-                    self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-                    if not self._web3.is_connected():
-                        raise EthereumConnectionError(
-                            "Failed to connect to Ethereum network"
-                        )
+            self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
+            self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+            self._web3.middleware_onion.add(rpc_middleware("ethereum"), name="metrics")
+            self._web3.middleware_onion.add(rpc_span_middleware("ethereum"), name="tracing")
 
-                    chain_id = self._web3.eth.chain_id
-                    if chain_id != self.chain_id:
-                        raise EthereumConnectionError(
-                            f"Connected to wrong chain. Expected {self.chain_id}, got {chain_id}"
-                        )
+    def warm_up(self) -> None:
+        """Check the RPC endpoint is reachable and serves the expected chain, with retries"""
+        self._initialize_web3()
+        for attempt in range(3):
+            try:
+                if not self._web3.is_connected():
+                    raise EthereumConnectionError(
+                        "Failed to connect to Ethereum network"
+                    )
 
-                    logger.info(
-                        f"Connected to Ethereum network with chain ID: {chain_id}"
+                chain_id = self._web3.eth.chain_id
+                if chain_id != self.chain_id:
+                    raise EthereumConnectionError(
+                        f"Connected to wrong chain. Expected {self.chain_id}, got {chain_id}"
                     )
-                    break
 
-                except Exception as e:
-                    if attempt == 2:
-                        raise EthereumConnectionError(
-                            f"Failed to initialize Web3 after 3 attempts: {str(e)}"
-                        )
-                    logger.warning(
-                        f"Web3 initialization attempt {attempt + 1} failed: {str(e)}"
+                logger.info(f"Connected to Ethereum network with chain ID: {chain_id}")
+                break
+
+            except Exception as e:
+                if attempt == 2:
+                    raise EthereumConnectionError(
+                        f"Failed to initialize Web3 after 3 attempts: {str(e)}"
                     )
-                    time.sleep(1)
+                logger.warning(
+                    f"Web3 initialization attempt {attempt + 1} failed: {str(e)}"
+                )
+                time.sleep(1)
+
+    def _get_token_decimals(self, token_address: str) -> int:
+        """Token decimals from the process-wide registry, read from chain at most once"""
+        return TokenRegistry.instance().decimals(
+            self._web3, self.chain_id, token_address
+        )
+
+    def _get_token_contract(self, token_address: str):
+        return TokenRegistry.instance().contract(self._web3, token_address)
 
     @property
     def is_llm_provider(self) -> bool:
@@ -238,38 +253,10 @@ class EthereumConnection(BaseConnection):
             return f"Failed to get address: {str(e)}"
 
     def _get_token_address(self, ticker: str) -> Optional[str]:
-        """Helper function to get token address from DEXScreener"""
+        """Helper function to get token address from the shared ticker index"""
         try:
-            response = requests.get(
-                f"https://api.dexscreener.com/latest/dex/search?q={ticker}"
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            if not data.get("pairs"):
-                return None
-
-            # Filter pairs for Ethereum network
-            eth_pairs = [
-                pair
-                for pair in data["pairs"]
-                if pair.get("chainId", "").lower() == "ethereum"
-            ]
-
-            # Sort by liquidity/volume
-            eth_pairs.sort(
-                key=lambda x: float(x.get("liquidity", {}).get("usd", 0) or 0)
-                * float(x.get("volume", {}).get("h24", 0) or 0),
-                reverse=True,
-            )
-
-            # Find exact ticker match
-            for pair in eth_pairs:
-                base_token = pair.get("baseToken", {})
-                if base_token.get("symbol", "").lower() == ticker.lower():
-                    return base_token.get("address")
-
-            return None
+            # Rank by liquidity/volume
+            return TickerIndex.instance().resolve(ticker, "ethereum", rank=RANK_ACTIVITY)
 
         except Exception as error:
             logger.error(f"Error fetching token address: {str(error)}")
@@ -293,14 +280,11 @@ class EthereumConnection(BaseConnection):
         """Helper function to get raw balance value"""
         if token_address and token_address.lower() != self.SONIC_COIN.lower():
             # Get ERC20 token balance
-            contract = self._web3.eth.contract(
-                address=Web3.to_checksum_address(token_address), abi=ERC20_ABI
-            )
+            contract = self._get_token_contract(token_address)
             balance = contract.functions.balanceOf(
                 Web3.to_checksum_address(address)
             ).call()
-            decimals = contract.functions.decimals().call()
-            return balanqce / (10**decimals)
+            return balance / (10 ** self._get_token_decimals(token_address))
         else:
             # Get native ETH balance
             balance = self._web3.eth.get_balance(Web3.to_checksum_address(address))
@@ -331,23 +315,15 @@ class EthereumConnection(BaseConnection):
                 raw_balance = self._web3.eth.get_balance(account.address)
                 return self._web3.from_wei(raw_balance, "ether")
 
-            # Get token contract
-            token_contract = self._web3.eth.contract(
-                address=Web3.to_checksum_address(token_address), abi=ERC20_ABI
-            )
-
-            # Get token info
-            symbol = token_contract.functions.symbol().call()
-            decimals = token_contract.functions.decimals().call()
-
-            # Get balance
+            # Get balance, token decimals come from the registry
+            token_contract = self._get_token_contract(token_address)
             raw_balance = token_contract.functions.balanceOf(account.address).call()
-            token_balance = raw_balance / (10**decimals)
+            token_balance = raw_balance / (10 ** self._get_token_decimals(token_address))
 
             # Try to get ETH value using Kyberswap price API
             try:
                 kyber_url = f"{self.aggregator_api}/tokens/rates"
-                response = requests.get(
+                response = http.get(
                     kyber_url,
                     params={
                         "tokenIn": token_address,
@@ -384,10 +360,8 @@ class EthereumConnection(BaseConnection):
 
             if token_address and token_address.lower() != self.SONIC_COIN.lower():
                 # Prepare ERC20 transfer
-                contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_address), abi=ERC20_ABI
-                )
-                decimals = contract.functions.decimals().call()
+                contract = self._get_token_contract(token_address)
+                decimals = self._get_token_decimals(token_address)
                 amount_raw = int(amount * (10**decimals))
 
                 tx = contract.functions.transfer(
@@ -456,10 +430,7 @@ class EthereumConnection(BaseConnection):
             if token_in.lower() == self.SONIC_COIN.lower():
                 amount_raw = self._web3.to_wei(amount, "ether")
             else:
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_in), abi=ERC20_ABI
-                )
-                decimals = token_contract.functions.decimals().call()
+                decimals = self._get_token_decimals(token_in)
                 amount_raw = int(amount * (10**decimals))
 
             # Prepare API request
@@ -472,7 +443,7 @@ class EthereumConnection(BaseConnection):
                 "gasInclude": "true",
             }
 
-            response = requests.get(url, headers=headers, params=params)
+            response = http.get(url, headers=headers, params=params)
             response.raise_for_status()
 
             data = response.json()
@@ -510,7 +481,7 @@ class EthereumConnection(BaseConnection):
                 "source": "zerepy",
             }
 
-            response = requests.post(url, headers=headers, json=payload)
+            response = http.post(url, headers=headers, json=payload)
             response.raise_for_status()
 
             data = response.json()
@@ -554,9 +525,7 @@ class EthereumConnection(BaseConnection):
                 private_key = os.getenv("ETH_PRIVATE_KEY")
                 account = self._web3.eth.account.from_key(private_key)
 
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_address), abi=ERC20_ABI
-                )
+                token_contract = self._get_token_contract(token_address)
 
                 # Check current allowance
                 current_allowance = token_contract.functions.allowance(
@@ -641,10 +610,7 @@ class EthereumConnection(BaseConnection):
                 ):  # WETH
                     amount_raw = self._web3.to_wei(amount, "ether")
                 else:
-                    token_contract = self._web3.eth.contract(
-                        address=Web3.to_checksum_address(token_in), abi=ERC20_ABI
-                    )
-                    decimals = token_contract.functions.decimals().call()
+                    decimals = self._get_token_decimals(token_in)
                     amount_raw = int(amount * (10**decimals))
 
                 approval_hash = self._handle_token_approval(
@@ -679,7 +645,7 @@ class EthereumConnection(BaseConnection):
 
         load_dotenv()
 
-        if not self.is_configured(verbose=True):
+        if not self.is_healthy(verbose=True):
             raise EthereumConnectionError(
                 "Ethereum connection is not properly configured"
             )
@@ -39,7 +39,7 @@ class GoatConnection(BaseConnection):
         self._action_registry: Dict[str, ToolBase] = {}
         self._config = self.validate_config(
             config
-        )  # Store config but don't register actions yet
+        )  # Store config but don't load plugins or register actions yet
 
     def _resolve_type(self, raw_value: str, module) -> Any:
         """Resolve a type from a string, either from plugin module or fully qualified path"""
@@ -228,15 +228,20 @@ class GoatConnection(BaseConnection):
                     f"Invalid plugin name '{plugin_name}'. Must be a valid Python identifier"
                 )
 
-            self._load_plugin(plugin_config)
-
         return config
 
+    def _load_plugins(self) -> None:
+        """Import and initialize the configured plugins, once"""
+        for plugin_config in self._config["plugins"]:
+            if plugin_config["name"] not in self._plugins:
+                self._load_plugin(plugin_config)
+
     def _register_actions_with_wallet(self) -> None:
         """Register actions with the current wallet client"""
         self.actions = {}  # Clear existing actions
         self._action_registry = {}  # Clear existing registry
 
+        self._load_plugins()
         tools = get_tools(self._wallet_client, list(self._plugins.values()))  # type: ignore
 
         for tool in tools:
@@ -261,6 +266,12 @@ class GoatConnection(BaseConnection):
         """Initial action registration - deferred until wallet is configured"""
         pass  # We'll register actions after wallet configuration
 
+    def warm_up(self) -> None:
+        """Load plugins and connect the wallet so actions are registered before first use"""
+        self._load_plugins()
+        if not self.is_configured():
+            raise GoatConfigurationError("GOAT wallet could not be created")
+
     def _create_wallet(self) -> bool:
         """Create wallet from environment variables"""
         try:
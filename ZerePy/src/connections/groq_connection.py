@@ -1,9 +1,10 @@
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 from dotenv import load_dotenv, set_key
 from openai import OpenAI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.streaming import stream_chat_completion
 
 logger = logging.getLogger("connections.groq_connection")
 
@@ -54,6 +55,16 @@ class GroqConnection(BaseConnection):
                 ],
                 description="Generate text using Groq models"
             ),
+            "generate-text-stream": Action(
+                name="generate-text-stream",
+                parameters=[
+                    ActionParameter("prompt", True, str, "The input prompt for text generation"),
+                    ActionParameter("system_prompt", True, str, "System prompt to guide the model"),
+                    ActionParameter("model", False, str, "Model to use for generation"),
+                    ActionParameter("temperature", False, float, "A decimal number that determines the degree of randomness in the response.")
+                ],
+                description="Stream generated text using Groq models"
+            ),
             "check-model": Action(
                 name="check-model",
                 parameters=[
@@ -160,6 +171,24 @@ class GroqConnection(BaseConnection):
         except Exception as e:
             raise GroqAPIError(f"Text generation failed: {e}")
 
+    def generate_text_stream(
+        self, prompt: str, system_prompt: str, model: str = None, **kwargs
+    ) -> Iterator[str]:
+        """Stream text generated by Groq models as it is produced"""
+        # Use configured model if none provided
+        if not model:
+            model = self.config["model"]
+
+        return stream_chat_completion(
+            self._get_client(),
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            error_class=GroqAPIError,
+        )
+
     def check_model(self, model: str, **kwargs) -> bool:
         """Check if a specific model is available"""
         try:
@@ -199,7 +228,7 @@ class GroqConnection(BaseConnection):
         # Explicitly reload environment variables
         load_dotenv()
         
-        if not self.is_configured(verbose=True):
+        if not self.is_healthy(verbose=True):
             raise GroqConfigurationError("Groq is not properly configured")
 
         action = self.actions[action_name]
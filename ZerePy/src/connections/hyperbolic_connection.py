@@ -1,9 +1,12 @@
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 from dotenv import load_dotenv, set_key
 from openai import OpenAI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.streaming import stream_chat_completion
+from src.helpers.llm_usage import record_openai_usage
+from src.helpers.strategy_tools import get_strategy_tools
 
 logger = logging.getLogger("connections.hyperbolic_connection")
 
@@ -74,6 +77,25 @@ class HyperbolicConnection(BaseConnection):
                 ],
                 description="Generate text using Hyperbolic models",
             ),
+            "generate-text-stream": Action(
+                name="generate-text-stream",
+                parameters=[
+                    ActionParameter(
+                        "prompt", True, str, "The input prompt for text generation"
+                    ),
+                    ActionParameter(
+                        "system_prompt", True, str, "System prompt to guide the model"
+                    ),
+                    ActionParameter("model", False, str, "Model to use for generation"),
+                    ActionParameter(
+                        "temperature",
+                        False,
+                        float,
+                        "A decimal number that determines the degree of randomness in the response.",
+                    ),
+                ],
+                description="Stream generated text using Hyperbolic models",
+            ),
             "generate-strategy-action": Action(
                 name="generate-strategy-action",
                 parameters=[
@@ -194,12 +216,31 @@ class HyperbolicConnection(BaseConnection):
                     {"role": "user", "content": prompt},
                 ],
             )
+            record_openai_usage("hyperbolic", completion)
 
             return completion.choices[0].message.content
 
         except Exception as e:
             raise HyperbolicAPIError(f"Text generation failed: {e}")
 
+    def generate_text_stream(
+        self, prompt: str, system_prompt: str, model: str = None, **kwargs
+    ) -> Iterator[str]:
+        """Stream text generated by Hyperbolic models as it is produced"""
+        # Use configured model if none provided
+        if not model:
+            model = self.config["model"]
+
+        return stream_chat_completion(
+            self._get_client(),
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            error_class=HyperbolicAPIError,
+        )
+
     def generate_strategy_action(
         self,
         prompt: str,
@@ -216,95 +257,7 @@ class HyperbolicConnection(BaseConnection):
             if not model:
                 model = self.config["model"]
 
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "swap-to-single",
-                        "description": " ".join(strategies["swap_to_single"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "tokens_in": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "The token addresses to sell. Item must be a supported token.",
-                                },
-                                "token_out": {
-                                    "type": "string",
-                                    "description": "The token address to buy. Must be a supported token.",
-                                },
-                            },
-                            "required": ["tokens_in", "token_out"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "swap-to-many",
-                        "description": " ".join(strategies["swap_to_many"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "token_in": {
-                                    "type": "string",
-                                    "description": "The token address to sell. Must be a supported token.",
-                                },
-                                "tokens_out": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "The token addresses to buy. Item must be a supported token.",
-                                },
-                            },
-                            "required": ["token_in", "tokens_out"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "adjust-split-ratio",
-                        "description": " ".join(strategies["adjust_split_ratio"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "ratio": {
-                                    "type": "array",
-                                    "items": {"type": "number"},
-                                    "description": "Sum must always be 10000.",
-                                }
-                            },
-                            "required": ["ratio"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "none",
-                        "description": " ".join(strategies["none"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "message": {
-                                    "type": "string",
-                                    "description": "The reason why you used this function",
-                                }
-                            },
-                            "required": ["message"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-            ]
+            tools = get_strategy_tools(strategies)
 
             completion = client.chat.completions.create(
                 model=model,
@@ -314,6 +267,7 @@ class HyperbolicConnection(BaseConnection):
                 ],
                 tools=tools,
             )
+            record_openai_usage("hyperbolic", completion)
 
             return completion.choices[0].message.tool_calls
 
@@ -359,7 +313,7 @@ class HyperbolicConnection(BaseConnection):
         # Explicitly reload environment variables
         load_dotenv()
 
-        if not self.is_configured(verbose=True):
+        if not self.is_healthy(verbose=True):
             raise HyperbolicConfigurationError("Hyperbolic is not properly configured")
 
         action = self.actions[action_name]
@@ -1,12 +1,25 @@
+import json
 import logging
 import os
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv, set_key
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.rate_limiter import RateLimiter, rate_limited_http_client
+from src.helpers.streaming import stream_chat_completion
+from src.helpers.llm_usage import record_openai_usage, record_usage
+from src.helpers.strategy_tools import get_strategy_tools
 
 logger = logging.getLogger("connections.openai_connection")
 
+# One pooled client per API key, shared by every agent using it
+_clients: Dict[str, OpenAI] = {}
+_clients_lock = threading.Lock()
+
+# Batch states that still have results to come
+BATCH_PENDING_STATUSES = ("validating", "in_progress", "finalizing", "cancelling")
+
 
 class OpenAIConnectionError(Exception):
     """Base exception for OpenAI connection errors"""
@@ -68,6 +81,19 @@ class OpenAIConnection(BaseConnection):
                 ],
                 description="Generate strategy action using OpenAI models",
             ),
+            "generate-text-stream": Action(
+                name="generate-text-stream",
+                parameters=[
+                    ActionParameter(
+                        "prompt", True, str, "The input prompt for text generation"
+                    ),
+                    ActionParameter(
+                        "system_prompt", True, str, "System prompt to guide the model"
+                    ),
+                    ActionParameter("model", False, str, "Model to use for generation"),
+                ],
+                description="Stream generated text using OpenAI models",
+            ),
             "generate-strategy-action": Action(
                 name="generate-strategy-action",
                 parameters=[
@@ -111,9 +137,100 @@ class OpenAIConnection(BaseConnection):
                 raise OpenAIConfigurationError(
                     "OpenAI API key not found in environment"
                 )
-            self._client = OpenAI(api_key=api_key)
+            with _clients_lock:
+                if api_key not in _clients:
+                    _clients[api_key] = OpenAI(
+                        api_key=api_key,
+                        http_client=rate_limited_http_client(
+                            "openai", api_key, DefaultHttpxClient
+                        ),
+                    )
+                self._client = _clients[api_key]
         return self._client
 
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+        return RateLimiter.for_key("openai", api_key) if api_key else None
+
+    def batch_key(self) -> Tuple[str, str, int]:
+        """Requests with the same key can go into one provider batch"""
+        return ("openai", self.config["model"], id(self._get_client()))
+
+    def submit_text_batch(
+        self, requests: List[Tuple[str, str, str]], model: str = None
+    ) -> str:
+        """Queue (custom_id, prompt, system_prompt) requests on the OpenAI Batch API
+
+        Returns:
+            str: The batch id to poll with get_text_batch_results
+        """
+        client = self._get_client()
+        model = model or self.config["model"]
+
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                    },
+                }
+            )
+            for custom_id, prompt, system_prompt in requests
+        ]
+
+        try:
+            batch_file = client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
+            )
+            batch = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            return batch.id
+        except Exception as e:
+            raise OpenAIAPIError(f"Batch submission failed: {e}")
+
+    def get_text_batch_results(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """Generated text per custom_id once a batch is done, None while it runs
+
+        Requests that failed are missing from the result.
+        """
+        client = self._get_client()
+        try:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in BATCH_PENDING_STATUSES:
+                return None
+
+            results = {}
+            if batch.output_file_id:
+                content = client.files.content(batch.output_file_id).text
+                for line in content.splitlines():
+                    entry = json.loads(line)
+                    response = entry.get("response") or {}
+                    if response.get("status_code") != 200:
+                        continue
+
+                    body = response["body"]
+                    usage = body.get("usage") or {}
+                    record_usage(
+                        "openai",
+                        prompt_tokens=usage.get("prompt_tokens", 0),
+                        completion_tokens=usage.get("completion_tokens", 0),
+                    )
+                    results[entry["custom_id"]] = body["choices"][0]["message"]["content"]
+            return results
+        except Exception as e:
+            raise OpenAIAPIError(f"Reading batch {batch_id} failed: {e}")
+
     def configure(self) -> bool:
         """Sets up OpenAI API authentication"""
         logger.info("\n🤖 OPENAI API SETUP")
@@ -187,12 +304,31 @@ class OpenAIConnection(BaseConnection):
                     {"role": "user", "content": prompt},
                 ],
             )
+            record_openai_usage("openai", completion)
 
             return completion.choices[0].message.content
 
         except Exception as e:
             raise OpenAIAPIError(f"Text generation failed: {e}")
 
+    def generate_text_stream(
+        self, prompt: str, system_prompt: str, model: str = None, **kwargs
+    ) -> Iterator[str]:
+        """Stream text generated by OpenAI models as it is produced"""
+        # Use configured model if none provided
+        if not model:
+            model = self.config["model"]
+
+        return stream_chat_completion(
+            self._get_client(),
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            error_class=OpenAIAPIError,
+        )
+
     def generate_strategy_action(
         self,
         prompt: str,
@@ -209,95 +345,7 @@ class OpenAIConnection(BaseConnection):
             if not model:
                 model = self.config["model"]
 
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "swap-to-single",
-                        "description": " ".join(strategies["swap_to_single"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "tokens_in": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "The token addresses to sell. Item must be a supported token.",
-                                },
-                                "token_out": {
-                                    "type": "string",
-                                    "description": "The token address to buy. Must be a supported token.",
-                                },
-                            },
-                            "required": ["tokens_in", "token_out"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "swap-to-many",
-                        "description": " ".join(strategies["swap_to_many"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "token_in": {
-                                    "type": "string",
-                                    "description": "The token address to sell. Must be a supported token.",
-                                },
-                                "tokens_out": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "The token addresses to buy. Item must be a supported token.",
-                                },
-                            },
-                            "required": ["token_in", "tokens_out"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "adjust-split-ratio",
-                        "description": " ".join(strategies["adjust_split_ratio"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "ratio": {
-                                    "type": "array",
-                                    "items": {"type": "number"},
-                                    "description": "Sum must always be 10000.",
-                                }
-                            },
-                            "required": ["ratio"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "none",
-                        "description": " ".join(strategies["none"]),
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "message": {
-                                    "type": "string",
-                                    "description": "The reason why you used this function",
-                                }
-                            },
-                            "required": ["message"],
-                            "additionalProperties": False,
-                        },
-                        "strict": True,
-                    },
-                },
-            ]
+            tools = get_strategy_tools(strategies)
 
             completion = client.chat.completions.create(
                 model=model,
@@ -307,6 +355,7 @@ class OpenAIConnection(BaseConnection):
                 ],
                 tools=tools,
             )
+            record_openai_usage("openai", completion)
 
             return completion.choices[0].message.tool_calls
 
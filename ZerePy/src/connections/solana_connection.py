@@ -2,9 +2,11 @@ import logging
 import os
 import requests
 import asyncio
+import threading
 from typing import Dict, Any, Optional
 
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers import workers
 from src.types import JupiterTokenData
 from src.constants import LAMPORTS_PER_SOL, SPL_TOKENS
 from src.helpers.solana.pumpfun import PumpfunTokenManager
@@ -48,17 +50,58 @@ class SolanaConnection(BaseConnection):
         logger.info("Initializing Solana connection...")
         super().__init__(config)
 
+        self._wallet: Optional[Keypair] = None
+        self._lock = threading.Lock()
+
+        # The RPC client and Jupiter instance are bound to the loop they are created on
+        self._clients: Dict[asyncio.AbstractEventLoop, AsyncClient] = {}
+        self._jupiters: Dict[asyncio.AbstractEventLoop, Jupiter] = {}
+
+        # Private loop backing the sync facade used by the CLI
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
     @property
     def is_llm_provider(self) -> bool:
         return False
 
     def _get_connection_async(self) -> AsyncClient:
-        conn = AsyncClient(self.config["rpc"])
-        return conn
-
-    def _get_wallet(self):
-        creds = self._get_credentials()
-        return Keypair.from_base58_string(creds["SOLANA_PRIVATE_KEY"])
+        """Get the RPC client for the running event loop, created once per loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for stale in [l for l in self._clients if l.is_closed()]:
+                self._clients.pop(stale, None)
+                self._jupiters.pop(stale, None)
+
+            if loop not in self._clients:
+                self._clients[loop] = AsyncClient(self.config["rpc"])
+            return self._clients[loop]
+
+    def _get_wallet(self) -> Keypair:
+        if self._wallet is None:
+            creds = self._get_credentials()
+            self._wallet = Keypair.from_base58_string(creds["SOLANA_PRIVATE_KEY"])
+        return self._wallet
+
+    def _get_jupiter_async(self) -> Jupiter:
+        """Get the Jupiter client for the running event loop"""
+        async_client = self._get_connection_async()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._jupiters:
+                self._jupiters[loop] = self._get_jupiter(self._get_wallet(), async_client)
+            return self._jupiters[loop]
+
+    def _run(self, coro):
+        """Run a coroutine on the private loop and block until it finishes"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="solana-connection",
+                    daemon=True,
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
 
     def _get_credentials(self) -> Dict[str, str]:
         """Get Solana credentials from environment with validation"""
@@ -245,6 +288,8 @@ class SolanaConnection(BaseConnection):
 
             set_key(".env", "SOLANA_PRIVATE_KEY", private_key)
             load_dotenv(override=True)
+            self._wallet = None
+            self._jupiters.clear()
 
             logger.info("\n✅ Solana configuration successfully saved!")
             logger.info("Your private key has been stored in the .env file.")
@@ -283,22 +328,26 @@ class SolanaConnection(BaseConnection):
                 logger.debug(f"Solana Configuration validation failed: {error_msg}")
             return False
 
-    def transfer(
+    async def transfer_async(
         self, to_address: str, amount: float, token_mint: Optional[str] = None
     ) -> str:
-        res = SolanaTransferHelper.transfer(
+        res = await SolanaTransferHelper.transfer(
             self._get_connection_async(),
             self._get_wallet(),
             to_address,
             amount,
             token_mint,
         )
-        res = asyncio.run(res)
         logger.debug(f"Transferred {amount} to {to_address}\nTransaction ID: {res}")
         return res
 
+    def transfer(
+        self, to_address: str, amount: float, token_mint: Optional[str] = None
+    ) -> str:
+        return self._run(self.transfer_async(to_address, amount, token_mint))
+
     # todo: test on mainnet
-    def trade(
+    async def trade_async(
         self,
         output_mint: str,
         input_amount: float,
@@ -306,41 +355,50 @@ class SolanaConnection(BaseConnection):
         slippage_bps: int = 100,
     ) -> str:
         logger.info(f"Swapping {input_amount} for {output_mint}")
-        wallet = self._get_wallet()
-        async_client = self._get_connection_async()
-        jupiter = self._get_jupiter(wallet, async_client)
-        res = TradeManager.trade(
-            async_client,
-            wallet,
-            jupiter,
+        return await TradeManager.trade(
+            self._get_connection_async(),
+            self._get_wallet(),
+            self._get_jupiter_async(),
             output_mint,
             input_amount,
             input_mint,
             slippage_bps,
         )
-        res = asyncio.run(res)
-        return res
 
-    def get_balance(self, token_address: str = None) -> float:
+    def trade(
+        self,
+        output_mint: str,
+        input_amount: float,
+        input_mint: Optional[str] = SPL_TOKENS["USDC"],
+        slippage_bps: int = 100,
+    ) -> str:
+        return self._run(
+            self.trade_async(output_mint, input_amount, input_mint, slippage_bps)
+        )
+
+    async def get_balance_async(self, token_address: str = None) -> float:
         if not token_address:
             logger.info("Getting SOL balance")
         else:
             logger.info(f"Getting balance for {token_address}")
-        res = SolanaReadHelper.get_balance(
+        return await SolanaReadHelper.get_balance(
             self._get_connection_async(), self._get_wallet(), token_address
         )
-        res = asyncio.run(res)
-        return res
 
-    def stake(self, amount: float) -> str:
+    def get_balance(self, token_address: str = None) -> float:
+        return self._run(self.get_balance_async(token_address))
+
+    async def stake_async(self, amount: float) -> str:
         logger.info(f"Staking {amount} SOL")
-        res = StakeManager.stake_with_jup(
+        res = await StakeManager.stake_with_jup(
             self._get_connection_async(), self._get_wallet(), amount
         )
-        res = asyncio.run(res)
         logger.debug(f"Staked {amount} SOL\nTransaction ID: {res}")
         return res
 
+    def stake(self, amount: float) -> str:
+        return self._run(self.stake_async(amount))
+
     # todo: test on mainnet
     def lend_assets(self, amount: float) -> str:
         return "Not implemented"
@@ -352,13 +410,17 @@ class SolanaConnection(BaseConnection):
         # logger.debug(f"Lent {amount} USDC\nTransaction ID: {res}")
         # return res
 
-    def request_faucet(self) -> str:
+    async def request_faucet_async(self) -> str:
         logger.info("Requesting faucet funds")
-        res = FaucetManager.request_faucet_funds(self)
-        res = asyncio.run(res)
+        res = await FaucetManager.request_faucet_funds(
+            self._get_connection_async(), self._get_wallet()
+        )
         logger.debug(f"Requested faucet funds\nTransaction ID: {res}")
         return res
 
+    def request_faucet(self) -> str:
+        return self._run(self.request_faucet_async())
+
     def deploy_token(self, decimals: int = 9) -> str:
         return "Not implemented"
         # logger.info(f"STUB: Deploy token with {decimals} decimals")
@@ -375,10 +437,13 @@ class SolanaConnection(BaseConnection):
         return SolanaReadHelper.fetch_price(token_id)
 
     # todo: test on mainnet
+    async def get_tps_async(self) -> int:
+        return await SolanaPerformanceTracker.fetch_current_tps(
+            self._get_connection_async()
+        )
+
     def get_tps(self) -> int:
-        res = SolanaPerformanceTracker.fetch_current_tps(self._get_connection_async())
-        res = asyncio.run(res)
-        return res
+        return self._run(self.get_tps_async())
 
     def get_token_by_ticker(self, ticker: str) -> str:
         ticker = ticker.upper()
@@ -428,3 +493,20 @@ class SolanaConnection(BaseConnection):
         method_name = action_name.replace("-", "_")
         method = getattr(self, method_name)
         return method(**kwargs)
+
+    async def perform_action_async(self, action_name: str, kwargs) -> Any:
+        """Execute a Solana action on the caller's event loop"""
+        if action_name not in self.actions:
+            raise KeyError(f"Unknown action: {action_name}")
+
+        action = self.actions[action_name]
+        errors = action.validate_params(kwargs)
+        if errors:
+            raise ValueError(f"Invalid parameters: {', '.join(errors)}")
+
+        method_name = action_name.replace("-", "_")
+        method = getattr(self, f"{method_name}_async", None)
+        if method is None:
+            # Only plain HTTP lookups lack a native async variant
+            return await workers.to_thread(getattr(self, method_name), **kwargs)
+        return await method(**kwargs)
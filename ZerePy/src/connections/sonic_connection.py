@@ -1,14 +1,21 @@
 import logging
 import os
-import requests
+from src.helpers import http
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 from dotenv import load_dotenv, set_key
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from src.constants.abi import ERC20_ABI, STRATEGY_ABI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 from src.constants.networks import SONIC_NETWORKS
+from src.constants.strategy import STRATEGY_TOKENS
+from src.helpers.evm.multicall import ERC20BatchReader, is_native_token
+from src.helpers.evm.token_registry import TokenMetadata, TokenRegistry, to_checksum
+from src.helpers.evm.transactions import GasPriceOracle, NonceManager, is_nonce_error
+from src.helpers.metrics import rpc_middleware
+from src.helpers.tracing import rpc_span_middleware
+from src.helpers.ticker_index import RANK_FDV, TickerIndex
 
 logger = logging.getLogger("connections.sonic_connection")
 
@@ -36,6 +43,11 @@ class SonicConnection(BaseConnection):
         self.explorer = network_config["scanner_url"]
         self.rpc_url = network_config["rpc_url"]
 
+        # Chain id never changes for an endpoint, fetch it once
+        self._chain_id = None
+        self._strategy_contracts = {}
+        self.gas_price_refresh_interval = config.get("gas_price_refresh_interval", 5)
+
         super().__init__(config)
         self._initialize_web3()
         self.ERC20_ABI = ERC20_ABI
@@ -48,18 +60,87 @@ class SonicConnection(BaseConnection):
         return f"{self.explorer}/tx/{tx_hash}"
 
     def _initialize_web3(self):
-        """Initialize Web3 connection"""
+        """Create the Web3 client, the provider only connects on first request"""
         if not self._web3:
             self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
             self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-            if not self._web3.is_connected():
-                raise SonicConnectionError("Failed to connect to Sonic network")
+            self._web3.middleware_onion.add(rpc_middleware("sonic"), name="metrics")
+            self._web3.middleware_onion.add(rpc_span_middleware("sonic"), name="tracing")
+
+    def warm_up(self) -> None:
+        """Check the RPC endpoint is reachable and read the chain id"""
+        self._initialize_web3()
+        if not self._web3.is_connected():
+            raise SonicConnectionError("Failed to connect to Sonic network")
+
+        try:
+            logger.info(f"Connected to network with chain ID: {self.chain_id}")
+        except Exception as e:
+            logger.warning(f"Could not get chain ID: {e}")
+
+    @property
+    def chain_id(self) -> int:
+        """Chain ID of the connected network, read from the node once"""
+        if self._chain_id is None:
+            self._chain_id = self._web3.eth.chain_id
+        return self._chain_id
+
+    def _get_account(self):
+        private_key = os.getenv("SONIC_PRIVATE_KEY")
+        return self._web3.eth.account.from_key(private_key)
+
+    def _get_token(self, token_address: str) -> TokenMetadata:
+        """Token metadata from the process-wide registry, seeded with strategy tokens"""
+        registry = TokenRegistry.instance()
+        registry.seed(self._web3, self.chain_id, STRATEGY_TOKENS.values())
+        return registry.get(self._web3, self.chain_id, token_address)
+
+    def _get_token_contract(self, token_address: str):
+        return TokenRegistry.instance().contract(self._web3, token_address)
+
+    def _get_strategy_contract(self, strategy_address: str):
+        strategy_address = to_checksum(strategy_address)
+        if strategy_address not in self._strategy_contracts:
+            self._strategy_contracts[strategy_address] = self._web3.eth.contract(
+                address=strategy_address, abi=self.STRATEGY_ABI
+            )
+        return self._strategy_contracts[strategy_address]
+
+    def _get_tx_params(self, account) -> Dict[str, Any]:
+        """Common transaction fields, served from local caches instead of RPC"""
+        gas_price_oracle = GasPriceOracle.for_web3(
+            self._web3, self.gas_price_refresh_interval
+        )
+        return {
+            "from": account.address,
+            "gasPrice": gas_price_oracle.get(),
+            "chainId": self.chain_id,
+        }
+
+    def _send_transaction(self, account, tx: Dict[str, Any]):
+        """Assign a nonce to a transaction, then sign and broadcast it
+
+        Nonces come from a process-wide allocator per account, so transactions
+        from many strategies sharing a key can be pipelined without waiting on
+        each other. If the node rejects a nonce the allocator resyncs from the
+        chain and the transaction is retried once.
+        """
+        nonce_manager = NonceManager.for_account(self._web3, account.address)
 
+        for attempt in range(2):
+            nonce = nonce_manager.allocate()
             try:
-                chain_id = self._web3.eth.chain_id
-                logger.info(f"Connected to network with chain ID: {chain_id}")
+                tx["nonce"] = nonce
+                signed = account.sign_transaction(tx)
+                tx_hash = self._web3.eth.send_raw_transaction(signed.rawTransaction)
             except Exception as e:
-                logger.warning(f"Could not get chain ID: {e}")
+                nonce_manager.release(nonce, e)
+                if attempt == 0 and is_nonce_error(e):
+                    logger.warning(f"Nonce {nonce} rejected, resyncing: {e}")
+                    continue
+                raise
+            nonce_manager.release(nonce)
+            return tx_hash
 
     @property
     def is_llm_provider(self) -> bool:
@@ -85,29 +166,7 @@ class SonicConnection(BaseConnection):
             if ticker.lower() in ["s", "S"]:
                 return "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
 
-            response = requests.get(
-                f"https://api.dexscreener.com/latest/dex/search?q={ticker}"
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            if not data.get("pairs"):
-                return None
-
-            sonic_pairs = [
-                pair for pair in data["pairs"] if pair.get("chainId") == "sonic"
-            ]
-            sonic_pairs.sort(key=lambda x: x.get("fdv", 0), reverse=True)
-
-            sonic_pairs = [
-                pair
-                for pair in sonic_pairs
-                if pair.get("baseToken", {}).get("symbol", "").lower() == ticker.lower()
-            ]
-
-            if sonic_pairs:
-                return sonic_pairs[0].get("baseToken", {}).get("address")
-            return None
+            return TickerIndex.instance().resolve(ticker, "sonic", rank=RANK_FDV)
 
         except Exception as error:
             logger.error(f"Error fetching token address: {str(error)}")
@@ -136,6 +195,21 @@ class SonicConnection(BaseConnection):
                 ],
                 description="Get $S or token balance",
             ),
+            "get-portfolio": Action(
+                name="get-portfolio",
+                parameters=[
+                    ActionParameter(
+                        "token_addresses",
+                        True,
+                        str,
+                        "Comma separated token addresses to snapshot",
+                    ),
+                    ActionParameter(
+                        "address", False, str, "Address to snapshot balances for"
+                    ),
+                ],
+                description="Get balances of many tokens in a single round-trip",
+            ),
             "transfer": Action(
                 name="transfer",
                 parameters=[
@@ -232,13 +306,11 @@ class SonicConnection(BaseConnection):
                 account = self._web3.eth.account.from_key(private_key)
                 address = account.address
 
-            if token_address:
-                contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_address), abi=self.ERC20_ABI
-                )
+            if token_address and not is_native_token(token_address):
+                token = self._get_token(token_address)
+                contract = self._get_token_contract(token_address)
                 balance = contract.functions.balanceOf(address).call()
-                decimals = contract.functions.decimals().call()
-                return balance / (10**decimals)
+                return balance / (10**token.decimals)
             else:
                 balance = self._web3.eth.get_balance(address)
                 return self._web3.from_wei(balance, "ether")
@@ -247,44 +319,65 @@ class SonicConnection(BaseConnection):
             logger.error(f"Failed to get balance: {e}")
             raise
 
+    def get_portfolio(
+        self, token_addresses: Union[str, List[str]], address: Optional[str] = None
+    ) -> Dict[str, Optional[float]]:
+        """Snapshot the balances of many tokens for an address in one Multicall3 call
+
+        Tokens whose balance could not be read map to None.
+        """
+        try:
+            if isinstance(token_addresses, str):
+                token_addresses = [
+                    token.strip() for token in token_addresses.split(",") if token.strip()
+                ]
+
+            if not address:
+                address = self._get_account().address
+
+            registry = TokenRegistry.instance()
+            registry.seed(self._web3, self.chain_id, STRATEGY_TOKENS.values())
+            tokens = registry.get_many(self._web3, self.chain_id, token_addresses)
+
+            batch = ERC20BatchReader(self._web3)
+            reads = {token: batch.balance_of(token, address) for token in tokens}
+            results = batch.execute()
+
+            portfolio = {token: None for token in token_addresses}
+            for token, balance in reads.items():
+                if results[balance] is not None:
+                    portfolio[token] = results[balance] / (10 ** tokens[token].decimals)
+            return portfolio
+
+        except Exception as e:
+            logger.error(f"Failed to get portfolio: {e}")
+            raise
+
     def transfer(
         self, to_address: str, amount: float, token_address: Optional[str] = None
     ) -> str:
         """Transfer $S or tokens to an address"""
         try:
-            private_key = os.getenv("SONIC_PRIVATE_KEY")
-            account = self._web3.eth.account.from_key(private_key)
-            chain_id = self._web3.eth.chain_id
+            account = self._get_account()
+            tx_params = self._get_tx_params(account)
 
             if token_address:
-                contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_address), abi=self.ERC20_ABI
-                )
-                decimals = contract.functions.decimals().call()
+                contract = self._get_token_contract(token_address)
+                decimals = self._get_token(token_address).decimals
                 amount_raw = int(amount * (10**decimals))
 
                 tx = contract.functions.transfer(
-                    Web3.to_checksum_address(to_address), amount_raw
-                ).build_transaction(
-                    {
-                        "from": account.address,
-                        "nonce": self._web3.eth.get_transaction_count(account.address),
-                        "gasPrice": self._web3.eth.gas_price,
-                        "chainId": chain_id,
-                    }
-                )
+                    to_checksum(to_address), amount_raw
+                ).build_transaction(tx_params)
             else:
                 tx = {
-                    "nonce": self._web3.eth.get_transaction_count(account.address),
-                    "to": Web3.to_checksum_address(to_address),
+                    **tx_params,
+                    "to": to_checksum(to_address),
                     "value": self._web3.to_wei(amount, "ether"),
                     "gas": 21000,
-                    "gasPrice": self._web3.eth.gas_price,
-                    "chainId": chain_id,
                 }
 
-            signed = account.sign_transaction(tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed.rawTransaction)
+            tx_hash = self._send_transaction(account, tx)
 
             # Log and return explorer link immediately
             tx_link = self._get_explorer_link(tx_hash.hex())
@@ -303,10 +396,7 @@ class SonicConnection(BaseConnection):
             if token_in.lower() == self.SONIC_COIN.lower():
                 amount_raw = self._web3.to_wei(amount_in, "ether")
             else:
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_in), abi=self.ERC20_ABI
-                )
-                decimals = token_contract.functions.decimals().call()
+                decimals = self._get_token(token_in).decimals
                 amount_raw = int(amount_in * (10**decimals))
 
             # Set up API request
@@ -319,7 +409,7 @@ class SonicConnection(BaseConnection):
                 "gasInclude": "true",
             }
 
-            response = requests.get(url, headers=headers, params=params)
+            response = http.get(url, headers=headers, params=params)
             response.raise_for_status()
 
             data = response.json()
@@ -335,8 +425,7 @@ class SonicConnection(BaseConnection):
     def _get_encoded_swap_data(self, route_summary: Dict, slippage: float = 0.5) -> str:
         """Get encoded swap data from Kyberswap API"""
         try:
-            private_key = os.getenv("SONIC_PRIVATE_KEY")
-            account = self._web3.eth.account.from_key(private_key)
+            account = self._get_account()
 
             url = f"{self.aggregator_api}/route/build"
             headers = {"x-client-id": "zerepy"}
@@ -350,7 +439,7 @@ class SonicConnection(BaseConnection):
                 "source": "ZerePyBot",
             }
 
-            response = requests.post(url, headers=headers, json=payload)
+            response = http.post(url, headers=headers, json=payload)
             response.raise_for_status()
 
             data = response.json()
@@ -368,12 +457,9 @@ class SonicConnection(BaseConnection):
     ) -> None:
         """Handle token approval for spender"""
         try:
-            private_key = os.getenv("SONIC_PRIVATE_KEY")
-            account = self._web3.eth.account.from_key(private_key)
+            account = self._get_account()
 
-            token_contract = self._web3.eth.contract(
-                address=Web3.to_checksum_address(token_address), abi=self.ERC20_ABI
-            )
+            token_contract = self._get_token_contract(token_address)
 
             # Check current allowance
             current_allowance = token_contract.functions.allowance(
@@ -383,19 +469,9 @@ class SonicConnection(BaseConnection):
             if current_allowance < amount:
                 approve_tx = token_contract.functions.approve(
                     spender_address, amount
-                ).build_transaction(
-                    {
-                        "from": account.address,
-                        "nonce": self._web3.eth.get_transaction_count(account.address),
-                        "gasPrice": self._web3.eth.gas_price,
-                        "chainId": self._web3.eth.chain_id,
-                    }
-                )
+                ).build_transaction(self._get_tx_params(account))
 
-                signed_approve = account.sign_transaction(approve_tx)
-                tx_hash = self._web3.eth.send_raw_transaction(
-                    signed_approve.rawTransaction
-                )
+                tx_hash = self._send_transaction(account, approve_tx)
                 logger.info(
                     f"Approval transaction sent: {self._get_explorer_link(tx_hash.hex())}"
                 )
@@ -412,8 +488,7 @@ class SonicConnection(BaseConnection):
     ) -> str:
         """Execute a token swap using the KyberSwap router"""
         try:
-            private_key = os.getenv("SONIC_PRIVATE_KEY")
-            account = self._web3.eth.account.from_key(private_key)
+            account = self._get_account()
 
             # Check token balance before proceeding
             current_balance = self.get_balance(
@@ -447,21 +522,15 @@ class SonicConnection(BaseConnection):
                 ):  # $S token
                     amount_raw = self._web3.to_wei(amount, "ether")
                 else:
-                    token_contract = self._web3.eth.contract(
-                        address=Web3.to_checksum_address(token_in), abi=self.ERC20_ABI
-                    )
-                    decimals = token_contract.functions.decimals().call()
+                    decimals = self._get_token(token_in).decimals
                     amount_raw = int(amount * (10**decimals))
                 self._handle_token_approval(token_in, router_address, amount_raw)
 
             # Prepare transaction
             tx = {
-                "from": account.address,
-                "to": Web3.to_checksum_address(router_address),
+                **self._get_tx_params(account),
+                "to": to_checksum(router_address),
                 "data": encoded_data,
-                "nonce": self._web3.eth.get_transaction_count(account.address),
-                "gasPrice": self._web3.eth.gas_price,
-                "chainId": self._web3.eth.chain_id,
                 "value": (
                     self._web3.to_wei(amount, "ether")
                     if token_in.lower() == self.SONIC_COIN.lower()
@@ -477,8 +546,7 @@ class SonicConnection(BaseConnection):
                 tx["gas"] = 500000  # Default gas limit
 
             # Sign and send transaction
-            signed_tx = account.sign_transaction(tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = self._send_transaction(account, tx)
 
             # Log and return explorer link immediately
             tx_link = self._get_explorer_link(tx_hash.hex())
@@ -491,29 +559,17 @@ class SonicConnection(BaseConnection):
     def strategy(self, strategy_address: str, action: int, data: str) -> str:
         """Execute a strategy action"""
         try:
-            private_key = os.getenv("SONIC_PRIVATE_KEY")
-
-            account = self._web3.eth.account.from_key(private_key)
-            chain_id = self._web3.eth.chain_id
+            account = self._get_account()
 
-            contract = self._web3.eth.contract(
-                address=Web3.to_checksum_address(strategy_address),
-                abi=self.STRATEGY_ABI,
-            )
+            contract = self._get_strategy_contract(strategy_address)
 
             params = {"action": action, "data": data}
 
             tx = contract.functions.executeCall(params).build_transaction(
-                {
-                    "from": account.address,
-                    "nonce": self._web3.eth.get_transaction_count(account.address),
-                    "gasPrice": self._web3.eth.gas_price,
-                    "chainId": chain_id,
-                }
+                self._get_tx_params(account)
             )
 
-            signed = account.sign_transaction(tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed.rawTransaction)
+            tx_hash = self._send_transaction(account, tx)
 
             return tx_hash.hex()
 
@@ -528,7 +584,7 @@ class SonicConnection(BaseConnection):
 
         load_dotenv()
 
-        if not self.is_configured(verbose=True):
+        if not self.is_healthy(verbose=True):
             raise SonicConnectionError("Sonic is not properly configured")
 
         action = self.actions[action_name]
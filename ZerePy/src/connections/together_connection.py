@@ -1,11 +1,12 @@
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 from dotenv import load_dotenv, set_key
 from together import Together
 from together.types.models import ModelObject, ModelType
 
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
+from src.helpers.streaming import stream_chat_completion
 
 logger = logging.getLogger("connections.together_ai_connection")
 
@@ -55,6 +56,15 @@ class TogetherAIConnection(BaseConnection):
                 ],
                 description="Generate text using Together AI models"
             ),
+            "generate-text-stream": Action(
+                name="generate-text-stream",
+                parameters=[
+                    ActionParameter("prompt", True, str, "The input prompt for text generation"),
+                    ActionParameter("system_prompt", True, str, "System prompt to guide the model"),
+                    ActionParameter("model", False, str, "Model to use for generation")
+                ],
+                description="Stream generated text using Together AI models"
+            ),
             "check-model": Action(
                 name="check-model",
                 parameters=[
@@ -151,6 +161,24 @@ class TogetherAIConnection(BaseConnection):
         except Exception as e:
             raise TogetherAIAPIError(f"Text generation failed: {e}")
 
+    def generate_text_stream(
+        self, prompt: str, system_prompt: str, model: str = None, **kwargs
+    ) -> Iterator[str]:
+        """Stream text generated by Together AI models as it is produced"""
+        # Use configured model if none provided
+        if not model:
+            model = self.config["model"]
+
+        return stream_chat_completion(
+            self._get_client(),
+            model=model,
+            messages=[
+                {"role": "user", "content": prompt},
+                {"role": "system", "content": system_prompt},
+            ],
+            error_class=TogetherAIAPIError,
+        )
+
     def check_model(self, model: str, **kwargs) -> bool:
         try:
             client = self._get_client()
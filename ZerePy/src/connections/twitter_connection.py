@@ -5,6 +5,8 @@ from requests_oauthlib import OAuth1Session
 from dotenv import set_key, load_dotenv
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 from src.helpers import print_h_bar
+from src.helpers.rate_limiter import RateLimiter
+from src.helpers.tracing import span
 
 logger = logging.getLogger("connections.twitter_connection")
 
@@ -140,7 +142,17 @@ class TwitterConnection(BaseConnection):
             oauth = self._get_oauth()
             full_url = f"https://api.twitter.com/2/{endpoint.lstrip('/')}"
 
-            response = getattr(oauth, method.lower())(full_url, **kwargs)
+            # X budgets each endpoint family separately per credential
+            family = endpoint.lstrip('/').split('/')[0].split('?')[0]
+            limiter = RateLimiter.for_key(
+                "twitter", f"{oauth.auth.client.client_key}:{method.lower()}:{family}"
+            )
+            with limiter.limit(), span(
+                "http.request", method=method.upper(), host="api.twitter.com", endpoint=family
+            ) as current:
+                response = getattr(oauth, method.lower())(full_url, **kwargs)
+                current.set_attribute("status_code", response.status_code)
+            limiter.observe(response.headers, response.status_code)
 
             if response.status_code not in [200, 201]:
                 logger.error(
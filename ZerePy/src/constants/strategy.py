@@ -1,3 +1,11 @@
+# Token addresses strategies trade on Sonic, keep in sync with BASE_STRATEGY_BIO
+STRATEGY_TOKENS = {
+    "SONIC": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
+    "BTC": "0xc63B428bE56819B7099B51C9Eba72d0dC9fD92CD",
+    "ETH": "0x34Bb5F9450736c700dfCd63daeCa30a3bBDdAC80",
+    "USDT": "0x8469B773f209bAD3aCDB077c58756643abAF7952",
+}
+
 BASE_STRATEGY_BIO = [
     "You have an access to an underlying smart contract holding the supported tokens, and you call the smart contract function to execute your strategy.",
     """
@@ -0,0 +1,183 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+from src.database.mongo_db import MongoDB
+from src.helpers.metrics import MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, timed
+
+logger = logging.getLogger("activity_writer")
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+MAX_ATTEMPTS = 3
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _write_concern_from_env() -> WriteConcern:
+    w = os.getenv("ZEREPY_ACTIVITY_WRITE_CONCERN", "1")
+    return WriteConcern(w=int(w) if w.isdigit() else w)
+
+
+class ActivityWriter:
+    """Process-wide buffered sink for activity and event records.
+
+    Agents enqueue records without waiting on the database. A background
+    thread groups them per collection and writes them with insert_many once
+    `batch_size` records are pending or `flush_interval` seconds have passed.
+    """
+
+    _instance: Optional["ActivityWriter"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        mongo_db: Optional[MongoDB] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        write_concern: Optional[WriteConcern] = None,
+    ):
+        self.mongo_db = mongo_db or MongoDB()
+        self.batch_size = batch_size or int(
+            os.getenv("ZEREPY_ACTIVITY_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        )
+        self.flush_interval = flush_interval or float(
+            os.getenv("ZEREPY_ACTIVITY_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+        )
+        self.write_concern = write_concern or _write_concern_from_env()
+
+        self._queue: "queue.Queue[Tuple[str, dict]]" = queue.Queue()
+        self._flush_requested = threading.Event()
+        self._flushed = threading.Condition()
+        self._closed = False
+        # Shared by write and close, so no record is queued after the final drain
+        self._close_lock = threading.Lock()
+
+        self._thread = threading.Thread(
+            target=self._run, name="activity-writer", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def instance(cls) -> "ActivityWriter":
+        """Get the shared writer, created on first use and flushed at exit"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.close)
+            return cls._instance
+
+    def write(self, collection_name: str, record: dict) -> None:
+        """Queue a record for insertion, never blocks on the database"""
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("ActivityWriter is closed")
+            self._queue.put((collection_name, record))
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_requested.set()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._flushed:
+            while self._queue.unfinished_tasks:
+                self._flush_requested.set()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._flushed.wait(remaining if remaining is not None else 0.5)
+        return True
+
+    def close(self, timeout: float = 10) -> None:
+        """Stop accepting records, write the pending ones and stop the background thread
+
+        Closing the shared writer detaches it, the next instance() call
+        starts a new one.
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        with ActivityWriter._instance_lock:
+            if ActivityWriter._instance is self:
+                ActivityWriter._instance = None
+
+        self._flush_requested.set()
+        self._thread.join(timeout=timeout)
+
+    def _drain(self) -> List[Tuple[str, dict]]:
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _insert(self, collection_name: str, records: List[dict]) -> None:
+        collection = self.mongo_db.sync_db.get_collection(
+            collection_name, write_concern=self.write_concern
+        )
+
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                with timed(
+                    MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, collection_name, "insert_many"
+                ):
+                    collection.insert_many(records, ordered=False)
+                return
+            except BulkWriteError as e:
+                # The rest were inserted and now carry an _id, resending them
+                # would only fail as duplicates. A write concern error alone
+                # leaves nothing to resend.
+                failed = {
+                    write_error["index"]
+                    for write_error in e.details.get("writeErrors", [])
+                    if write_error.get("code") != DUPLICATE_KEY_ERROR
+                }
+                records = [records[index] for index in sorted(failed)]
+                if not records:
+                    return
+                error = e
+            except Exception as e:
+                error = e
+
+            if attempt == MAX_ATTEMPTS - 1:
+                logger.error(
+                    f"Dropping {len(records)} {collection_name} records after "
+                    f"{MAX_ATTEMPTS} attempts: {error}"
+                )
+                return
+            logger.warning(f"Writing {len(records)} {collection_name} records failed: {error}")
+            time.sleep(2**attempt)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._flush_requested.wait(timeout=self.flush_interval)
+            self._flush_requested.clear()
+            self._write_pending()
+        # Closed, nothing can be queued anymore, so this last drain gets the rest
+        self._write_pending()
+
+    def _write_pending(self) -> None:
+        records = self._drain()
+        if not records:
+            return
+
+        by_collection: Dict[str, List[dict]] = {}
+        for collection_name, record in records:
+            by_collection.setdefault(collection_name, []).append(record)
+
+        for collection_name, batch in by_collection.items():
+            self._insert(collection_name, batch)
+
+        for _ in records:
+            self._queue.task_done()
+        with self._flushed:
+            self._flushed.notify_all()
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.database.mongo_db import MongoDB
+
+logger = logging.getLogger("agent_cache")
+
+DEFAULT_TTL = 30
+MAX_ENTRIES = 1024
+
+
+def _default_serialize(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass
+class CachedValue:
+    value: Any
+    body: bytes
+    etag: str
+    stored_at: float
+
+
+class AgentCache:
+    """Read-through cache for agent documents and agent list queries.
+
+    Entries are keyed by strategy_address or by the canonical list query,
+    together with the serializer, so every view of a document gets its own
+    body and ETag regardless of which caller filled the cache first.
+    The server invalidates them on its own writes. Writes made by other
+    nodes are picked up through an optional Mongo change stream, or at the
+    latest once the TTL expires. Each entry keeps its serialized body and an
+    ETag so unchanged documents can be answered with 304.
+    """
+
+    _instance: Optional["AgentCache"] = None
+
+    def __init__(
+        self,
+        mongo_db: Optional[MongoDB] = None,
+        ttl: Optional[float] = None,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.mongo_db = mongo_db or MongoDB()
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("ZEREPY_AGENT_CACHE_TTL", DEFAULT_TTL)
+        )
+        self.max_entries = max_entries
+
+        # (key, serializer) -> entry
+        self._agents: "OrderedDict[Tuple[str, Callable], CachedValue]" = OrderedDict()
+        self._lists: "OrderedDict[Tuple[str, Callable], CachedValue]" = OrderedDict()
+        self._watch_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def instance(cls) -> "AgentCache":
+        """Get the cache shared by the server and the agents it loads"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return f'"{hashlib.sha1(body).hexdigest()}"'
+
+    def _lookup(
+        self,
+        entries: "OrderedDict[Tuple[str, Callable], CachedValue]",
+        key: Tuple[str, Callable],
+    ) -> Optional[CachedValue]:
+        entry = entries.get(key)
+        if entry and time.monotonic() - entry.stored_at < self.ttl:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def _store(
+        self,
+        entries: "OrderedDict[Tuple[str, Callable], CachedValue]",
+        key: Tuple[str, Callable],
+        value: Any,
+        serialize: Callable[[Any], bytes],
+    ) -> CachedValue:
+        body = serialize(value)
+        entry = CachedValue(value, body, self.etag_for(body), time.monotonic())
+        entries[key] = entry
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return entry
+
+    async def get_agent(
+        self,
+        strategy_address: str,
+        serialize: Callable[[Any], bytes] = _default_serialize,
+    ) -> Optional[CachedValue]:
+        """Get an agent document, reading it from Mongo on a miss"""
+        key = (strategy_address, serialize)
+        if entry := self._lookup(self._agents, key):
+            return entry
+
+        document = await self.mongo_db.find_one(
+            collection_name="agents", query={"strategy_address": strategy_address}
+        )
+        if document is None:
+            return None
+        return self._store(self._agents, key, document, serialize)
+
+    async def list_agents(
+        self,
+        query: Optional[dict],
+        page: int,
+        limit: int,
+        serialize: Callable[[Any], bytes] = _default_serialize,
+    ) -> CachedValue:
+        """Get a page of agents, reading it from Mongo on a miss"""
+        key = (json.dumps([query, page, limit], sort_keys=True, default=str), serialize)
+        if entry := self._lookup(self._lists, key):
+            return entry
+
+        items, _ = await self.mongo_db.find(
+            collection_name="agents", page=page, limit=limit, query=query
+        )
+        return self._store(self._lists, key, items, serialize)
+
+    def invalidate(self, strategy_address: Optional[str] = None) -> None:
+        """Drop a cached agent, or every agent when no address is given.
+
+        List pages may contain any agent, so they are always dropped.
+        """
+        if strategy_address is None:
+            self._agents.clear()
+        else:
+            for key in [key for key in self._agents if key[0] == strategy_address]:
+                del self._agents[key]
+        self._lists.clear()
+
+    def start_watching(self) -> None:
+        """Invalidate entries from a change stream on the agents collection.
+
+        Change streams need a replica set, so this is opt-in through
+        ZEREPY_AGENT_CACHE_CHANGE_STREAM for multi-node deployments.
+        """
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self) -> None:
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._watch_task = None
+
+    async def _watch(self) -> None:
+        collection = self.mongo_db.db["agents"]
+        while True:
+            try:
+                async with collection.watch(full_document="updateLookup") as stream:
+                    logger.info("Watching agents collection for changes")
+                    async for change in stream:
+                        document = change.get("fullDocument") or {}
+                        # Deletes carry no document, drop everything
+                        self.invalidate(document.get("strategy_address"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Agents change stream failed, retrying: {e}")
+                self.invalidate()
+                await asyncio.sleep(5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "agents": len(self._agents),
+            "lists": len(self._lists),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
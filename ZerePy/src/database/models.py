@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+from src.helpers.decision_cache import DEFAULT_TTL
 
 
 class ConfigItem(BaseModel):
@@ -11,6 +12,7 @@ class ConfigItem(BaseModel):
     network: Optional[str] = None
     api_key: Optional[str] = None
     is_llm: Optional[bool] = None
+    health_check_ttl: Optional[int] = None
 
 
 class TaskItem(BaseModel):
@@ -18,6 +20,21 @@ class TaskItem(BaseModel):
     weight: int
 
 
+class DecisionCacheConfig(BaseModel):
+    policy: Optional[str] = None
+    # Stored even when unset, so the default has to be spelled out here for
+    # null to keep meaning "no expiry"
+    ttl: Optional[int] = DEFAULT_TTL
+
+
+class LLMRoutingConfig(BaseModel):
+    providers: Optional[List[str]] = None
+    hedge: Optional[bool] = None
+    hedge_quantile: Optional[float] = None
+    hedge_after: Optional[float] = None
+    cooldown: Optional[float] = None
+
+
 class Strategy(BaseModel):
     swap_to_single: List[str]
     swap_to_many: List[str]
@@ -46,6 +63,9 @@ class AgentJson(BaseModel):
     creator: str
     base_strategy_address: Optional[str] = None
     strategies: Strategy
+    decision_cache: Optional[DecisionCacheConfig] = None
+    llm_routing: Optional[LLMRoutingConfig] = None
+    batch_tasks: Optional[List[str]] = None
 
 
 class Post(BaseModel):
@@ -67,3 +87,27 @@ class Chat(BaseModel):
     text: Optional[str]
     timestamp: int
     receiver: Optional[str]
+
+
+class AgentPage(BaseModel):
+    items: List[AgentJson]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class PostPage(BaseModel):
+    items: List[Post]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class ActivityPage(BaseModel):
+    items: List[Activity]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class ChatPage(BaseModel):
+    items: List[Chat]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
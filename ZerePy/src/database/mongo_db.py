@@ -1,33 +1,121 @@
+import base64
+import json
 import os
 import logging
-from pymongo import MongoClient
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from src.helpers.metrics import MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, timed
+from src.helpers.tracing import span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mongo_db")
 
+# Activities that produced a transaction, the only ones served to clients
+HAS_TX_HASH = {"tx_hash": {"$type": "string"}}
+
+# Indexes backing the lookups made by the server, created at startup
+INDEXES = {
+    "agents": [
+        IndexModel([("strategy_address", ASCENDING)]),
+        IndexModel([("creator", ASCENDING), ("visibility", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("visibility", ASCENDING), ("_id", DESCENDING)]),
+    ],
+    "chats": [
+        IndexModel(
+            [
+                ("sender", ASCENDING),
+                ("receiver", ASCENDING),
+                ("timestamp", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+    ],
+    "posts": [
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "activities": [
+        IndexModel(
+            [("initiator", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            partialFilterExpression=HAS_TX_HASH,
+            name="initiator_timestamp_with_tx",
+        ),
+    ],
+}
+
+COUNT_CACHE_TTL = 30
+# Distinct filtered counts kept, the least recently used are evicted first
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def encode_cursor(sort_value: Any, _id: ObjectId) -> str:
+    payload = json.dumps([sort_value, str(_id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        sort_value, _id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, ObjectId(_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+# MONGO_URL -> (async client, sync client), shared by every MongoDB instance
+_clients: Dict[str, Tuple[AsyncIOMotorClient, MongoClient]] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_clients(url: str) -> Tuple[AsyncIOMotorClient, MongoClient]:
+    """Connection pools are per client, so open them once per URL"""
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = (AsyncIOMotorClient(url), MongoClient(url))
+        return _clients[url]
+
 
 class MongoDB:
     def __init__(self):
         load_dotenv()
-        client = AsyncIOMotorClient(os.getenv("MONGO_URL"))
-        sync_client = MongoClient(os.getenv("MONGO_URL"))
+        client, sync_client = _get_clients(os.getenv("MONGO_URL"))
 
         self.db = client.get_database("test")
         self.sync_db = sync_client.get_database("test")
 
+        # (collection, canonical query) -> (counted_at, count)
+        self._counts: "OrderedDict[Tuple[str, str], Tuple[float, int]]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        """Create the indexes used by the server's queries, a no-op when they exist"""
+        for collection_name, indexes in INDEXES.items():
+            await self.db[collection_name].create_indexes(indexes)
+        logger.info("MongoDB indexes are in place")
+
     async def insert_one(self, collection_name: str, data: dict):
         collection = self.db[collection_name]
-        await collection.insert_one(data)
+        with timed(MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, collection_name, "insert_one"), span(
+            "mongo.insert_one", collection=collection_name
+        ):
+            await collection.insert_one(data)
 
     def insert_one_sync(self, collection_name: str, data: dict):
         collection = self.sync_db[collection_name]
-        collection.insert_one(data)
+        with timed(MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, collection_name, "insert_one"), span(
+            "mongo.insert_one", collection=collection_name
+        ):
+            collection.insert_one(data)
 
     async def update_one(self, collection_name: str, query: dict, data: dict):
         collection = self.db[collection_name]
-        result = await collection.update_one(query, {"$set": data})
+        with timed(MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, collection_name, "update_one"), span(
+            "mongo.update_one", collection=collection_name
+        ):
+            result = await collection.update_one(query, {"$set": data})
         return result.modified_count
 
     async def find_one(self, collection_name, query: dict):
@@ -35,6 +123,28 @@ class MongoDB:
         result = await collection.find_one(query)
         return result
 
+    async def count(self, collection_name: str, query: dict = None) -> int:
+        """Count matching documents, cached briefly since exact counts scan the index
+
+        Unfiltered counts use the collection metadata estimate.
+        """
+        collection = self.db[collection_name]
+        if not query:
+            return await collection.estimated_document_count()
+
+        key = (collection_name, json.dumps(query, sort_keys=True, default=str))
+        cached = self._counts.get(key)
+        if cached and time.monotonic() - cached[0] < COUNT_CACHE_TTL:
+            self._counts.move_to_end(key)
+            return cached[1]
+
+        total = await collection.count_documents(query)
+        self._counts[key] = (time.monotonic(), total)
+        self._counts.move_to_end(key)
+        while len(self._counts) > COUNT_CACHE_MAX_ENTRIES:
+            self._counts.popitem(last=False)
+        return total
+
     async def find(
         self,
         collection_name,
@@ -52,5 +162,62 @@ class MongoDB:
             cursor = cursor.sort(sort_field, sort_order)
 
         items = await cursor.to_list(length=limit)
-        total = await collection.count_documents({})
+        total = await self.count(collection_name, query)
         return items, total
+
+    async def find_page(
+        self,
+        collection_name: str,
+        limit: int,
+        query: dict = None,
+        sort_field: str = "_id",
+        sort_order: int = DESCENDING,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Keyset pagination, returns a page of items and the cursor of the next page
+
+        The cursor encodes the (sort_field, _id) of the last item, so every
+        page is a bounded index range scan instead of a growing skip.
+        """
+        collection = self.db[collection_name]
+        conditions = [query] if query else []
+
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor)
+            op = "$lt" if sort_order == DESCENDING else "$gt"
+            if sort_field == "_id":
+                conditions.append({"_id": {op: last_id}})
+            else:
+                conditions.append(
+                    {
+                        "$or": [
+                            {sort_field: {op: sort_value}},
+                            {sort_field: sort_value, "_id": {op: last_id}},
+                        ]
+                    }
+                )
+
+        if len(conditions) > 1:
+            filter_ = {"$and": conditions}
+        else:
+            filter_ = conditions[0] if conditions else {}
+
+        sort = [(sort_field, sort_order)]
+        if sort_field != "_id":
+            sort.append(("_id", sort_order))
+
+        # Read one extra item to know whether there is a next page
+        items = await collection.find(filter_).sort(sort).limit(limit + 1).to_list(
+            length=limit + 1
+        )
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(
+                str(last["_id"]) if sort_field == "_id" else last.get(sort_field),
+                last["_id"],
+            )
+
+        return items, next_cursor
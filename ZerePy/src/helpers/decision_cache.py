@@ -0,0 +1,111 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("helpers.decision_cache")
+
+# Reuse any cached decision for an unchanged state
+POLICY_REUSE = "reuse"
+# Only reuse a cached `none` decision, trades are always re-evaluated
+POLICY_REUSE_NONE = "reuse_none"
+# Never reuse, every iteration calls the LLM
+POLICY_ALWAYS_CALL = "always_call"
+
+POLICIES = (POLICY_REUSE, POLICY_REUSE_NONE, POLICY_ALWAYS_CALL)
+
+DEFAULT_POLICY = POLICY_REUSE_NONE
+DEFAULT_TTL = 3600
+MAX_ENTRIES = 32
+
+
+class DecisionCache:
+    """Per-agent memo of strategy decisions keyed on what the LLM was shown.
+
+    The key is a hash of the canonical state prompt, system prompt and
+    strategies, so an iteration that observes nothing new can skip the LLM
+    call when the policy allows reusing the previous decision.
+    """
+
+    def __init__(
+        self,
+        policy: str = DEFAULT_POLICY,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(
+                f"Unknown decision cache policy '{policy}', expected one of {', '.join(POLICIES)}"
+            )
+
+        self.policy = policy
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # key -> (stored_at, action, arguments)
+        self._entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "DecisionCache":
+        """Build a cache from the optional `decision_cache` block of an agent
+
+        A `ttl` of 0 never reuses a decision, and null keeps decisions until
+        the state changes.
+        """
+        config = config or {}
+        return cls(
+            policy=config.get("policy") or DEFAULT_POLICY,
+            ttl=config.get("ttl", DEFAULT_TTL),
+        )
+
+    @staticmethod
+    def make_key(prompt: str, system_prompt: str, strategies: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            [prompt, system_prompt, strategies], sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """Return the reusable (action, arguments) for a key, recording a hit or miss"""
+        decision = None
+
+        if self.policy != POLICY_ALWAYS_CALL and key in self._entries:
+            stored_at, action, arguments = self._entries[key]
+            expired = self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+            if expired:
+                del self._entries[key]
+            elif self.policy == POLICY_REUSE or action == "none":
+                self._entries.move_to_end(key)
+                decision = (action, arguments)
+
+        if decision:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return decision
+
+    def put(self, key: str, action: str, arguments: str) -> None:
+        if self.policy == POLICY_ALWAYS_CALL:
+            return
+
+        self._entries[key] = (time.monotonic(), action, arguments)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
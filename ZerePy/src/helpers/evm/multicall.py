@@ -0,0 +1,121 @@
+import logging
+from typing import Any, List, Optional, Tuple
+
+from web3 import Web3
+
+from src.constants.abi import ERC20_ABI, MULTICALL3_ABI, MULTICALL3_ADDRESS
+
+logger = logging.getLogger("helpers.evm.multicall")
+
+# Zero address is used by callers to mean the chain's native coin
+NATIVE_TOKENS = {
+    "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee",
+    "0x0000000000000000000000000000000000000000",
+}
+
+
+def is_native_token(token_address: Optional[str]) -> bool:
+    return not token_address or token_address.lower() in NATIVE_TOKENS
+
+
+class ERC20BatchReader:
+    """Collects ERC20 reads and resolves them in a single Multicall3 round-trip.
+
+    Each read method queues a call and returns its index into the list that
+    `execute()` returns. Failed calls resolve to None. If Multicall3 is not
+    available on the endpoint the reads fall back to individual eth_calls.
+
+    Example:
+        batch = ERC20BatchReader(web3)
+        balance = batch.balance_of(token, owner)
+        decimals = batch.decimals(token)
+        results = batch.execute()
+        results[balance] / 10 ** results[decimals]
+    """
+
+    def __init__(self, web3: Web3, multicall_address: str = MULTICALL3_ADDRESS):
+        self._web3 = web3
+        self._erc20 = web3.eth.contract(abi=ERC20_ABI)
+        self._multicall = web3.eth.contract(
+            address=Web3.to_checksum_address(multicall_address), abi=MULTICALL3_ABI
+        )
+        # (target, calldata, output types, owner of a native balance read)
+        self._calls: List[Tuple[str, str, List[str], Optional[str]]] = []
+
+    def _queue(
+        self,
+        target: str,
+        call_data: str,
+        output_types: List[str],
+        native_owner: Optional[str] = None,
+    ) -> int:
+        self._calls.append(
+            (Web3.to_checksum_address(target), call_data, output_types, native_owner)
+        )
+        return len(self._calls) - 1
+
+    def _queue_erc20(self, token_address: str, fn_name: str, args: list, output_type: str) -> int:
+        call_data = self._erc20.encodeABI(fn_name=fn_name, args=args)
+        return self._queue(token_address, call_data, [output_type])
+
+    def balance_of(self, token_address: str, owner: str) -> int:
+        """Queue a token balance read, or a native balance read for the native coin"""
+        owner = Web3.to_checksum_address(owner)
+        if is_native_token(token_address):
+            # Multicall3 serves it with getEthBalance, the fallback with eth_getBalance
+            call_data = self._multicall.encodeABI(fn_name="getEthBalance", args=[owner])
+            return self._queue(self._multicall.address, call_data, ["uint256"], owner)
+        return self._queue_erc20(token_address, "balanceOf", [owner], "uint256")
+
+    def decimals(self, token_address: str) -> int:
+        """Queue a decimals read, returns the index of its int result"""
+        return self._queue_erc20(token_address, "decimals", [], "uint8")
+
+    def symbol(self, token_address: str) -> int:
+        """Queue a symbol read, returns the index of its str result"""
+        return self._queue_erc20(token_address, "symbol", [], "string")
+
+    def allowance(self, token_address: str, owner: str, spender: str) -> int:
+        return self._queue_erc20(
+            token_address,
+            "allowance",
+            [Web3.to_checksum_address(owner), Web3.to_checksum_address(spender)],
+            "uint256",
+        )
+
+    def _decode(self, output_types: List[str], data: bytes) -> Optional[Any]:
+        try:
+            return self._web3.codec.decode(output_types, data)[0]
+        except Exception:
+            return None
+
+    def _execute_sequential(self) -> List[Optional[Any]]:
+        results = []
+        for target, call_data, output_types, native_owner in self._calls:
+            try:
+                if native_owner is not None:
+                    results.append(self._web3.eth.get_balance(native_owner))
+                    continue
+                data = self._web3.eth.call({"to": target, "data": call_data})
+                results.append(self._decode(output_types, data))
+            except Exception:
+                results.append(None)
+        return results
+
+    def execute(self) -> List[Optional[Any]]:
+        """Run every queued read and return the decoded results in queue order"""
+        if not self._calls:
+            return []
+
+        try:
+            responses = self._multicall.functions.aggregate3(
+                [(target, True, call_data) for target, call_data, _, _ in self._calls]
+            ).call()
+        except Exception as e:
+            logger.warning(f"Multicall3 unavailable, falling back to eth_call: {e}")
+            return self._execute_sequential()
+
+        return [
+            self._decode(output_types, data) if success else None
+            for (success, data), (_, _, output_types, _) in zip(responses, self._calls)
+        ]
@@ -0,0 +1,202 @@
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from web3 import Web3
+
+from src.constants.abi import ERC20_ABI
+from src.helpers.evm.multicall import ERC20BatchReader, is_native_token
+
+logger = logging.getLogger("helpers.evm.token_registry")
+
+NATIVE_DECIMALS = 18
+
+
+@dataclass(frozen=True)
+class TokenMetadata:
+    chain_id: int
+    address: str
+    decimals: int
+    symbol: Optional[str] = None
+
+
+@lru_cache(maxsize=4096)
+def to_checksum(address: str) -> str:
+    """Memoized Web3.to_checksum_address, which is otherwise keccak per call"""
+    return Web3.to_checksum_address(address)
+
+
+class TokenRegistry:
+    """Process-wide store of immutable ERC20 metadata keyed by (chain id, address).
+
+    Lookups hit an in-memory LRU first, then a local SQLite file, and only go
+    to the chain when neither has the token. Reads from chain are batched
+    through Multicall3, so each token is fetched at most once per deployment.
+    """
+
+    _instance: Optional["TokenRegistry"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, db_path: Optional[str] = None, max_size: int = 2048):
+        self.db_path = db_path or os.getenv(
+            "ZEREPY_TOKEN_DB", str(Path.home() / ".zerepy" / "tokens.db")
+        )
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[Tuple[int, str], TokenMetadata]" = OrderedDict()
+        self._contracts: Dict[Tuple[str, str], object] = {}
+        self._seeded = set()
+        self._db = self._open_db()
+
+    @classmethod
+    def instance(cls) -> "TokenRegistry":
+        """Get the shared registry for this process"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _open_db(self) -> Optional[sqlite3.Connection]:
+        try:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "chain_id INTEGER NOT NULL, address TEXT NOT NULL, "
+                "decimals INTEGER NOT NULL, symbol TEXT, "
+                "PRIMARY KEY (chain_id, address))"
+            )
+            db.commit()
+            return db
+        except Exception as e:
+            logger.warning(f"Token registry running without persistence: {e}")
+            return None
+
+    def _remember(self, metadata: TokenMetadata) -> None:
+        key = (metadata.chain_id, metadata.address)
+        self._cache[key] = metadata
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def _lookup_local(self, chain_id: int, address: str) -> Optional[TokenMetadata]:
+        key = (chain_id, address)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if self._db is None:
+            return None
+
+        row = self._db.execute(
+            "SELECT decimals, symbol FROM tokens WHERE chain_id = ? AND address = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+
+        metadata = TokenMetadata(chain_id, address, row[0], row[1])
+        self._remember(metadata)
+        return metadata
+
+    def _persist(self, tokens: Iterable[TokenMetadata]) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tokens (chain_id, address, decimals, symbol) "
+                "VALUES (?, ?, ?, ?)",
+                [(t.chain_id, t.address, t.decimals, t.symbol) for t in tokens],
+            )
+            self._db.commit()
+        except Exception as e:
+            logger.warning(f"Could not persist token metadata: {e}")
+
+    def contract(self, web3: Web3, address: str):
+        """Get a cached ERC20 contract object for a token"""
+        address = to_checksum(address)
+        key = (getattr(web3.provider, "endpoint_uri", None) or repr(web3.provider), address)
+        with self._lock:
+            if key not in self._contracts:
+                self._contracts[key] = web3.eth.contract(address=address, abi=ERC20_ABI)
+            return self._contracts[key]
+
+    def get_many(
+        self, web3: Web3, chain_id: int, addresses: Iterable[str]
+    ) -> Dict[str, TokenMetadata]:
+        """Resolve metadata for many tokens, fetching any unknown ones in one batch
+
+        Returns a mapping of the given addresses (as passed in) to their metadata.
+        Tokens whose metadata could not be read are left out.
+        """
+        resolved: Dict[str, TokenMetadata] = {}
+        missing: Dict[str, str] = {}
+
+        with self._lock:
+            for address in addresses:
+                if is_native_token(address):
+                    resolved[address] = TokenMetadata(
+                        chain_id, address, NATIVE_DECIMALS
+                    )
+                    continue
+
+                metadata = self._lookup_local(chain_id, to_checksum(address))
+                if metadata:
+                    resolved[address] = metadata
+                else:
+                    missing[address] = to_checksum(address)
+
+        if not missing:
+            return resolved
+
+        batch = ERC20BatchReader(web3)
+        reads = {
+            address: (batch.decimals(checksum), batch.symbol(checksum))
+            for address, checksum in missing.items()
+        }
+        results = batch.execute()
+
+        fetched = []
+        for address, (decimals, symbol) in reads.items():
+            if results[decimals] is None:
+                logger.warning(f"Could not read decimals for token {address}")
+                continue
+            metadata = TokenMetadata(
+                chain_id, missing[address], results[decimals], results[symbol]
+            )
+            resolved[address] = metadata
+            fetched.append(metadata)
+
+        with self._lock:
+            for metadata in fetched:
+                self._remember(metadata)
+            self._persist(fetched)
+
+        return resolved
+
+    def get(self, web3: Web3, chain_id: int, address: str) -> TokenMetadata:
+        metadata = self.get_many(web3, chain_id, [address]).get(address)
+        if metadata is None:
+            raise ValueError(f"Could not resolve token metadata for {address}")
+        return metadata
+
+    def decimals(self, web3: Web3, chain_id: int, address: str) -> int:
+        return self.get(web3, chain_id, address).decimals
+
+    def seed(self, web3: Web3, chain_id: int, addresses: Iterable[str]) -> None:
+        """Warm the registry with known tokens for a chain, once per process"""
+        with self._lock:
+            if chain_id in self._seeded:
+                return
+            self._seeded.add(chain_id)
+
+        try:
+            self.get_many(web3, chain_id, addresses)
+        except Exception as e:
+            logger.warning(f"Could not seed token registry for chain {chain_id}: {e}")
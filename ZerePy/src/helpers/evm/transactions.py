@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from web3 import Web3
+
+logger = logging.getLogger("helpers.evm.transactions")
+
+# Node error fragments that mean our local nonce view is out of sync. "already
+# known" is not one of them: the node has the transaction, so resending it
+# with a fresh nonce would run it twice.
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "replacement transaction underpriced",
+    "invalid nonce",
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """Whether a send failure was caused by the node rejecting our nonce"""
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERRORS)
+
+
+def _endpoint_key(web3: Web3) -> str:
+    return getattr(web3.provider, "endpoint_uri", None) or repr(web3.provider)
+
+
+class NonceManager:
+    """Hands out sequential nonces for one account from a local counter.
+
+    The counter is seeded from the node's pending transaction count and shared
+    by every connection in the process that signs with the same key against the
+    same RPC endpoint, so concurrent strategies never reuse a nonce.
+    """
+
+    _managers: Dict[Tuple[str, str], "NonceManager"] = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, address: str):
+        self._web3 = web3
+        self.address = Web3.to_checksum_address(address)
+        self._lock = threading.Lock()
+        self._next_nonce: Optional[int] = None
+        # Allocated nonces whose transaction has not been sent or failed yet
+        self._in_flight = 0
+        # Set when the node rejected a nonce, the counter is re-read from the
+        # node once nothing is in flight
+        self._stale = False
+
+    @classmethod
+    def for_account(cls, web3: Web3, address: str) -> "NonceManager":
+        """Get the process-wide nonce manager for an account on an RPC endpoint"""
+        key = (_endpoint_key(web3), address.lower())
+        with cls._managers_lock:
+            if key not in cls._managers:
+                cls._managers[key] = cls(web3, address)
+            return cls._managers[key]
+
+    def allocate(self) -> int:
+        """Reserve the next nonce for this account"""
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self._web3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            self._in_flight += 1
+            return nonce
+
+    def release(self, nonce: int, error: Optional[Exception] = None) -> None:
+        """Report that the transaction using `nonce` was sent, or failed with `error`
+
+        A failed send leaves either a wrong counter (nonce errors) or a gap
+        that queues every later transaction. If the failed nonce was the last
+        one handed out it is simply reused. Otherwise the counter is re-read
+        from the node's pending count once no other allocation is in flight,
+        which fills the gap; re-reading earlier would hand the in-flight
+        nonces out a second time.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if error is not None:
+                if not is_nonce_error(error) and self._next_nonce == nonce + 1:
+                    self._next_nonce = nonce
+                else:
+                    self._stale = True
+            if self._stale and self._in_flight == 0:
+                self._next_nonce = None
+                self._stale = False
+
+
+class GasPriceOracle:
+    """Serves the network gas price, refreshing it at most every `refresh_interval` seconds"""
+
+    _oracles: Dict[str, "GasPriceOracle"] = {}
+    _oracles_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, refresh_interval: float = 5):
+        self._web3 = web3
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._gas_price: Optional[int] = None
+        self._fetched_at = 0.0
+
+    @classmethod
+    def for_web3(cls, web3: Web3, refresh_interval: float = 5) -> "GasPriceOracle":
+        """Get the process-wide gas price oracle for an RPC endpoint"""
+        key = _endpoint_key(web3)
+        with cls._oracles_lock:
+            if key not in cls._oracles:
+                cls._oracles[key] = cls(web3, refresh_interval)
+            return cls._oracles[key]
+
+    def get(self) -> int:
+        with self._lock:
+            if (
+                self._gas_price is None
+                or time.monotonic() - self._fetched_at >= self.refresh_interval
+            ):
+                self._gas_price = self._web3.eth.gas_price
+                self._fetched_at = time.monotonic()
+            return self._gas_price
@@ -0,0 +1,169 @@
+import asyncio
+import http.cookiejar
+import logging
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from src.helpers.tracing import span
+
+logger = logging.getLogger("helpers.http")
+
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("ZEREPY_HTTP_CONNECT_TIMEOUT", 5))
+DEFAULT_READ_TIMEOUT = float(os.getenv("ZEREPY_HTTP_READ_TIMEOUT", 30))
+DEFAULT_TIMEOUT = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+
+# Keep-alive connections kept per host, and in-flight requests allowed per host
+POOL_SIZE = int(os.getenv("ZEREPY_HTTP_POOL_SIZE", 16))
+MAX_PER_HOST = int(os.getenv("ZEREPY_HTTP_MAX_PER_HOST", 16))
+
+
+class _NoCookies(http.cookiejar.DefaultCookiePolicy):
+    """Cookie policy that never stores a cookie"""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+
+class HttpClient:
+    """Process-wide HTTP transport shared by every REST-based connection.
+
+    The sync side is a single requests.Session, so connections to a host are
+    kept alive and reused instead of paying TCP+TLS setup on every call. The
+    async side keeps one aiohttp.ClientSession per event loop. Both apply the
+    same per-host concurrency limit and default timeouts.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        max_per_host: int = MAX_PER_HOST,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        # Shared by every agent and credential, so cookies set by one response
+        # must not be sent along with anybody else's requests
+        self.session.cookies.set_policy(_NoCookies())
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request over the shared session, same signature as requests.request"""
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        with self._host_limit(url), span("http.request", method=method, host=host) as current:
+            response = self.session.request(method, url, **kwargs)
+            current.set_attribute("status_code", response.status_code)
+            if response.status_code >= 400:
+                current.set_error(f"HTTP {response.status_code}")
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def async_session(self) -> aiohttp.ClientSession:
+        """Get the shared aiohttp session for the running event loop.
+
+        Callers must not close it, it lives until close_async() is called.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._async_sessions.get(loop)
+            if session is None or session.closed:
+                connect, read = self.timeout
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=0, limit_per_host=self.max_per_host
+                    ),
+                    timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+                )
+                self._async_sessions[loop] = session
+
+            stale = [
+                self._async_sessions.pop(l) for l in list(self._async_sessions) if l.is_closed()
+            ]
+
+        for stale_session in stale:
+            self._close_stale(stale_session)
+        return session
+
+    @staticmethod
+    def _close_stale(session: aiohttp.ClientSession) -> None:
+        """Close the session of a loop that was closed without close_async()
+
+        The loop can't run session.close() anymore, so the connector is closed
+        directly, which releases its pool and marks the session closed.
+        """
+        if session.closed:
+            return
+        try:
+            session.connector.close()
+        except Exception as e:
+            logger.debug(f"Closing a stale aiohttp session failed: {e}")
+
+    async def close_async(self) -> None:
+        """Close the aiohttp session bound to the running event loop"""
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session and not session.closed:
+            await session.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Get the shared HTTP client for this process"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_client().post(url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return get_client().put(url, **kwargs)
+
+
+def async_session() -> aiohttp.ClientSession:
+    return get_client().async_session()
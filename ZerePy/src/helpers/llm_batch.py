@@ -0,0 +1,260 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("helpers.llm_batch")
+
+# Provider batch API: how long requests are collected, the largest batch
+# submitted at once and how often running batches are polled
+DEFAULT_BATCH_FLUSH_SECONDS = 60
+DEFAULT_BATCH_MAX_REQUESTS = 1000
+DEFAULT_BATCH_POLL_SECONDS = 30
+
+
+class DecisionBatcher:
+    """Shares in-flight strategy decisions between agents on an event loop.
+
+    A decision identical to one already in flight (same providers, prompt,
+    system prompt and strategies) waits for that request instead of sending
+    its own. The system prompt is built from the agent's character, so this
+    merges agents sharing one, e.g. forks of the same agent, and every other
+    decision is sent right away.
+    """
+
+    _instances: Dict[asyncio.AbstractEventLoop, "DecisionBatcher"] = {}
+
+    def __init__(self):
+        # key -> task making the request, shared by every waiter
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+        self.decisions = 0
+        self.coalesced = 0
+
+    @classmethod
+    def for_loop(cls) -> "DecisionBatcher":
+        """The batcher bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop not in cls._instances:
+            # Drop batchers of loops that were closed, e.g. between CLI runs
+            for stale in [l for l in cls._instances if l.is_closed()]:
+                del cls._instances[stale]
+            cls._instances[loop] = cls()
+        return cls._instances[loop]
+
+    async def submit(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Wait for the result of the request `factory` makes, sharing it by key"""
+        self.decisions += 1
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # A waiter giving up must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "decisions": self.decisions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+
+class _BatchRequest:
+    __slots__ = ("custom_id", "prompt", "system_prompt", "callback", "queued_at")
+
+    def __init__(self, prompt: str, system_prompt: str, callback: Callable[[Optional[str]], None]):
+        self.custom_id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.system_prompt = system_prompt
+        self.callback = callback
+        self.queued_at = time.monotonic()
+
+
+class TextBatchQueue:
+    """Non-urgent text generation through the providers' batch APIs.
+
+    Requests are grouped per provider, model and client, submitted as one
+    OpenAI Batch / Anthropic Message Batch once the group is old or large
+    enough, and each result is handed to the callback of the request that
+    asked for it, on the queue's worker thread. Failed requests get None.
+    """
+
+    _instance: Optional["TextBatchQueue"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        flush_seconds: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+    ):
+        self.flush_seconds = flush_seconds or float(
+            os.getenv("ZEREPY_LLM_BATCH_FLUSH_SECONDS", DEFAULT_BATCH_FLUSH_SECONDS)
+        )
+        self.max_requests = max_requests or int(
+            os.getenv("ZEREPY_LLM_BATCH_MAX_REQUESTS", DEFAULT_BATCH_MAX_REQUESTS)
+        )
+        self.poll_seconds = poll_seconds or float(
+            os.getenv("ZEREPY_LLM_BATCH_POLL_SECONDS", DEFAULT_BATCH_POLL_SECONDS)
+        )
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        # batch key -> (connection, queued requests)
+        self._groups: Dict[Tuple, Tuple[Any, List[_BatchRequest]]] = {}
+        # batch id -> (connection, custom_id -> request)
+        self._in_flight: Dict[str, Tuple[Any, Dict[str, _BatchRequest]]] = {}
+
+        self.submitted_batches = 0
+        self.completed_requests = 0
+        self.failed_requests = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="llm-batch-queue", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def instance(cls) -> "TextBatchQueue":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.close)
+            return cls._instance
+
+    @staticmethod
+    def supports(connection) -> bool:
+        return hasattr(connection, "submit_text_batch") and hasattr(
+            connection, "get_text_batch_results"
+        )
+
+    def submit(
+        self,
+        connection,
+        prompt: str,
+        system_prompt: str,
+        callback: Callable[[Optional[str]], None],
+    ) -> str:
+        """Queue a generate-text request, returns its custom id"""
+        request = _BatchRequest(prompt, system_prompt, callback)
+        key = connection.batch_key()
+
+        with self._lock:
+            group = self._groups.setdefault(key, (connection, []))
+            group[1].append(request)
+            full = len(group[1]) >= self.max_requests
+
+        if full:
+            self._wake.set()
+        return request.custom_id
+
+    def _due_groups(self) -> List[Tuple[Any, List[_BatchRequest]]]:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for key, (connection, requests) in list(self._groups.items()):
+                oldest = requests[0].queued_at if requests else now
+                if requests and (
+                    len(requests) >= self.max_requests
+                    or now - oldest >= self.flush_seconds
+                ):
+                    due.append((connection, requests[: self.max_requests]))
+                    remaining = requests[self.max_requests :]
+                    if remaining:
+                        self._groups[key] = (connection, remaining)
+                    else:
+                        del self._groups[key]
+        return due
+
+    def _submit_due(self) -> None:
+        for connection, requests in self._due_groups():
+            try:
+                batch_id = connection.submit_text_batch(
+                    [(r.custom_id, r.prompt, r.system_prompt) for r in requests]
+                )
+            except Exception as e:
+                logger.error(f"Submitting a batch of {len(requests)} requests failed: {e}")
+                self._deliver(requests, {})
+                continue
+
+            self.submitted_batches += 1
+            logger.info(f"Submitted LLM batch {batch_id} with {len(requests)} requests")
+            with self._lock:
+                self._in_flight[batch_id] = (
+                    connection,
+                    {r.custom_id: r for r in requests},
+                )
+
+    def _poll(self) -> None:
+        with self._lock:
+            in_flight = list(self._in_flight.items())
+
+        for batch_id, (connection, requests) in in_flight:
+            try:
+                results = connection.get_text_batch_results(batch_id)
+            except Exception as e:
+                logger.warning(f"Polling LLM batch {batch_id} failed: {e}")
+                continue
+            if results is None:
+                continue
+
+            with self._lock:
+                self._in_flight.pop(batch_id, None)
+            logger.info(f"LLM batch {batch_id} done, {len(results)}/{len(requests)} succeeded")
+            self._deliver(list(requests.values()), results)
+
+    def _deliver(self, requests: List[_BatchRequest], results: Dict[str, str]) -> None:
+        for request in requests:
+            text = results.get(request.custom_id)
+            if text is None:
+                self.failed_requests += 1
+            else:
+                self.completed_requests += 1
+            try:
+                request.callback(text)
+            except Exception as e:
+                logger.error(f"LLM batch result handler failed: {e}")
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(min(self.poll_seconds, self.flush_seconds))
+            self._wake.clear()
+            self._submit_due()
+            self._poll()
+
+    def close(self) -> None:
+        """Stop the worker, results that have not arrived yet are dropped"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+
+        stats = self.stats()
+        if stats["queued"] or stats["in_flight"]:
+            logger.warning(
+                f"Dropping {stats['queued']} queued and {stats['in_flight']} in-flight batch requests"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = sum(len(requests) for _, requests in self._groups.values())
+            in_flight = sum(len(requests) for _, requests in self._in_flight.values())
+        return {
+            "queued": queued,
+            "in_flight": in_flight,
+            "submitted_batches": self.submitted_batches,
+            "completed_requests": self.completed_requests,
+            "failed_requests": self.failed_requests,
+        }
@@ -0,0 +1,409 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import GeneratorType
+from typing import Any, Dict, Iterator, List, Optional
+from src.helpers.llm_scheduler import PRIORITY_BACKGROUND, LLMJobError, LLMScheduler
+from src.helpers.metrics import LLM_DURATION, LLM_ERRORS, timed
+from src.helpers.tracing import span
+
+logger = logging.getLogger("helpers.llm_router")
+
+# Latency samples kept per provider for the percentile estimate
+LATENCY_WINDOW = 200
+# Below this many samples the configured hedge_after is used instead of the p95
+MIN_SAMPLES = 10
+# Seconds a provider is skipped after consecutive failures
+DEFAULT_COOLDOWN = 30
+FAILURES_BEFORE_COOLDOWN = 2
+# Fallback hedge delay and the bounds applied to the percentile estimate
+DEFAULT_HEDGE_AFTER = 10.0
+MIN_HEDGE_DELAY = 0.5
+DEFAULT_HEDGE_QUANTILE = 0.95
+
+# Hedged sync calls run here, so the losing request does not hold up the caller.
+# A call may queue for a worker, the hedge delay only counts once it has one.
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+def _prime_stream(stream: Iterator[Any]) -> Iterator[Any]:
+    """Pull the first chunk now, so the request is sent, and re-yield it first"""
+    try:
+        first = next(stream)
+    except StopIteration:
+        return iter(())
+    return itertools.chain((first,), stream)
+
+
+class NoProviderAvailable(Exception):
+    """Raised when every configured LLM provider failed a call"""
+
+    pass
+
+
+class ProviderStats:
+    """Process-wide latency and error tracking for one LLM provider.
+
+    Shared by every agent using the provider, so routing reacts to an outage
+    after the first few failures anywhere in the process.
+    """
+
+    _instances: Dict[str, "ProviderStats"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.hedges = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    @classmethod
+    def for_provider(cls, provider: str) -> "ProviderStats":
+        with cls._instances_lock:
+            if provider not in cls._instances:
+                cls._instances[provider] = cls(provider)
+            return cls._instances[provider]
+
+    @classmethod
+    def all(cls) -> Dict[str, Dict[str, Any]]:
+        with cls._instances_lock:
+            instances = list(cls._instances.values())
+        return {stats.provider: stats.snapshot() for stats in instances}
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.cooldown_until = 0.0
+
+    def record_failure(self, cooldown: float = DEFAULT_COOLDOWN) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+                self.cooldown_until = time.monotonic() + cooldown
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Latency quantile over the recent window, None without enough samples"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.successes + self.failures
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": self.failures / total if total else 0.0,
+            "hedges": self.hedges,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "cooling_down": self.cooling_down,
+        }
+
+
+class LLMRouter:
+    """Routes an agent's LLM actions over all of its configured providers.
+
+    Providers are tried in configured order, skipping ones cooling down after
+    repeated failures. With hedging enabled, a call that has not answered
+    within the primary's recent p95 latency is also sent to the next provider
+    and the first answer wins.
+    """
+
+    def __init__(
+        self,
+        connection_manager,
+        providers: List[str],
+        hedge: bool = False,
+        hedge_quantile: float = DEFAULT_HEDGE_QUANTILE,
+        hedge_after: float = DEFAULT_HEDGE_AFTER,
+        cooldown: float = DEFAULT_COOLDOWN,
+        owner: Optional[str] = None,
+    ):
+        if not providers:
+            raise ValueError("No configured LLM provider found")
+
+        self.connection_manager = connection_manager
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after = hedge_after
+        self.cooldown = cooldown
+        # Agent the calls are made for, so the scheduler can cancel them on stop
+        self.owner = owner
+
+    @classmethod
+    def from_config(
+        cls,
+        connection_manager,
+        providers: List[str],
+        config: Optional[Dict[str, Any]],
+        owner: Optional[str] = None,
+    ) -> "LLMRouter":
+        """Build a router from the optional `llm_routing` block of an agent
+
+        An explicit `providers` list sets the failover order, otherwise the
+        configured connections are used in the order they appear.
+        """
+        config = config or {}
+        ordered = [name for name in config.get("providers") or [] if name in providers]
+        return cls(
+            connection_manager,
+            ordered or providers,
+            hedge=bool(config.get("hedge", False)),
+            hedge_quantile=config.get("hedge_quantile") or DEFAULT_HEDGE_QUANTILE,
+            hedge_after=config.get("hedge_after") or DEFAULT_HEDGE_AFTER,
+            cooldown=config.get("cooldown") or DEFAULT_COOLDOWN,
+            owner=owner,
+        )
+
+    @property
+    def primary(self) -> str:
+        return self.candidates()[0]
+
+    def candidates(self) -> List[str]:
+        """Providers in routing order, the ones cooling down moved to the back"""
+        available = [p for p in self.providers if not ProviderStats.for_provider(p).cooling_down]
+        return available + [p for p in self.providers if p not in available]
+
+    def hedge_delay(self, provider: str) -> float:
+        estimate = ProviderStats.for_provider(provider).quantile(self.hedge_quantile)
+        if estimate is None:
+            return self.hedge_after
+        return min(max(estimate, MIN_HEDGE_DELAY), self.hedge_after)
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+    def _call(
+        self,
+        provider: str,
+        action_name: str,
+        params: List[Any],
+        priority: int,
+        deadline: Optional[float],
+        started: Optional[threading.Event] = None,
+    ) -> Any:
+        # Time spent queued for a slot shows as the gap before the provider call
+        with span("llm.request", provider=provider, action=action_name, priority=priority):
+            with LLMScheduler.instance().slot(priority, self._remaining(deadline), self.owner):
+                if started is not None:
+                    started.set()
+                stats = ProviderStats.for_provider(provider)
+                labels = (self.owner or "", provider, action_name)
+                started = time.monotonic()
+                try:
+                    result = self.connection_manager.perform_action(
+                        provider, action_name, params, raise_errors=True
+                    )
+                    streaming = isinstance(result, GeneratorType)
+                    if streaming:
+                        # A stream only sends its request when iterated, wait for the
+                        # first chunk while still holding the slot, so a stream that
+                        # fails to start still fails over
+                        result = _prime_stream(result)
+                except Exception:
+                    LLM_DURATION.labels(*labels).observe(time.monotonic() - started)
+                    LLM_ERRORS.labels(*labels).inc()
+                    stats.record_failure(self.cooldown)
+                    raise
+
+                if streaming:
+                    # How long the rest takes depends on the reader, so streams
+                    # stay out of the latencies the hedge delay is based on
+                    stats.record_success()
+                    return self._measure_stream(result, stats, labels, started)
+
+                elapsed = time.monotonic() - started
+                LLM_DURATION.labels(*labels).observe(elapsed)
+                stats.record_success(elapsed)
+                return result
+
+    def _measure_stream(
+        self, stream: Iterator[Any], stats: "ProviderStats", labels: tuple, started: float
+    ) -> Iterator[Any]:
+        """Re-yield a primed stream, observing its duration once it is drained"""
+        try:
+            yield from stream
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            LLM_ERRORS.labels(*labels).inc()
+            stats.record_failure(self.cooldown)
+            # Failed past perform_action, so mark the connection for a re-check here
+            _, provider, action_name = labels
+            self.connection_manager._handle_action_error(provider, action_name, e)
+            raise
+        LLM_DURATION.labels(*labels).observe(time.monotonic() - started)
+
+    async def _call_async(
+        self,
+        provider: str,
+        action_name: str,
+        params: List[Any],
+        priority: int,
+        deadline: Optional[float],
+    ) -> Any:
+        with span("llm.request", provider=provider, action=action_name, priority=priority):
+            async with LLMScheduler.instance().slot_async(
+                priority, self._remaining(deadline), self.owner
+            ):
+                stats = ProviderStats.for_provider(provider)
+                started = time.monotonic()
+                try:
+                    with timed(LLM_DURATION, LLM_ERRORS, self.owner or "", provider, action_name):
+                        result = await self.connection_manager.perform_action_async(
+                            provider, action_name, params, raise_errors=True
+                        )
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    stats.record_failure(self.cooldown)
+                    raise
+                stats.record_success(time.monotonic() - started)
+                return result
+
+    def perform(
+        self,
+        action_name: str,
+        params: List[Any],
+        hedge: Optional[bool] = None,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run an LLM action with failover, and hedging when enabled
+
+        Args:
+            priority: LLMScheduler priority class of the call
+            timeout: Seconds the call may spend queued for a scheduler slot
+        """
+        hedge = self.hedge if hedge is None else hedge
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        call = (action_name, params, priority, deadline)
+        pending = self.candidates()
+        errors = []
+
+        while pending:
+            provider = pending.pop(0)
+            if not hedge or not pending:
+                try:
+                    return self._call(provider, *call)
+                except LLMJobError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"LLM provider {provider} failed {action_name}: {e}")
+                    errors.append(f"{provider}: {e}")
+                    continue
+
+            # Hedged: give the primary its p95, then race it against the next provider
+            # Copy the context, so the hedged calls stay in the caller's trace
+            started = threading.Event()
+            primary = _hedge_executor.submit(
+                contextvars.copy_context().run, self._call, provider, *call, started=started
+            )
+            # The p95 is of provider calls, so the clock starts once the primary
+            # has a worker and a scheduler slot, not while it is queued for them
+            primary.add_done_callback(lambda _: started.set())
+            started.wait()
+            futures = {primary: provider}
+            done, _ = wait(futures, timeout=self.hedge_delay(provider))
+            if not done:
+                backup = pending.pop(0)
+                ProviderStats.for_provider(provider).record_hedge()
+                logger.info(f"LLM provider {provider} is slow, hedging {action_name} on {backup}")
+                futures[
+                    _hedge_executor.submit(
+                        contextvars.copy_context().run, self._call, backup, *call
+                    )
+                ] = backup
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        # The losing request finishes in the background and only feeds the stats
+                        return future.result()
+                    except LLMJobError:
+                        raise
+                    except Exception as e:
+                        logger.warning(f"LLM provider {name} failed {action_name}: {e}")
+                        errors.append(f"{name}: {e}")
+
+        raise NoProviderAvailable(f"All LLM providers failed {action_name}: {'; '.join(errors)}")
+
+    async def perform_async(
+        self,
+        action_name: str,
+        params: List[Any],
+        hedge: Optional[bool] = None,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Awaitable variant of perform, the losing hedged request is cancelled"""
+        hedge = self.hedge if hedge is None else hedge
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        call = (action_name, params, priority, deadline)
+        pending = self.candidates()
+        errors = []
+
+        while pending:
+            provider = pending.pop(0)
+            if not hedge or not pending:
+                try:
+                    return await self._call_async(provider, *call)
+                except LLMJobError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"LLM provider {provider} failed {action_name}: {e}")
+                    errors.append(f"{provider}: {e}")
+                    continue
+
+            tasks = {asyncio.ensure_future(self._call_async(provider, *call)): provider}
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(provider))
+            if not done:
+                backup = pending.pop(0)
+                ProviderStats.for_provider(provider).record_hedge()
+                logger.info(f"LLM provider {provider} is slow, hedging {action_name} on {backup}")
+                tasks[asyncio.ensure_future(self._call_async(backup, *call))] = backup
+
+            try:
+                while tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        name = tasks.pop(task)
+                        try:
+                            return task.result()
+                        except LLMJobError:
+                            raise
+                        except Exception as e:
+                            logger.warning(f"LLM provider {name} failed {action_name}: {e}")
+                            errors.append(f"{name}: {e}")
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        raise NoProviderAvailable(f"All LLM providers failed {action_name}: {'; '.join(errors)}")
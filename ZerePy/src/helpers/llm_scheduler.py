@@ -0,0 +1,319 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("helpers.llm_scheduler")
+
+# Priority classes, lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+    PRIORITY_BATCH: "batch",
+}
+
+# Slots shared by all classes, and the most each class may hold. Background
+# and batch work stay below the total so chat always finds a free slot.
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_CLASS_CONCURRENCY = {
+    PRIORITY_INTERACTIVE: 32,
+    PRIORITY_BACKGROUND: 24,
+    PRIORITY_BATCH: 4,
+}
+
+# Wait times kept per class for the percentile metrics
+WAIT_WINDOW = 500
+
+QUEUED = "queued"
+ADMITTED = "admitted"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+
+class LLMJobError(Exception):
+    """Base exception for LLM jobs that never got to run"""
+
+    pass
+
+
+class LLMJobCancelled(LLMJobError):
+    """Raised when a queued job's owner was stopped"""
+
+    pass
+
+
+class LLMDeadlineExceeded(LLMJobError):
+    """Raised when a job's deadline passed while it was queued"""
+
+    pass
+
+
+class _Job:
+    __slots__ = ("priority", "deadline", "owner", "enqueued_at", "state", "notify")
+
+    def __init__(
+        self,
+        priority: int,
+        deadline: Optional[float],
+        owner: Optional[str],
+        notify: Callable[[], None],
+    ):
+        self.priority = priority
+        self.deadline = deadline
+        self.owner = owner
+        self.enqueued_at = time.monotonic()
+        self.state = QUEUED
+        self.notify = notify
+
+
+class _ClassStats:
+    def __init__(self):
+        self.admitted = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.waits = deque(maxlen=WAIT_WINDOW)
+
+    def snapshot(self, queued: int, running: int, limit: int) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def quantile(q):
+            return waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+
+        return {
+            "queued": queued,
+            "running": running,
+            "limit": limit,
+            "admitted": self.admitted,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+            "wait_p50": quantile(0.5),
+            "wait_p95": quantile(0.95),
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+
+class LLMScheduler:
+    """Process-wide admission control for LLM calls.
+
+    Calls wait for a slot in their priority class. Freed slots go to
+    interactive work first, then background, then batch; within a class the
+    earliest deadline goes first. Jobs whose deadline passes in the queue are
+    dropped, and an agent's queued jobs are cancelled when it is stopped.
+    """
+
+    _instance: Optional["LLMScheduler"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        class_concurrency: Optional[Dict[int, int]] = None,
+    ):
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("ZEREPY_LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+        )
+        self.class_concurrency = class_concurrency or {
+            priority: int(
+                os.getenv(
+                    f"ZEREPY_LLM_{name.upper()}_CONCURRENCY",
+                    DEFAULT_CLASS_CONCURRENCY[priority],
+                )
+            )
+            for priority, name in PRIORITY_NAMES.items()
+        }
+
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        # priority -> heap of (deadline, sequence, job)
+        self._queues: Dict[int, List] = {priority: [] for priority in PRIORITY_NAMES}
+        self._running: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+        self._stats: Dict[int, _ClassStats] = {
+            priority: _ClassStats() for priority in PRIORITY_NAMES
+        }
+
+    @classmethod
+    def instance(cls) -> "LLMScheduler":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _enqueue(
+        self,
+        priority: int,
+        timeout: Optional[float],
+        owner: Optional[str],
+        notify: Callable[[], None],
+    ) -> _Job:
+        if priority not in PRIORITY_NAMES:
+            raise ValueError(f"Unknown LLM priority class {priority}")
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        job = _Job(priority, deadline, owner, notify)
+        with self._lock:
+            heapq.heappush(
+                self._queues[priority],
+                (deadline if deadline is not None else float("inf"), next(self._sequence), job),
+            )
+            self._dispatch()
+        return job
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued jobs in priority order, must hold the lock"""
+        now = time.monotonic()
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while (
+                queue
+                and sum(self._running.values()) < self.max_concurrency
+                and self._running[priority] < self.class_concurrency[priority]
+            ):
+                _, _, job = heapq.heappop(queue)
+                if job.state != QUEUED:
+                    continue
+                if job.deadline is not None and now > job.deadline:
+                    self._finish_queued(job, EXPIRED)
+                    continue
+
+                job.state = ADMITTED
+                self._running[priority] += 1
+                stats = self._stats[priority]
+                stats.admitted += 1
+                stats.waits.append(now - job.enqueued_at)
+                job.notify()
+
+    def _finish_queued(self, job: _Job, state: str) -> None:
+        """Drop a job that never ran, must hold the lock"""
+        job.state = state
+        stats = self._stats[job.priority]
+        if state == CANCELLED:
+            stats.cancelled += 1
+        else:
+            stats.expired += 1
+        job.notify()
+
+    def _expire(self, job: _Job) -> None:
+        """Drop a job whose wait timed out, unless it was admitted meanwhile"""
+        with self._lock:
+            if job.state == QUEUED:
+                self._finish_queued(job, EXPIRED)
+
+    def _abandon(self, job: _Job) -> None:
+        """Give up on a job whose waiter went away, freeing its slot if it got one"""
+        with self._lock:
+            if job.state == QUEUED:
+                self._finish_queued(job, CANCELLED)
+            elif job.state == ADMITTED:
+                self._release_locked(job)
+
+    def _release_locked(self, job: _Job) -> None:
+        job.state = None
+        self._running[job.priority] -= 1
+        self._dispatch()
+
+    def _release(self, job: _Job) -> None:
+        with self._lock:
+            if job.state == ADMITTED:
+                self._release_locked(job)
+
+    @staticmethod
+    def _raise_for(job: _Job) -> None:
+        if job.state == CANCELLED:
+            raise LLMJobCancelled(f"LLM job for {job.owner} was cancelled")
+        if job.state == EXPIRED:
+            raise LLMDeadlineExceeded(
+                f"LLM job for {job.owner} missed its deadline while queued"
+            )
+
+    @contextmanager
+    def slot(
+        self,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+        owner: Optional[str] = None,
+    ):
+        """Block the calling thread until the job is admitted, hold the slot while inside
+
+        Args:
+            priority: One of the PRIORITY_* classes
+            timeout: Seconds the job may wait in the queue before it is dropped
+            owner: Agent the job belongs to, used to cancel it when the agent stops
+        """
+        admitted = threading.Event()
+        job = self._enqueue(priority, timeout, owner, admitted.set)
+
+        if not admitted.wait(timeout):
+            self._expire(job)
+        self._raise_for(job)
+
+        try:
+            yield
+        finally:
+            self._release(job)
+
+    @asynccontextmanager
+    async def slot_async(
+        self,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+        owner: Optional[str] = None,
+    ):
+        """Awaitable variant of slot that waits without holding up the event loop"""
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(
+                lambda: admitted.done() or admitted.set_result(None)
+            )
+
+        job = self._enqueue(priority, timeout, owner, notify)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(admitted), timeout)
+        except asyncio.TimeoutError:
+            self._expire(job)
+        except asyncio.CancelledError:
+            self._abandon(job)
+            raise
+        self._raise_for(job)
+
+        try:
+            yield
+        finally:
+            self._release(job)
+
+    def cancel(self, owner: str) -> int:
+        """Cancel every queued job of an owner, returns how many were dropped"""
+        cancelled = 0
+        with self._lock:
+            for queue in self._queues.values():
+                for _, _, job in queue:
+                    if job.owner == owner and job.state == QUEUED:
+                        self._finish_queued(job, CANCELLED)
+                        cancelled += 1
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} queued LLM jobs for {owner}")
+        return cancelled
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, running jobs and wait times per priority class"""
+        with self._lock:
+            return {
+                PRIORITY_NAMES[priority]: self._stats[priority].snapshot(
+                    queued=sum(1 for _, _, job in queue if job.state == QUEUED),
+                    running=self._running[priority],
+                    limit=self.class_concurrency[priority],
+                )
+                for priority, queue in self._queues.items()
+            }
@@ -0,0 +1,83 @@
+import logging
+import threading
+from typing import Any, Dict
+from src.helpers.metrics import LLM_TOKENS, current_agent
+
+logger = logging.getLogger("helpers.llm_usage")
+
+_lock = threading.Lock()
+# provider -> token counters
+_usage: Dict[str, Dict[str, int]] = {}
+
+
+def record_usage(
+    provider: str,
+    prompt_tokens: int = 0,
+    cached_tokens: int = 0,
+    completion_tokens: int = 0,
+) -> None:
+    """Accumulate token usage for a provider, including prompt-cache hits"""
+    with _lock:
+        stats = _usage.setdefault(
+            provider,
+            {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0},
+        )
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens or 0
+        stats["cached_tokens"] += cached_tokens or 0
+        stats["completion_tokens"] += completion_tokens or 0
+
+    agent = current_agent.get()
+    LLM_TOKENS.labels(agent, provider, "prompt").inc(prompt_tokens or 0)
+    LLM_TOKENS.labels(agent, provider, "cached").inc(cached_tokens or 0)
+    LLM_TOKENS.labels(agent, provider, "completion").inc(completion_tokens or 0)
+
+    logger.debug(
+        f"{provider} usage: {prompt_tokens} prompt tokens ({cached_tokens} cached), "
+        f"{completion_tokens} completion tokens"
+    )
+
+
+def record_openai_usage(provider: str, completion: Any) -> None:
+    """Record the usage block of an OpenAI-compatible chat completion"""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    record_usage(
+        provider,
+        prompt_tokens=usage.prompt_tokens,
+        cached_tokens=getattr(details, "cached_tokens", 0) if details else 0,
+        completion_tokens=usage.completion_tokens,
+    )
+
+
+def record_anthropic_usage(message: Any) -> None:
+    """Record the usage block of an Anthropic message.
+
+    Anthropic reports cache reads separately from the uncached input tokens.
+    """
+    usage = getattr(message, "usage", None)
+    if usage is None:
+        return
+
+    cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+    created = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    record_usage(
+        "anthropic",
+        prompt_tokens=usage.input_tokens + cached + created,
+        cached_tokens=cached,
+        completion_tokens=usage.output_tokens,
+    )
+
+
+def get_usage_stats() -> Dict[str, Dict[str, Any]]:
+    """Token usage per provider, with the share of prompt tokens served from cache"""
+    with _lock:
+        stats = {provider: dict(counters) for provider, counters in _usage.items()}
+
+    for counters in stats.values():
+        prompt = counters["prompt_tokens"]
+        counters["cache_hit_ratio"] = counters["cached_tokens"] / prompt if prompt else 0.0
+    return stats
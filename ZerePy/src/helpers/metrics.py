@@ -0,0 +1,344 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("helpers.metrics")
+
+# Set ZEREPY_METRICS=0 to turn every observation into a no-op
+ENABLED = os.getenv("ZEREPY_METRICS", "1").lower() not in ("0", "false", "no")
+
+# Seconds, from a cached RPC read up to a slow LLM completion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Agent the current call is made for. Set by the agent's ConnectionManager,
+# and carried into worker threads started with asyncio.to_thread, so RPC and
+# token metrics deep inside a connection are labelled without threading it
+# through every signature.
+current_agent: ContextVar[str] = ContextVar("zerepy_metrics_agent", default="")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        MetricsRegistry.instance().register(self)
+
+    @abstractmethod
+    def _new_child(self) -> object:
+        """A fresh series for a new combination of label values"""
+
+    @abstractmethod
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        """Exposition lines of one series"""
+
+    def labels(self, *values) -> object:
+        """The series for these label values, in labelnames order"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {len(key)} values"
+                )
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove_matching(self, labelname: str, value: str) -> int:
+        """Drop every series whose `labelname` label is `value`, returns how many"""
+        if labelname not in self.labelnames:
+            return 0
+        index = self.labelnames.index(labelname)
+        with self._lock:
+            keys = [key for key in self._children if key[index] == value]
+            for key in keys:
+                del self._children[key]
+        return len(keys)
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in self._series():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. errors or tokens"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _render_child(self, values, child: _CounterChild) -> List[str]:
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    """Distribution of durations in seconds, with cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics, rendered for scraping at /metrics"""
+
+    _instance: Optional["MetricsRegistry"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "MetricsRegistry":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def remove_series(self, labelname: str, value: str) -> int:
+        """Drop the series of every metric labelled `labelname`=`value`
+
+        Used when an agent is unloaded, so its series don't pile up over the
+        life of the process.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return sum(metric.remove_matching(labelname, value) for metric in metrics)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class timed:
+    """Observe a block's duration, and count it as an error if it raises
+
+        with timed(ACTION_DURATION, ACTION_ERRORS, agent, connection, action):
+            ...
+    """
+
+    __slots__ = ("histogram", "errors", "values", "started")
+
+    def __init__(self, histogram: Histogram, errors: Optional[Counter], *values):
+        self.histogram = histogram
+        self.errors = errors
+        self.values = values
+
+    def __enter__(self) -> "timed":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if ENABLED:
+            self.histogram.labels(*self.values).observe(time.perf_counter() - self.started)
+            if exc_type is not None and self.errors is not None:
+                self.errors.labels(*self.values).inc()
+        return False
+
+
+def rpc_middleware(connection_name: str):
+    """web3 middleware timing every JSON-RPC request of a connection by method"""
+
+    def middleware(make_request, w3):
+        def timed_request(method, params):
+            with timed(RPC_DURATION, RPC_ERRORS, current_agent.get(), connection_name, method):
+                response = make_request(method, params)
+            # Node errors come back as a response, not an exception
+            if ENABLED and isinstance(response, dict) and "error" in response:
+                RPC_ERRORS.labels(current_agent.get(), connection_name, method).inc()
+            return response
+
+        return timed_request
+
+    return middleware
+
+
+ACTION_DURATION = Histogram(
+    "zerepy_connection_action_duration_seconds",
+    "Duration of ConnectionManager.perform_action calls",
+    ("agent", "connection", "action"),
+)
+ACTION_ERRORS = Counter(
+    "zerepy_connection_action_errors_total",
+    "Connection actions that raised or could not run",
+    ("agent", "connection", "action"),
+)
+
+EXECUTE_DURATION = Histogram(
+    "zerepy_execute_action_duration_seconds",
+    "Duration of registered agent actions run by execute_action",
+    ("agent", "action"),
+)
+EXECUTE_ERRORS = Counter(
+    "zerepy_execute_action_errors_total",
+    "Registered agent actions that raised",
+    ("agent", "action"),
+)
+
+LLM_DURATION = Histogram(
+    "zerepy_llm_request_duration_seconds",
+    "Duration of LLM calls per provider, after admission by the scheduler",
+    ("agent", "provider", "action"),
+)
+LLM_ERRORS = Counter(
+    "zerepy_llm_request_errors_total",
+    "Failed LLM calls per provider",
+    ("agent", "provider", "action"),
+)
+LLM_TOKENS = Counter(
+    "zerepy_llm_tokens_total",
+    "LLM tokens by kind: prompt, cached (part of prompt) and completion",
+    ("agent", "provider", "kind"),
+)
+
+RPC_DURATION = Histogram(
+    "zerepy_rpc_request_duration_seconds",
+    "Duration of EVM JSON-RPC requests",
+    ("agent", "connection", "method"),
+)
+RPC_ERRORS = Counter(
+    "zerepy_rpc_request_errors_total",
+    "EVM JSON-RPC requests that raised or returned an error",
+    ("agent", "connection", "method"),
+)
+
+MONGO_WRITE_DURATION = Histogram(
+    "zerepy_mongo_write_duration_seconds",
+    "Duration of MongoDB writes",
+    ("collection", "operation"),
+)
+MONGO_WRITE_ERRORS = Counter(
+    "zerepy_mongo_write_errors_total",
+    "MongoDB writes that raised",
+    ("collection", "operation"),
+)
+
+LOOP_STAGE_DURATION = Histogram(
+    "zerepy_loop_stage_duration_seconds",
+    "Duration of agent loop stages: read_inputs, decide, execute and record",
+    ("agent", "stage"),
+)
+LOOP_ITERATION_DURATION = Histogram(
+    "zerepy_loop_iteration_duration_seconds",
+    "Duration of whole agent loop iterations, without the loop delay",
+    ("agent",),
+)
+LOOP_ERRORS = Counter(
+    "zerepy_loop_iteration_errors_total",
+    "Agent loop iterations that raised",
+    ("agent",),
+)
@@ -0,0 +1,330 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
+from src.helpers import tracing
+
+logger = logging.getLogger("helpers.rate_limiter")
+
+# "6m0s", "1s", "20ms" style durations used by OpenAI reset headers
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# Rough prompt size estimate used for token budgets before usage is known
+CHARS_PER_TOKEN = 4
+
+# Limiters an async caller already waited on before handing its request to a
+# worker thread. The thread inherits the set, and its first acquire on each
+# of them is free, so the wait happens on the event loop and not twice.
+_prepaid: ContextVar[Optional[Set["RateLimiter"]]] = ContextVar(
+    "zerepy_rate_limit_prepaid", default=None
+)
+
+
+def estimate_tokens(text: Any) -> int:
+    if not text:
+        return 0
+    return len(text if isinstance(text, (str, bytes)) else str(text)) // CHARS_PER_TOKEN
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    parts = _DURATION_PART.findall(value)
+    if parts:
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a reset header's time, accepting durations, epochs and RFC 3339"""
+    if not value:
+        return None
+
+    try:
+        number = float(value)
+        # Epoch seconds (Twitter) versus a relative number of seconds
+        return max(0.0, number - time.time()) if number > 1e9 else number
+    except ValueError:
+        pass
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+    except ValueError:
+        return _parse_duration(value)
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    reserve() always takes the tokens and returns how long the caller has to
+    wait before using them, so sync callers can sleep and async callers can
+    await the same bucket. A bucket without a capacity only enforces blocks
+    from Retry-After responses.
+    """
+
+    def __init__(self, capacity: Optional[float] = None, rate: Optional[float] = None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity or 0.0
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None and self.rate:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+        self.updated_at = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            delay = max(0.0, self.blocked_until - now)
+
+            if self.capacity is not None and self.rate:
+                self.tokens -= min(amount, self.capacity)
+                if self.tokens < 0:
+                    delay = max(delay, -self.tokens / self.rate)
+            return delay
+
+    def sync(self, limit: Optional[int], remaining: Optional[int], reset_after: Optional[float]) -> None:
+        """Align the bucket with what the server reported"""
+        if limit is None or remaining is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # The window refills the used part of the budget by its reset
+            window = reset_after if reset_after and reset_after > 0 else 60.0
+            self.rate = max(limit - remaining, 1) / window
+            # Keep local reservations the server has not seen yet
+            if self.capacity is None:
+                self.tokens = float(remaining)
+            else:
+                self.tokens = min(self.tokens, float(remaining))
+            self.capacity = float(limit)
+
+    def block(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "capacity": self.capacity,
+                "available": self.tokens if self.capacity is not None else None,
+                "rate_per_second": self.rate,
+                "blocked_for": max(0.0, self.blocked_until - time.monotonic()),
+            }
+
+
+class RateLimiter:
+    """Process-wide request and token budget for one provider credential.
+
+    Every connection sharing an API key draws from the same buckets, so
+    agents hosted in one server queue for the quota instead of bursting into
+    429s. Budgets start from ZEREPY_<PROVIDER>_RPM / _TPM when set and are
+    then learned from the provider's rate limit headers.
+    """
+
+    _instances: Dict[Tuple[str, str], "RateLimiter"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        provider: str,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(rpm, rpm / 60 if rpm else None)
+        self.tokens = TokenBucket(tpm, tpm / 60 if tpm else None)
+        self._concurrency = (
+            threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        )
+        self.waited_seconds = 0.0
+        self.throttled = 0
+
+    @classmethod
+    def for_key(cls, provider: str, credential: Optional[str]) -> "RateLimiter":
+        """Limiter shared by every caller of a provider with the same credential"""
+        # Only a fingerprint of the credential is kept
+        fingerprint = hashlib.sha256((credential or "").encode("utf-8")).hexdigest()[:16]
+        key = (provider, fingerprint)
+
+        with cls._instances_lock:
+            if key not in cls._instances:
+                prefix = f"ZEREPY_{provider.upper()}"
+                rpm = os.getenv(f"{prefix}_RPM")
+                tpm = os.getenv(f"{prefix}_TPM")
+                concurrency = os.getenv(f"{prefix}_MAX_CONCURRENCY")
+                cls._instances[key] = cls(
+                    provider,
+                    rpm=float(rpm) if rpm else None,
+                    tpm=float(tpm) if tpm else None,
+                    max_concurrency=int(concurrency) if concurrency else None,
+                )
+            return cls._instances[key]
+
+    @classmethod
+    def all(cls) -> Dict[str, Dict[str, Any]]:
+        with cls._instances_lock:
+            items = list(cls._instances.items())
+        return {f"{provider}:{fingerprint[:8]}": limiter.stats() for (provider, fingerprint), limiter in items}
+
+    def _reserve(self, tokens: int) -> float:
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens) if tokens else 0.0)
+        if delay > 0:
+            self.throttled += 1
+            self.waited_seconds += delay
+            logger.debug(f"{self.provider} rate limited, waiting {delay:.2f}s")
+        return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Wait on the calling thread until a request of `tokens` fits the budget"""
+        prepaid = _prepaid.get()
+        if prepaid and self in prepaid:
+            prepaid.discard(self)
+            return
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        """Awaitable variant of acquire that does not hold up the event loop"""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @contextmanager
+    def prepaid(self):
+        """Let the next acquire in this context, e.g. on a worker thread, pass at once
+
+        For async callers that waited with acquire_async before offloading
+        a blocking request.
+        """
+        token = _prepaid.set((_prepaid.get() or set()) | {self})
+        try:
+            yield
+        finally:
+            _prepaid.reset(token)
+
+    @contextmanager
+    def limit(self, tokens: int = 0):
+        """Hold a concurrency slot and budget for the duration of a request"""
+        if self._concurrency:
+            self._concurrency.acquire()
+        try:
+            self.acquire(tokens)
+            yield self
+        finally:
+            if self._concurrency:
+                self._concurrency.release()
+
+    def observe(self, headers: Mapping[str, str], status_code: Optional[int] = None) -> None:
+        """Learn budgets from a response's rate limit headers
+
+        Understands the OpenAI (x-ratelimit-*), Anthropic
+        (anthropic-ratelimit-*), Twitter (x-rate-limit-*) and Discord
+        (x-ratelimit-reset-after) families, and Retry-After on 429s.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            # OpenAI
+            bucket.sync(
+                _int_header(headers, f"x-ratelimit-limit-{kind}"),
+                _int_header(headers, f"x-ratelimit-remaining-{kind}"),
+                _parse_reset(headers.get(f"x-ratelimit-reset-{kind}")),
+            )
+            # Anthropic
+            bucket.sync(
+                _int_header(headers, f"anthropic-ratelimit-{kind}-limit"),
+                _int_header(headers, f"anthropic-ratelimit-{kind}-remaining"),
+                _parse_reset(headers.get(f"anthropic-ratelimit-{kind}-reset")),
+            )
+
+        # Twitter and Discord only budget requests
+        self.requests.sync(
+            _int_header(headers, "x-rate-limit-limit") or _int_header(headers, "x-ratelimit-limit"),
+            _int_header(headers, "x-rate-limit-remaining")
+            if "x-rate-limit-remaining" in headers
+            else _int_header(headers, "x-ratelimit-remaining"),
+            _parse_reset(
+                headers.get("x-rate-limit-reset") or headers.get("x-ratelimit-reset-after")
+            ),
+        )
+
+        if status_code == 429:
+            retry_after = _parse_reset(headers.get("retry-after"))
+            if retry_after is None:
+                retry_after = _parse_reset(
+                    headers.get("x-rate-limit-reset") or headers.get("x-ratelimit-reset-after")
+                )
+            retry_after = retry_after if retry_after is not None else 60.0
+            logger.warning(f"{self.provider} rate limit hit, pausing callers for {retry_after:.1f}s")
+            self.requests.block(retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests.snapshot(),
+            "tokens": self.tokens.snapshot(),
+            "throttled": self.throttled,
+            "waited_seconds": self.waited_seconds,
+        }
+
+
+def httpx_event_hooks(limiter: RateLimiter) -> Dict[str, list]:
+    """httpx event hooks that queue requests on a limiter and learn from responses
+
+    Used for SDK clients built on httpx (OpenAI, Anthropic), which covers the
+    SDK's own retries as well.
+    """
+
+    def on_request(request):
+        try:
+            tokens = estimate_tokens(request.content)
+        except Exception:
+            # Streamed request bodies can't be read up front
+            tokens = 0
+        limiter.acquire(tokens)
+
+    def on_response(response):
+        limiter.observe(response.headers, response.status_code)
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def rate_limited_http_client(provider: str, credential: str, client_class):
+    """An SDK http_client sharing the provider credential's limiter, with traced requests
+
+    `client_class` is the SDK's DefaultHttpxClient, so its timeouts and
+    connection limits are kept.
+    """
+    hooks = httpx_event_hooks(RateLimiter.for_key(provider, credential))
+    # Traced at the transport, after the limiter's request hook, so the span
+    # covers the request and not the wait, and ends when the request raises
+    return tracing.trace_http_client(client_class(event_hooks=hooks))
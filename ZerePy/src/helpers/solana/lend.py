@@ -1,6 +1,5 @@
 import base64
 import json
-import aiohttp
 from venv import logger
 
 from solana.rpc.async_api import AsyncClient
@@ -13,6 +12,7 @@ from solders import message
 from solders.keypair import Keypair  # type: ignore
 from solders.transaction import VersionedTransaction  # type: ignore
 from solders.keypair import Keypair  # type: ignore
+from src.helpers import http
 
 
 class AssetLender:
@@ -25,7 +25,7 @@ class AssetLender:
             headers = {"Content-Type": "application/json"}
             payload = json.dumps({"account": str(wallet.pubkey())})
 
-            session = aiohttp.ClientSession()
+            session = http.async_session()
 
             async with session.post(url, headers=headers, data=payload) as response:
                 if response.status != 200:
@@ -49,7 +49,6 @@ class AssetLender:
             logger.debug(
                 f"Transaction sent: https://explorer.solana.com/tx/{transaction_id}"
             )
-            await session.close()
             return str(signature)
 
         except Exception as e:
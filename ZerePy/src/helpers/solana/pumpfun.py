@@ -1,5 +1,6 @@
 import json
 import aiohttp
+from src.helpers import http
 from venv import logger
 from typing import Dict, Any, List, Optional
 from solana.rpc.commitment import Confirmed
@@ -162,41 +163,38 @@ class PumpfunTokenManager:
         mint_keypair = Keypair()
         logger.info(f"Mint public key: {mint_keypair.pubkey()}")
         try:
-            # Use a single aiohttp session for both metadata upload and transaction creation
-            async with aiohttp.ClientSession() as session:
-                logger.info("Uploading metadata to IPFS...")
-                metadata_response = await PumpfunTokenManager._upload_metadata(
-                    session, token_name, token_ticker, description, image_url, options
-                )
-                logger.info(f"Metadata response: {metadata_response}")
-
-                logger.info("Creating token transaction...")
-                tx_data = await PumpfunTokenManager._create_token_transaction(
-                    session, wallet, mint_keypair, metadata_response, options
-                )
-                logger.info("Deserializing transaction...")
-                tx = VersionedTransaction.from_bytes(tx_data)
-                logger.info("Signing transaction...")
-                signature = wallet.sign_message(message.to_bytes_versioned(tx.message))
-                logger.info("Sending transaction to Solana...")
-                signed_txn = VersionedTransaction.populate(tx.message, [signature])
-                logger.info("Transaction sent!")
-                opts = TxOpts(skip_preflight=False, preflight_commitment=Processed)
-                logger.info("Transaction sent!1")
-                result = await async_client.send_transaction(signed_txn, opts=opts)
-                logger.info("Transaction sent!2")
-                transaction_id = json.loads(result.to_json())["result"]
-
-                logger.info(
-                    f"Transaction sent: https://explorer.solana.com/tx/{transaction_id}"
-                )
-                logger.debug(
-                    f'Mint: {str(mint_keypair.pubkey())}\nSignature: {signature}\nMetadata URI: {metadata_response["metadataUri"]}'
-                )
-                # close the session
-                await session.close()
-
-                return True
+            # Use the shared aiohttp session for both metadata upload and transaction creation
+            session = http.async_session()
+            logger.info("Uploading metadata to IPFS...")
+            metadata_response = await PumpfunTokenManager._upload_metadata(
+                session, token_name, token_ticker, description, image_url, options
+            )
+            logger.info(f"Metadata response: {metadata_response}")
+
+            logger.info("Creating token transaction...")
+            tx_data = await PumpfunTokenManager._create_token_transaction(
+                session, wallet, mint_keypair, metadata_response, options
+            )
+            logger.info("Deserializing transaction...")
+            tx = VersionedTransaction.from_bytes(tx_data)
+            logger.info("Signing transaction...")
+            signature = wallet.sign_message(message.to_bytes_versioned(tx.message))
+            logger.info("Sending transaction to Solana...")
+            signed_txn = VersionedTransaction.populate(tx.message, [signature])
+            logger.info("Transaction sent!")
+            opts = TxOpts(skip_preflight=False, preflight_commitment=Processed)
+            logger.info("Transaction sent!1")
+            result = await async_client.send_transaction(signed_txn, opts=opts)
+            logger.info("Transaction sent!2")
+            transaction_id = json.loads(result.to_json())["result"]
+
+            logger.info(
+                f"Transaction sent: https://explorer.solana.com/tx/{transaction_id}"
+            )
+            logger.debug(
+                f'Mint: {str(mint_keypair.pubkey())}\nSignature: {signature}\nMetadata URI: {metadata_response["metadataUri"]}'
+            )
+            return True
 
         except Exception as error:
             logger.error(f"Error in launch_pumpfun_token: {error}")
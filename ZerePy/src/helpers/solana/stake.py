@@ -1,6 +1,5 @@
 import base64
 import json
-import aiohttp
 from venv import logger
 
 from solana.rpc.async_api import AsyncClient
@@ -12,6 +11,7 @@ from solders.keypair import Keypair  # type: ignore
 from solders.transaction import VersionedTransaction  # type: ignore
 
 from solders.keypair import Keypair  # type: ignore
+from src.helpers import http
 
 
 class StakeManager:
@@ -25,12 +25,12 @@ class StakeManager:
             url = f"https://worker.jup.ag/blinks/swap/So11111111111111111111111111111111111111112/jupSoLaHXQiZZTSfEWMTRRgpnyFm8f6sZdosWBjx93v/{amount}"
             payload = {"account": str(wallet.pubkey())}
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as res:
-                    if res.status != 200:
-                        raise Exception(f"Failed to fetch transaction: {res.status}")
+            session = http.async_session()
+            async with session.post(url, json=payload) as res:
+                if res.status != 200:
+                    raise Exception(f"Failed to fetch transaction: {res.status}")
 
-                    data = await res.json()
+                data = await res.json()
 
             raw_transaction = VersionedTransaction.from_bytes(
                 base64.b64decode(data["transaction"])
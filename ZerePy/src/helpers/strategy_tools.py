@@ -0,0 +1,118 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, List
+
+# Parameters of each strategy function, the description comes from the agent
+STRATEGY_PARAMETERS = {
+    "swap-to-single": {
+        "type": "object",
+        "properties": {
+            "tokens_in": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "The token addresses to sell. Item must be a supported token.",
+            },
+            "token_out": {
+                "type": "string",
+                "description": "The token address to buy. Must be a supported token.",
+            },
+        },
+        "required": ["tokens_in", "token_out"],
+        "additionalProperties": False,
+    },
+    "swap-to-many": {
+        "type": "object",
+        "properties": {
+            "token_in": {
+                "type": "string",
+                "description": "The token address to sell. Must be a supported token.",
+            },
+            "tokens_out": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "The token addresses to buy. Item must be a supported token.",
+            },
+        },
+        "required": ["token_in", "tokens_out"],
+        "additionalProperties": False,
+    },
+    "adjust-split-ratio": {
+        "type": "object",
+        "properties": {
+            "ratio": {
+                "type": "array",
+                "items": {"type": "number"},
+                "description": "Sum must always be 10000.",
+            }
+        },
+        "required": ["ratio"],
+        "additionalProperties": False,
+    },
+    "none": {
+        "type": "object",
+        "properties": {
+            "message": {
+                "type": "string",
+                "description": "The reason why you used this function",
+            }
+        },
+        "required": ["message"],
+        "additionalProperties": False,
+    },
+}
+
+
+def strategies_key(strategies: Dict[str, List[str]]) -> str:
+    """Canonical JSON of an agent's strategies, used as a cache key"""
+    return json.dumps(strategies, sort_keys=True, separators=(",", ":"))
+
+
+def _descriptions(key: str) -> Dict[str, str]:
+    strategies = json.loads(key)
+    return {
+        name: " ".join(strategies[name.replace("-", "_")])
+        for name in STRATEGY_PARAMETERS
+    }
+
+
+@lru_cache(maxsize=256)
+def _openai_tools(key: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": STRATEGY_PARAMETERS[name],
+                "strict": True,
+            },
+        }
+        for name, description in _descriptions(key).items()
+    ]
+
+
+@lru_cache(maxsize=256)
+def _anthropic_tools(key: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": name,
+            "description": description,
+            "input_schema": STRATEGY_PARAMETERS[name],
+        }
+        for name, description in _descriptions(key).items()
+    ]
+
+
+def get_strategy_tools(strategies: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Strategy tools in the OpenAI chat completions format.
+
+    Built once per distinct set of strategies, byte-identical across calls so
+    the provider can serve the request prefix from its prompt cache. The
+    returned list is shared and must not be mutated.
+    """
+    return _openai_tools(strategies_key(strategies))
+
+
+def get_anthropic_strategy_tools(strategies: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Strategy tools in the Anthropic messages format, shared like get_strategy_tools"""
+    return _anthropic_tools(strategies_key(strategies))
@@ -0,0 +1,44 @@
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Type, TypeVar
+
+from src.helpers import workers
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+def stream_chat_completion(
+    client: Any,
+    model: str,
+    messages: List[Dict[str, str]],
+    error_class: Type[Exception] = Exception,
+    **kwargs,
+) -> Iterator[str]:
+    """Yield the text deltas of an OpenAI-compatible chat completion stream"""
+    try:
+        stream = client.chat.completions.create(
+            model=model, messages=messages, stream=True, **kwargs
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        raise error_class(f"Text streaming failed: {e}") from e
+
+
+async def iterate_in_thread(
+    iterator: Iterator[T], executor: Optional[Executor] = None
+) -> AsyncIterator[T]:
+    """Consume a blocking iterator from a worker thread, one item at a time
+
+    Runs on `executor` when given, else on the context's executor.
+    """
+    while True:
+        if executor is not None:
+            item = await workers.run_in_executor(executor, next, iterator, _DONE)
+        else:
+            item = await workers.to_thread(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from src.helpers import http
+
+logger = logging.getLogger("helpers.ticker_index")
+
+DEXSCREENER_SEARCH_URL = "https://api.dexscreener.com/latest/dex/search"
+
+# How candidates for the same (chain, ticker) are ranked
+RANK_FDV = "fdv"
+RANK_ACTIVITY = "activity"  # liquidity (USD) * 24h volume
+
+
+class TickerIndex:
+    """Process-wide ticker -> token address index shared by every chain.
+
+    One DexScreener search returns pairs across many chains, and the
+    searched ticker is indexed for every chain in the response, so a single
+    request fills the answer for all chains at once. Hits are kept for `ttl` seconds and misses for
+    `negative_ttl` seconds. The index can be saved to, and served from, a
+    JSON snapshot for offline use.
+    """
+
+    _instance: Optional["TickerIndex"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        negative_ttl: float = 300,
+        snapshot_path: Optional[str] = None,
+        offline: Optional[bool] = None,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.snapshot_path = snapshot_path or os.getenv("ZEREPY_TICKER_SNAPSHOT")
+        self.offline = (
+            offline
+            if offline is not None
+            else os.getenv("ZEREPY_TICKER_OFFLINE", "").lower() in ("1", "true")
+        )
+
+        self._lock = threading.Lock()
+        # (chain, ticker) -> (filled_at, {address: (fdv, activity)})
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict[str, Tuple[float, float]]]] = {}
+        # (chain, ticker) -> time of the search that did not find it
+        self._misses: Dict[Tuple[str, str], float] = {}
+
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            self.load_snapshot(self.snapshot_path)
+
+    @classmethod
+    def instance(cls) -> "TickerIndex":
+        """Get the shared index for this process"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def _best(candidates: Dict[str, Tuple[float, float]], rank: str) -> Optional[str]:
+        if not candidates:
+            return None
+        score = 0 if rank == RANK_FDV else 1
+        return max(candidates.items(), key=lambda item: item[1][score])[0]
+
+    def _lookup(self, chain: str, ticker: str, rank: str) -> Tuple[bool, Optional[str]]:
+        """Answer from the index, returns (is_fresh, address)"""
+        key = (chain, ticker)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                filled_at, candidates = self._entries[key]
+                if self.offline or now - filled_at < self.ttl:
+                    return True, self._best(candidates, rank)
+            if key in self._misses:
+                if self.offline or now - self._misses[key] < self.negative_ttl:
+                    return True, None
+        return self.offline, None
+
+    def _index_pairs(self, pairs: list, searched: str) -> None:
+        """Index the base tokens of a search's pairs
+
+        The search only returns every candidate of the ticker that was
+        searched, so only those entries are replaced and refreshed. Other
+        tickers that show up are merged into what is already indexed for
+        them, without extending their freshness.
+        """
+        now = time.monotonic()
+        found: Dict[Tuple[str, str], Dict[str, Tuple[float, float]]] = {}
+
+        for pair in pairs:
+            base_token = pair.get("baseToken") or {}
+            chain = (pair.get("chainId") or "").lower()
+            symbol = (base_token.get("symbol") or "").lower()
+            address = base_token.get("address")
+            if not chain or not symbol or not address:
+                continue
+
+            fdv = float(pair.get("fdv") or 0)
+            activity = float((pair.get("liquidity") or {}).get("usd") or 0) * float(
+                (pair.get("volume") or {}).get("h24") or 0
+            )
+
+            # A token trades in many pairs, keep its best scores
+            candidates = found.setdefault((chain, symbol), {})
+            best_fdv, best_activity = candidates.get(address, (0.0, 0.0))
+            candidates[address] = (max(best_fdv, fdv), max(best_activity, activity))
+
+        with self._lock:
+            for key, candidates in found.items():
+                if key[1] == searched:
+                    self._entries[key] = (now, candidates)
+                    self._misses.pop(key, None)
+                elif key in self._entries:
+                    filled_at, indexed = self._entries[key]
+                    merged = dict(indexed)
+                    for address, (fdv, activity) in candidates.items():
+                        best_fdv, best_activity = merged.get(address, (0.0, 0.0))
+                        merged[address] = (max(best_fdv, fdv), max(best_activity, activity))
+                    self._entries[key] = (filled_at, merged)
+
+    def _search(self, ticker: str) -> None:
+        response = http.get(DEXSCREENER_SEARCH_URL, params={"q": ticker})
+        response.raise_for_status()
+        self._index_pairs(response.json().get("pairs") or [], ticker)
+
+    def resolve(self, ticker: str, chain: str, rank: str = RANK_FDV) -> Optional[str]:
+        """Resolve a ticker to the address of its best ranked token on a chain"""
+        ticker = ticker.lower()
+        chain = chain.lower()
+
+        fresh, address = self._lookup(chain, ticker, rank)
+        if fresh:
+            return address
+
+        self._search(ticker)
+
+        fresh, address = self._lookup(chain, ticker, rank)
+        if not fresh:
+            with self._lock:
+                self._misses[(chain, ticker)] = time.monotonic()
+        return address
+
+    def save_snapshot(self, path: Optional[str] = None) -> None:
+        """Write the indexed tickers to a JSON file usable in offline mode"""
+        path = path or self.snapshot_path
+        with self._lock:
+            snapshot: Dict[str, Dict[str, Dict[str, list]]] = {}
+            for (chain, ticker), (_, candidates) in self._entries.items():
+                snapshot.setdefault(chain, {})[ticker] = {
+                    address: list(scores) for address, scores in candidates.items()
+                }
+        with open(path, "w") as f:
+            json.dump(snapshot, f, indent=2)
+
+    def load_snapshot(self, path: str) -> None:
+        """Load tickers from a JSON snapshot written by save_snapshot()"""
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load ticker snapshot {path}: {e}")
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            for chain, tickers in snapshot.items():
+                for ticker, candidates in tickers.items():
+                    self._entries[(chain, ticker)] = (
+                        now,
+                        {address: tuple(scores) for address, scores in candidates.items()},
+                    )
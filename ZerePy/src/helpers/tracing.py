@@ -0,0 +1,457 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("helpers.tracing")
+
+# off, memory (default, feeds the slow iteration report), jsonl (memory and a
+# file) or otel (spans go to the OpenTelemetry SDK configured by the host)
+MODE = os.getenv("ZEREPY_TRACING", "memory").lower()
+# Finished spans kept in memory for the slow iteration report
+MEMORY_SPANS = int(os.getenv("ZEREPY_TRACING_MEMORY_SPANS", 20000))
+JSONL_PATH = os.getenv("ZEREPY_TRACING_FILE", "traces.jsonl")
+
+# Root span of one agent loop iteration, the unit of the slow iteration report
+ITERATION_SPAN = "agent.iteration"
+
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("zerepy_span", default=None)
+
+
+class Span:
+    """A timed operation in a trace, shaped after the OpenTelemetry span model"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+        "status_message",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.status = STATUS_OK
+        self.status_message = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, description: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = description
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.set_error(f"{type(exception).__name__}: {exception}")
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            Tracer.instance().export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OTLP-style JSON field names, so local files load in OTel tooling"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans, for the slow iteration report"""
+
+    def __init__(self, max_spans: int = MEMORY_SPANS):
+        self._spans = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self) -> List[Dict[str, Any]]:
+        return [span.to_dict() for span in list(self._spans)]
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to a file"""
+
+    def __init__(self, path: str = JSONL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        atexit.register(self.close)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class _SpanScope:
+    """Makes a span current for a block, ending it and recording errors on exit"""
+
+    __slots__ = ("name", "attributes", "span", "token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.name, _current_span.get(), self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self.token)
+        if exc is not None:
+            self.span.record_exception(exc)
+        self.span.end()
+        return False
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, description: str) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _OtelSpan:
+    """Gives an OpenTelemetry span the set_error method of Span"""
+
+    __slots__ = ("_span",)
+
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self._span.set_attribute(key, value)
+
+    def set_error(self, description: str) -> None:
+        from opentelemetry.trace import Status, StatusCode
+
+        self._span.set_status(Status(StatusCode.ERROR, description))
+
+    def record_exception(self, exception: BaseException) -> None:
+        self._span.record_exception(exception)
+        self.set_error(f"{type(exception).__name__}: {exception}")
+
+    def end(self) -> None:
+        self._span.end()
+
+
+class _OtelScope:
+    __slots__ = ("scope",)
+
+    def __init__(self, scope):
+        self.scope = scope
+
+    def __enter__(self) -> _OtelSpan:
+        return _OtelSpan(self.scope.__enter__())
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.scope.__exit__(exc_type, exc, tb)
+
+
+class Tracer:
+    """Process-wide span factory and exporter fan-out, configured by ZEREPY_TRACING"""
+
+    _instance: Optional["Tracer"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, mode: str = MODE):
+        self.mode = mode
+        self.memory: Optional[InMemoryExporter] = None
+        self.exporters = []
+        self._otel = None
+
+        if mode == "otel":
+            try:
+                from opentelemetry import trace
+
+                self._otel = trace.get_tracer("zerepy")
+            except ImportError:
+                logger.warning("opentelemetry is not installed, keeping spans in memory")
+                self.mode = mode = "memory"
+
+        if mode in ("memory", "jsonl"):
+            self.memory = InMemoryExporter()
+            self.exporters.append(self.memory)
+        if mode == "jsonl":
+            self.exporters.append(JsonlExporter())
+
+    @classmethod
+    def instance(cls) -> "Tracer":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.debug(f"Exporting span {span.name} failed: {e}")
+
+    def span(self, name: str, attributes: Dict[str, Any]):
+        if self._otel is not None:
+            return _OtelScope(
+                self._otel.start_as_current_span(
+                    name,
+                    attributes={k: v for k, v in attributes.items() if v is not None},
+                    record_exception=False,
+                    set_status_on_exception=True,
+                )
+            )
+        if not self.exporters:
+            return _NOOP
+        return _SpanScope(name, attributes)
+
+    def start_span(self, name: str, attributes: Dict[str, Any]):
+        if self._otel is not None:
+            return _OtelSpan(
+                self._otel.start_span(
+                    name, attributes={k: v for k, v in attributes.items() if v is not None}
+                )
+            )
+        if not self.exporters:
+            return _NOOP
+        return Span(name, _current_span.get(), attributes)
+
+
+def span(name: str, **attributes):
+    """Trace a block as a child of the current span
+
+        with span("sonic.strategy", connection="sonic") as current:
+            current.set_attribute("tx_hash", tx_hash)
+
+    Worker threads started with asyncio.to_thread inherit the current span.
+    """
+    return Tracer.instance().span(name, attributes)
+
+
+def start_span(name: str, **attributes):
+    """Start a child of the current span without making it current, the caller ends it"""
+    return Tracer.instance().start_span(name, attributes)
+
+
+def rpc_span_middleware(connection_name: str):
+    """web3 middleware tracing every JSON-RPC request of a connection"""
+
+    def middleware(make_request, w3):
+        def traced_request(method, params):
+            with span(f"rpc.{method}", connection=connection_name, method=method) as current:
+                response = make_request(method, params)
+                if isinstance(response, dict) and "error" in response:
+                    current.set_error(str(response["error"]))
+                return response
+
+        return traced_request
+
+    return middleware
+
+
+class _TracedTransport:
+    """httpx transport wrapper tracing each request a client sends, retries included
+
+    Wrapping the transport rather than using event hooks means a request that
+    raises (timeout, connect error, reset) still ends its span, with the
+    exception recorded, since no response hook fires for it.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        with span("http.request", method=request.method, host=request.url.host) as current:
+            response = self._transport.handle_request(request)
+            current.set_attribute("status_code", response.status_code)
+            if response.status_code >= 400:
+                current.set_error(f"HTTP {response.status_code}")
+            return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._transport.__exit__(exc_type, exc, tb)
+
+
+def trace_http_client(client):
+    """Trace every request an httpx client sends, returning the client
+
+    The client's own transport (with the SDK's connection limits) is kept and
+    wrapped in place.
+    """
+    client._transport = _TracedTransport(client._transport)
+    return client
+
+
+def _critical_path(
+    root: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]], depth: int = 0
+) -> List[Dict[str, Any]]:
+    """The chain of spans that determined the root's end time, depth first
+
+    Walking back from the root's end, each step takes the child that ended
+    last before the cursor, so concurrent work that finished early is left
+    out and only what the iteration actually waited on remains.
+    """
+    cursor = root["endTimeUnixNano"]
+    chain = []
+    for child in sorted(
+        children.get(root["spanId"], []), key=lambda s: s["endTimeUnixNano"], reverse=True
+    ):
+        if child["endTimeUnixNano"] <= cursor:
+            chain.append(child)
+            cursor = child["startTimeUnixNano"]
+
+    path = [{"depth": depth, "span": root}]
+    for child in reversed(chain):
+        path.extend(_critical_path(child, children, depth + 1))
+    return path
+
+
+def slow_iterations(
+    limit: int = 5,
+    agent: Optional[str] = None,
+    spans: Optional[Iterable[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """The slowest agent loop iterations with their critical paths
+
+    Args:
+        limit: How many iterations to report
+        agent: Only report iterations of this strategy address
+        spans: Span dicts to analyse, the in-memory spans by default
+    """
+    if spans is None:
+        memory = Tracer.instance().memory
+        spans = memory.spans() if memory else []
+
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    roots = []
+    for span_dict in spans:
+        if span_dict.get("endTimeUnixNano") is None:
+            continue
+        if span_dict["name"] == ITERATION_SPAN:
+            if agent is None or span_dict["attributes"].get("agent") == agent:
+                roots.append(span_dict)
+        elif span_dict.get("parentSpanId"):
+            children.setdefault(span_dict["parentSpanId"], []).append(span_dict)
+
+    roots.sort(key=lambda s: s["endTimeUnixNano"] - s["startTimeUnixNano"], reverse=True)
+
+    report = []
+    for root in roots[:limit]:
+        started = root["startTimeUnixNano"]
+        report.append(
+            {
+                "trace_id": root["traceId"],
+                "agent": root["attributes"].get("agent"),
+                "duration_ms": (root["endTimeUnixNano"] - started) / 1e6,
+                "status": root["status"]["code"],
+                "critical_path": [
+                    {
+                        "name": entry["span"]["name"],
+                        "depth": entry["depth"],
+                        "offset_ms": (entry["span"]["startTimeUnixNano"] - started) / 1e6,
+                        "duration_ms": (
+                            entry["span"]["endTimeUnixNano"] - entry["span"]["startTimeUnixNano"]
+                        )
+                        / 1e6,
+                        "status": entry["span"]["status"]["code"],
+                        "attributes": entry["span"]["attributes"],
+                    }
+                    for entry in _critical_path(root, children)
+                ],
+            }
+        )
+    return report
+
+
+def format_report(report: List[Dict[str, Any]]) -> str:
+    lines = []
+    for iteration in report:
+        lines.append(
+            f"{iteration['agent']}  {iteration['duration_ms']:.0f} ms  "
+            f"{iteration['status']}  trace {iteration['trace_id']}"
+        )
+        for entry in iteration["critical_path"]:
+            indent = "  " * (entry["depth"] + 1)
+            status = "" if entry["status"] == STATUS_OK else f"  {entry['status']}"
+            lines.append(
+                f"{indent}{entry['name']:<{max(1, 48 - len(indent))}} "
+                f"+{entry['offset_ms']:8.1f} ms  {entry['duration_ms']:8.1f} ms{status}"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def read_jsonl(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Slowest agent iterations in a span file")
+    parser.add_argument("path", nargs="?", default=JSONL_PATH)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--agent", default=None)
+    args = parser.parse_args()
+
+    print(format_report(slow_iterations(args.limit, args.agent, read_jsonl(args.path))))
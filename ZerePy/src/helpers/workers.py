@@ -0,0 +1,40 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Pool the blocking calls of the current task are offloaded to, None for the
+# loop's default executor. Set by the server's AgentScheduler for agent loops,
+# so their work queues on the scheduler's pool and not in front of requests.
+current_executor: ContextVar[Optional[Executor]] = ContextVar(
+    "zerepy_executor", default=None
+)
+
+
+async def run_in_executor(
+    executor: Optional[Executor], func: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """Like asyncio.to_thread, on a given executor, keeping the caller's context"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(executor, call)
+
+
+async def to_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """asyncio.to_thread on the executor selected for the current context"""
+    return await run_in_executor(current_executor.get(), func, *args, **kwargs)
+
+
+@contextmanager
+def use_executor(executor: Optional[Executor]):
+    """Offload the blocking calls made inside the block to `executor`"""
+    token = current_executor.set(executor)
+    try:
+        yield executor
+    finally:
+        current_executor.reset(token)
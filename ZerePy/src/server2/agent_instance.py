@@ -1,8 +1,9 @@
-import time
+import asyncio
 from typing import Optional
-from src.cli import ZerePyCLI
+from src.agent import ZerePyAgent, load_agent_from_database, load_agent_from_file
+from src.helpers.llm_scheduler import LLMScheduler
+from src.server2.scheduler import AgentScheduler
 import logging
-import threading
 
 logger = logging.getLogger("agent_instance")
 
@@ -10,55 +11,49 @@ logger = logging.getLogger("agent_instance")
 class AgentInstance:
     """Class representing an individual agent instance"""
 
-    async def init(self, strategy_address: str, database: bool = False):
-        self.cli = ZerePyCLI()
+    def __init__(self, scheduler: AgentScheduler):
+        self.scheduler = scheduler
+        self.agent: Optional[ZerePyAgent] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
 
-        # Load agent during creation
+    async def init(self, strategy_address: str, database: bool = False):
+        # Load agent during creation, headless: no CLI session per hosted agent
         if database:
-            await self.cli._load_agent_from_database(strategy_address=strategy_address)
+            self.agent = await load_agent_from_database(strategy_address)
         else:
-            self.cli._load_agent_from_file(agent_name=strategy_address)
+            self.agent = load_agent_from_file(strategy_address)
 
-        self.running = False
-        self._stop_event = threading.Event()
-        self.task: Optional[threading.Thread] = None
+        self.strategy_address = strategy_address
+        logger.info(f"Loaded agent: {self.agent.name}")
 
-    def _run_agent_loop(self):
-        """Agent loop execution logic"""
-        try:
-            log_once = False
-            while not self._stop_event.is_set():
-                if self.cli.agent:
-                    try:
-                        if not log_once:
-                            logger.info(f"Agent loop running for {self.cli.agent.name}")
-                            log_once = True
+        # Connect the agent's connections in the background, loading returns
+        # right away and actions connect on first use if this has not finished
+        self._warm_up_task = asyncio.create_task(
+            self.agent.connection_manager.warm_up_async(),
+            name=f"warm-up:{strategy_address}",
+        )
 
-                        self.cli.agent.loop()
+    def readiness(self):
+        """Readiness of each of the agent's connections"""
+        return self.agent.connection_manager.readiness()
 
-                        time.sleep(1)  # Prevent tight loop
-                    except Exception as e:
-                        logger.error(f"Agent error: {e}")
-                        if self._stop_event.wait(timeout=30):
-                            break
-        except Exception as e:
-            logger.error(f"Agent loop crashed: {e}")
-        finally:
-            self.running = False
-            logger.info(f"Agent {self.cli.agent.name} stopped")
+    @property
+    def running(self) -> bool:
+        return self.scheduler.is_running(self.strategy_address)
 
     def start(self):
-        """Start the agent's loop thread"""
+        """Schedule the agent's loop on the server event loop"""
+        if not self.agent:
+            raise ValueError(f"Agent {self.strategy_address} is not loaded")
+
         if not self.running:
-            self.running = True
-            self._stop_event.clear()
-            self.task = threading.Thread(target=self._run_agent_loop)
-            self.task.start()
+            self.scheduler.start(self.strategy_address, self.agent)
+            logger.info(f"Agent loop running for {self.agent.name}")
 
-    def stop(self):
-        """Stop the agent's loop thread"""
+    async def stop(self):
+        """Stop the agent's loop and drop its queued LLM calls"""
+        # Queued calls fail fast, so the loop sees its stop event right away
+        LLMScheduler.instance().cancel(self.strategy_address)
         if self.running:
-            self._stop_event.set()
-            if self.task:
-                self.task.join(timeout=5)
-            self.running = False
+            await self.scheduler.stop(self.strategy_address)
+            logger.info(f"Agent {self.agent.name} stopped")
@@ -1,21 +1,75 @@
+import re
 import time
 import json
 import os
-from fastapi import FastAPI, HTTPException, Query
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.server2.agent_instance import AgentInstance
+from src.server2.scheduler import AgentScheduler
+from src.server2.leases import LeaseManager
+from src.helpers import http, workers
+from src.helpers.llm_usage import get_usage_stats
+from src.helpers.llm_batch import DecisionBatcher, TextBatchQueue
+from src.helpers.llm_router import ProviderStats
+from src.helpers.llm_scheduler import PRIORITY_INTERACTIVE, LLMScheduler
+from src.helpers.metrics import CONTENT_TYPE, MetricsRegistry
+from src.helpers.tracing import slow_iterations
+from src.helpers.rate_limiter import RateLimiter
+from src.helpers.streaming import iterate_in_thread
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import logging
 import asyncio
 from pathlib import Path
-from src.database.mongo_db import MongoDB
-from src.database.models import AgentJson, Chat, Post, Activity
+from src.database.mongo_db import HAS_TX_HASH, MongoDB
+from src.database.activity_writer import ActivityWriter
+from src.database.agent_cache import AgentCache, CachedValue
+from src.database.models import (
+    AgentJson,
+    Chat,
+    Post,
+    Activity,
+    AgentPage,
+    ChatPage,
+    PostPage,
+    ActivityPage,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("server2/app")
 
 mongo_db = MongoDB()
+agent_cache = AgentCache.instance()
+
+# Seconds a chat request may wait for an LLM slot before it is refused
+CHAT_QUEUE_TIMEOUT = float(os.getenv("ZEREPY_CHAT_QUEUE_TIMEOUT", 30))
+# Writes left to finish after their request ended, referenced until done so
+# the loop doesn't garbage collect them mid-flight
+_background_tasks = set()
+
+
+def _serialize_agent(document: dict) -> bytes:
+    """Validate an agent document once, when it enters the cache"""
+    return json.dumps(jsonable_encoder(AgentJson(**document))).encode("utf-8")
+
+
+def _serialize_agents(documents: List[dict]) -> bytes:
+    return json.dumps(
+        [jsonable_encoder(AgentJson(**document)) for document in documents]
+    ).encode("utf-8")
+
+
+def _cached_response(entry: CachedValue, if_none_match: Optional[str]) -> Response:
+    """Serve a cache entry, answering 304 when the client already has it"""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match and entry.etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=entry.body, media_type="application/json", headers=headers
+    )
 
 
 class CreateRequest(BaseModel):
@@ -51,18 +105,75 @@ class CreatePostRequest(BaseModel):
     post: Post
 
 
+# Agent endpoints that must be served by the node running the agent
+OWNED_AGENT_PATH = re.compile(
+    r"^/agents/(?P<strategy_address>[^/]+)/(load|start|stop|action|chat|chat/stream|connections/.+)$"
+)
+
+
+class AgentOwnedElsewhere(Exception):
+    """Raised when another node holds the lease on an agent"""
+
+    def __init__(self, strategy_address: str, owner_id: str = "", owner_url: str = ""):
+        super().__init__(
+            f"Agent {strategy_address} is running on node {owner_id or 'unknown'}"
+            + (f" at {owner_url}" if owner_url else "")
+        )
+        self.owner_id = owner_id
+        self.owner_url = owner_url
+
+
 class ServerState:
     """Manages multiple agent instances"""
 
     def __init__(self):
         # strategy_address -> AgentInstance
         self.agents: Dict[str, AgentInstance] = {}
+        # Runs every started agent loop as a coroutine on the server loop
+        self.scheduler = AgentScheduler()
+        # Chat calls block on the LLM, they get their own workers so they never
+        # queue behind agent iterations or other offloads before reaching
+        # their interactive LLMScheduler slot
+        self.chat_executor = ThreadPoolExecutor(
+            max_workers=LLMScheduler.instance().class_concurrency[PRIORITY_INTERACTIVE],
+            thread_name_prefix="zerepy-chat",
+        )
+        # Running agents are sharded across nodes once this node has a public URL
+        self.leases: Optional[LeaseManager] = None
+        if os.getenv("ZEREPY_NODE_URL"):
+            self.leases = LeaseManager(
+                mongo_db,
+                on_acquire=self._acquire_agent,
+                on_release=self._release_agent,
+            )
+
+    async def _acquire_agent(self, strategy_address: str):
+        """Start an agent this node just claimed from a failed or busier node"""
+        if not self.get_agent(strategy_address):
+            await self.load_agent(strategy_address, database=True)
+        self.agents[strategy_address].start()
+
+    async def _release_agent(self, strategy_address: str):
+        """Stop an agent whose lease moved to another node"""
+        if agent := self.get_agent(strategy_address):
+            await agent.stop()
+
+    async def owner_url(self, strategy_address: str) -> Optional[str]:
+        """URL of the node running an agent, None when it is this node or nobody"""
+        if not self.leases or self.leases.owns(strategy_address):
+            return None
+
+        owner = await self.leases.owner_of(strategy_address)
+        if owner and owner[0] != self.leases.node_id and owner[1]:
+            return owner[1]
+        return None
 
     async def create_agent(self, agent_json: AgentJson, database: bool = False) -> str:
         """Create a new agent instance and return its ID"""
         try:
             if database:
                 await mongo_db.insert_one("agents", agent_json.dict())
+                agent_cache.invalidate(agent_json.strategy_address)
             else:
                 # Ensure the folder exists
                 os.makedirs(Path("agents"), exist_ok=True)
@@ -86,11 +197,11 @@ class ServerState:
     async def load_agent(self, strategy_address, database: bool = False):
         """Load an agent instance and return its ID"""
         try:
-            self.agents[strategy_address] = AgentInstance()
-
-            await self.agents[strategy_address].init(
-                strategy_address=strategy_address, database=database
-            )
+            # Only registered once init succeeded, so a failed load leaves no
+            # half-built agent behind for the other endpoints to trip over
+            instance = AgentInstance(scheduler=self.scheduler)
+            await instance.init(strategy_address=strategy_address, database=database)
+            self.agents[strategy_address] = instance
             return strategy_address
         except Exception as e:
             logger.error(f"Agent load failed: {e}")
@@ -102,21 +213,48 @@ class ServerState:
 
     async def remove_agent(self, strategy_address: str):
         """Cleanup and remove an agent instance"""
-        if agent := self.agents.get(strategy_address=strategy_address):
+        if agent := self.agents.get(strategy_address):
             await self.stop_agent_loop(strategy_address=strategy_address)
             del self.agents[strategy_address]
+            MetricsRegistry.instance().remove_series("agent", strategy_address)
 
     async def start_agent_loop(self, strategy_address: str):
         """Start a specific agent's loop"""
         if agent := self.get_agent(strategy_address=strategy_address):
+            if self.leases and not await self.leases.claim(strategy_address):
+                owner = await self.leases.owner_of(strategy_address)
+                raise AgentOwnedElsewhere(strategy_address, *(owner or ()))
             agent.start()
         else:
             raise ValueError("Agent not found")
 
     async def stop_agent_loop(self, strategy_address: str):
-        """Stop a specific agent's loop"""
+        """Stop a specific agent's loop and mark it stopped"""
         if agent := self.get_agent(strategy_address=strategy_address):
-            agent.stop()
+            await agent.stop()
+
+        await mongo_db.update_one(
+            collection_name="agents",
+            query={"strategy_address": strategy_address},
+            data={"state": "stopped"},
+        )
+        agent_cache.invalidate(strategy_address)
+
+        # Release only once the agent no longer shows as running, or another
+        # node's rebalance could claim and restart it in between
+        if self.leases:
+            await self.leases.release(strategy_address)
+
+    async def shutdown(self):
+        """Stop all running agent loops, flush queued activities and release pooled HTTP connections"""
+        await self.scheduler.shutdown()
+        self.chat_executor.shutdown(wait=False, cancel_futures=True)
+        # Only hand leases over once our loops are stopped, so no agent runs twice
+        if self.leases:
+            await self.leases.stop()
+        await agent_cache.stop_watching()
+        await asyncio.to_thread(ActivityWriter.instance().close)
+        await http.get_client().close_async()
 
 
 class ZerePyServer:
@@ -136,6 +274,38 @@ class ZerePyServer:
         )
         self.state = ServerState()
 
+        @self.app.on_event("startup")
+        async def startup():
+            try:
+                await mongo_db.ensure_indexes()
+            except Exception as e:
+                logger.error(f"Could not create MongoDB indexes: {e}")
+
+            # Multi-node setups need to see agent writes made by other nodes
+            if os.getenv("ZEREPY_AGENT_CACHE_CHANGE_STREAM", "").lower() in ("1", "true"):
+                agent_cache.start_watching()
+
+            if self.state.leases:
+                await self.state.leases.start()
+
+        @self.app.middleware("http")
+        async def route_to_owner(request: Request, call_next):
+            """Redirect agent requests to the node holding the agent's lease"""
+            match = OWNED_AGENT_PATH.match(request.url.path)
+            if match and self.state.leases:
+                owner_url = await self.state.owner_url(match["strategy_address"])
+                if owner_url:
+                    location = f"{owner_url}{request.url.path}"
+                    if request.url.query:
+                        location = f"{location}?{request.url.query}"
+                    # 307 keeps the method and body
+                    return RedirectResponse(location, status_code=307)
+            return await call_next(request)
+
+        @self.app.on_event("shutdown")
+        async def shutdown():
+            await self.state.shutdown()
+
         # Create agent and return instance ID
         @self.app.post("/agents/create")
         async def create_agent(create_request: CreateRequest, database: bool = False):
@@ -156,6 +326,7 @@ class ZerePyServer:
             creator: str = None,
             page: int = Query(1, alias="page", ge=1),
             limit: int = Query(10, alias="limit", le=100),
+            if_none_match: Optional[str] = Header(None),
         ):
             try:
                 if creator and visibility:
@@ -168,26 +339,59 @@ class ZerePyServer:
                     query = None
 
                 if database:
-                    items, total = await mongo_db.find(
-                        collection_name="agents", page=page, limit=limit, query=query
+                    entry = await agent_cache.list_agents(
+                        query, page, limit, serialize=_serialize_agents
                     )
-                    return items
+                    return _cached_response(entry, if_none_match)
                 else:
                     return {"message": "Not supported"}
             except Exception as e:
                 raise HTTPException(400, detail=str(e))
 
+        # Keyset-paginated agents, pass back next_cursor to get the next page
+        @self.app.get("/agents/page", response_model=AgentPage)
+        async def agents_page(
+            visibility: str = None,
+            creator: str = None,
+            cursor: str = None,
+            limit: int = Query(10, alias="limit", ge=1, le=100),
+            with_total: bool = False,
+        ):
+            try:
+                query = {}
+                if creator:
+                    query["creator"] = creator
+                if visibility:
+                    query["visibility"] = visibility
+
+                items, next_cursor = await mongo_db.find_page(
+                    collection_name="agents", limit=limit, query=query, cursor=cursor
+                )
+                total = (
+                    await mongo_db.count("agents", query) if with_total else None
+                )
+                return {"items": items, "next_cursor": next_cursor, "total": total}
+            except Exception as e:
+                raise HTTPException(400, detail=str(e))
+
         @self.app.get("/agents/{strategy_address}", response_model=AgentJson)
-        async def agent(strategy_address: str, database: bool = False):
+        async def agent(
+            strategy_address: str,
+            database: bool = False,
+            if_none_match: Optional[str] = Header(None),
+        ):
             try:
                 if database:
-                    item = await mongo_db.find_one(
-                        collection_name="agents",
-                        query={"strategy_address": strategy_address},
+                    entry = await agent_cache.get_agent(
+                        strategy_address, serialize=_serialize_agent
                     )
-                    return item
+                    if entry is None:
+                        raise HTTPException(404, detail="Agent not found")
+                    return _cached_response(entry, if_none_match)
                 else:
                     return {"message": "Not supported"}
+            except HTTPException:
+                raise
             except Exception as e:
                 raise HTTPException(400, detail=str(e))
 
@@ -207,6 +411,7 @@ class ZerePyServer:
                     query={"strategy_address": strategy_address},
                     data={"state": "deployed"},
                 )
+                agent_cache.invalidate(strategy_address)
 
                 return strategy_address
             except Exception as e:
@@ -223,8 +428,23 @@ class ZerePyServer:
                     query={"strategy_address": strategy_address},
                     data={"state": "running"},
                 )
+                agent_cache.invalidate(strategy_address)
 
                 return strategy_address
+            except AgentOwnedElsewhere as e:
+                if not e.owner_url:
+                    # A relative redirect would point back at this node
+                    raise HTTPException(
+                        409,
+                        detail={
+                            "message": str(e),
+                            "owner": e.owner_id or None,
+                            "owner_url": None,
+                        },
+                    )
+                return RedirectResponse(
+                    f"{e.owner_url}/agents/{strategy_address}/start", status_code=307
+                )
             except ValueError as e:
                 raise HTTPException(404, detail=str(e))
 
@@ -232,13 +452,6 @@ class ZerePyServer:
         async def stop_agent(strategy_address: str):
             try:
                 await self.state.stop_agent_loop(strategy_address=strategy_address)
-
-                await mongo_db.update_one(
-                    collection_name="agents",
-                    query={"strategy_address": strategy_address},
-                    data={"state": "stopped"},
-                )
-
                 return strategy_address
             except ValueError as e:
                 raise HTTPException(404, detail=str(e))
@@ -249,7 +462,7 @@ class ZerePyServer:
             if agent := self.state.get_agent(strategy_address=strategy_address):
                 try:
                     await asyncio.to_thread(
-                        agent.cli.agent.perform_action,
+                        agent.agent.perform_action,
                         connection=action_request.connection,
                         action=action_request.action,
                         params=action_request.params,
@@ -273,8 +486,12 @@ class ZerePyServer:
 
                     await mongo_db.insert_one("chats", message)
 
-                    result = await asyncio.to_thread(
-                        agent.cli.agent.prompt_llm, chat_request.prompt
+                    result = await workers.run_in_executor(
+                        self.state.chat_executor,
+                        agent.agent.prompt_llm,
+                        chat_request.prompt,
+                        priority=PRIORITY_INTERACTIVE,
+                        timeout=CHAT_QUEUE_TIMEOUT,
                     )
 
                     reply = {
@@ -291,6 +508,68 @@ class ZerePyServer:
                     raise HTTPException(400, detail=str(e))
             raise HTTPException(404, detail="Agent not found")
 
+        # Streamed chat, replies as Server-Sent Events while the model generates
+        @self.app.post("/agents/{strategy_address}/chat/stream")
+        async def chat_stream(
+            strategy_address: str, chat_request: ChatRequest, user: str
+        ):
+            agent = self.state.get_agent(strategy_address)
+            if not agent:
+                raise HTTPException(404, detail="Agent not found")
+
+            await mongo_db.insert_one(
+                "chats",
+                {
+                    "sender": user,
+                    "text": chat_request.prompt,
+                    "timestamp": int(time.time() * 1000),
+                    "receiver": strategy_address,
+                },
+            )
+
+            chunks = await workers.run_in_executor(
+                self.state.chat_executor,
+                agent.agent.prompt_llm_stream,
+                chat_request.prompt,
+                priority=PRIORITY_INTERACTIVE,
+                timeout=CHAT_QUEUE_TIMEOUT,
+            )
+            if chunks is None:
+                raise HTTPException(400, detail="Streaming is not available")
+
+            async def events():
+                parts = []
+                try:
+                    async for chunk in iterate_in_thread(chunks, self.state.chat_executor):
+                        parts.append(chunk)
+                        yield f"data: {json.dumps({'text': chunk})}\n\n"
+                    yield "event: done\ndata: {}\n\n"
+                except Exception as e:
+                    logger.error(f"Chat stream failed: {e}")
+                    yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+                finally:
+                    # Persist the reply once, even if the client went away mid-stream
+                    if parts:
+                        task = asyncio.ensure_future(
+                            mongo_db.insert_one(
+                                "chats",
+                                {
+                                    "sender": strategy_address,
+                                    "text": "".join(parts),
+                                    "timestamp": int(time.time() * 1000),
+                                    "receiver": user,
+                                },
+                            )
+                        )
+                        _background_tasks.add(task)
+                        task.add_done_callback(_background_tasks.discard)
+
+            return StreamingResponse(
+                events(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
         # Get chats
         @self.app.get("/agents/{strategy_address}/chats", response_model=List[Chat])
         async def chats(
@@ -317,16 +596,54 @@ class ZerePyServer:
             except Exception as e:
                 raise HTTPException(400, detail=str(e))
 
+        # Keyset-paginated chats, newest first
+        @self.app.get(
+            "/agents/{strategy_address}/chats/page", response_model=ChatPage
+        )
+        async def chats_page(
+            strategy_address: str,
+            user: str,
+            cursor: str = None,
+            limit: int = Query(10, alias="limit", ge=1, le=100),
+            with_total: bool = False,
+        ):
+            try:
+                query = {
+                    "$or": [
+                        {"sender": user, "receiver": strategy_address},
+                        {"sender": strategy_address, "receiver": user},
+                    ]
+                }
+                items, next_cursor = await mongo_db.find_page(
+                    collection_name="chats",
+                    limit=limit,
+                    query=query,
+                    sort_field="timestamp",
+                    cursor=cursor,
+                )
+                total = await mongo_db.count("chats", query) if with_total else None
+                return {"items": items, "next_cursor": next_cursor, "total": total}
+            except Exception as e:
+                raise HTTPException(400, detail=str(e))
+
         # Agent connection management
+        @self.app.get("/agents/{strategy_address}/connections/readiness")
+        async def connections_readiness(strategy_address: str):
+            if agent := self.state.get_agent(strategy_address=strategy_address):
+                return agent.readiness()
+            raise HTTPException(404, detail="Agent not found")
+
         @self.app.post("/agents/{strategy_address}/connections/{conn_name}/configure")
         async def configure_connection(
             strategy_address: str, conn_name: str, config: ConfigureRequest
         ):
             if agent := self.state.get_agent(strategy_address=strategy_address):
-                conn = agent.cli.agent.connection_manager.connections.get(conn_name)
+                conn = agent.agent.connection_manager.connections.get(conn_name)
                 if not conn:
                     raise HTTPException(404, detail="Connection not found")
-                if conn.configure(**config.params):
+                configured = conn.configure(**config.params)
+                conn.invalidate_health()
+                if configured:
                     return {"status": "Connection configured"}
                 raise HTTPException(400, detail="Configuration failed")
             raise HTTPException(404, detail="Agent not found")
@@ -370,7 +687,7 @@ class ZerePyServer:
                     collection_name="activities",
                     page=page,
                     limit=limit,
-                    query={"initiator": initiator, "tx_hash": {"$not": {"$eq": None}}},
+                    query={"initiator": initiator, **HAS_TX_HASH},
                     sort_field="timestamp",
                     sort_order=-1,
                 )
@@ -378,6 +695,89 @@ class ZerePyServer:
             except Exception as e:
                 raise HTTPException(400, detail=str(e))
 
+        # Keyset-paginated posts, newest first
+        @self.app.get("/posts/page", response_model=PostPage)
+        async def posts_page(
+            cursor: str = None,
+            limit: int = Query(10, alias="limit", ge=1, le=100),
+            with_total: bool = False,
+        ):
+            try:
+                items, next_cursor = await mongo_db.find_page(
+                    collection_name="posts",
+                    limit=limit,
+                    sort_field="timestamp",
+                    cursor=cursor,
+                )
+                total = await mongo_db.count("posts") if with_total else None
+                return {"items": items, "next_cursor": next_cursor, "total": total}
+            except Exception as e:
+                raise HTTPException(400, detail=str(e))
+
+        # Keyset-paginated activities with a transaction, newest first
+        @self.app.get("/activities/page", response_model=ActivityPage)
+        async def activities_page(
+            initiator: str,
+            cursor: str = None,
+            limit: int = Query(10, alias="limit", ge=1, le=100),
+            with_total: bool = False,
+        ):
+            try:
+                query = {"initiator": initiator, **HAS_TX_HASH}
+                items, next_cursor = await mongo_db.find_page(
+                    collection_name="activities",
+                    limit=limit,
+                    query=query,
+                    sort_field="timestamp",
+                    cursor=cursor,
+                )
+                total = (
+                    await mongo_db.count("activities", query) if with_total else None
+                )
+                return {"items": items, "next_cursor": next_cursor, "total": total}
+            except Exception as e:
+                raise HTTPException(400, detail=str(e))
+
+        # Token usage per LLM provider, including prompt-cache hits
+        @self.app.get("/stats/llm-usage")
+        async def llm_usage():
+            return get_usage_stats()
+
+        @self.app.get("/stats/llm-batches")
+        async def llm_batches():
+            return {
+                "decisions": DecisionBatcher.for_loop().stats(),
+                "batch_api": TextBatchQueue.instance().stats(),
+            }
+
+        @self.app.get("/stats/llm-scheduler")
+        async def llm_scheduler():
+            return LLMScheduler.instance().stats()
+
+        @self.app.get("/stats/rate-limits")
+        async def rate_limits():
+            return RateLimiter.all()
+
+        @self.app.get("/stats/llm-providers")
+        async def llm_providers():
+            return ProviderStats.all()
+
+        # Slowest recent loop iterations with the spans they waited on, needs
+        # ZEREPY_TRACING=memory (the default) or jsonl
+        @self.app.get("/traces/slow-iterations")
+        async def slow_iteration_report(
+            agent: Optional[str] = None,
+            limit: int = Query(5, alias="limit", ge=1, le=50),
+        ):
+            return await asyncio.to_thread(slow_iterations, limit, agent)
+
+        # Prometheus scrape endpoint: actions, LLM calls, RPC, Mongo writes and loop stages
+        @self.app.get("/metrics")
+        async def metrics():
+            return Response(
+                content=MetricsRegistry.instance().render(), media_type=CONTENT_TYPE
+            )
+
 
 def create_app():
     server = ZerePyServer()
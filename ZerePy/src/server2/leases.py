@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import math
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.database.mongo_db import MongoDB
+
+logger = logging.getLogger("server2/leases")
+
+DEFAULT_LEASE_TTL = 30
+
+NODES = "nodes"
+LEASES = "agent_leases"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class LeaseManager:
+    """Distributes running agents across server2 nodes through Mongo leases.
+
+    Each node heartbeats a document in `nodes` and owns an agent while it
+    holds an unexpired lease for it in `agent_leases`. Leases are renewed
+    every third of the TTL. Agents marked running whose lease has expired
+    are claimed by live nodes up to their fair share, so a dead node's
+    agents fail over within one lease period, and nodes above their share
+    hand agents back when new nodes join.
+    """
+
+    def __init__(
+        self,
+        mongo_db: MongoDB,
+        on_acquire: Callable[[str], Awaitable[None]],
+        on_release: Callable[[str], Awaitable[None]],
+        node_id: Optional[str] = None,
+        node_url: Optional[str] = None,
+        lease_ttl: Optional[float] = None,
+    ):
+        self.mongo_db = mongo_db
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+
+        self.node_id = (
+            node_id
+            or os.getenv("ZEREPY_NODE_ID")
+            or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.node_url = (node_url or os.getenv("ZEREPY_NODE_URL", "")).rstrip("/")
+        self.lease_ttl = lease_ttl or float(
+            os.getenv("ZEREPY_LEASE_TTL", DEFAULT_LEASE_TTL)
+        )
+
+        self.owned: Set[str] = set()
+        # Owned agents that were not marked running at the last rebalance
+        self._not_running: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def _leases(self):
+        return self.mongo_db.db[LEASES]
+
+    @property
+    def _nodes(self):
+        return self.mongo_db.db[NODES]
+
+    def _expiry(self) -> datetime:
+        return _now() + timedelta(seconds=self.lease_ttl)
+
+    def owns(self, strategy_address: str) -> bool:
+        return strategy_address in self.owned
+
+    async def claim(self, strategy_address: str) -> bool:
+        """Take the lease on an agent if it is free, expired or already ours"""
+        try:
+            lease = await self._leases.find_one_and_update(
+                {
+                    "_id": strategy_address,
+                    "$or": [{"owner": self.node_id}, {"expires_at": {"$lt": _now()}}],
+                },
+                {
+                    "$set": {
+                        "owner": self.node_id,
+                        "owner_url": self.node_url,
+                        "expires_at": self._expiry(),
+                    }
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Another node holds a live lease
+            return False
+
+        if lease and lease["owner"] == self.node_id:
+            self.owned.add(strategy_address)
+            return True
+        return False
+
+    async def release(self, strategy_address: str) -> None:
+        """Give up the lease on an agent so another node can claim it"""
+        self.owned.discard(strategy_address)
+        await self._leases.delete_one({"_id": strategy_address, "owner": self.node_id})
+
+    async def owner_of(self, strategy_address: str) -> Optional[Tuple[str, str]]:
+        """(node_id, node_url) of the node holding a live lease on an agent"""
+        lease = await self._leases.find_one(
+            {"_id": strategy_address, "expires_at": {"$gte": _now()}}
+        )
+        if lease:
+            return lease["owner"], lease.get("owner_url", "")
+        return None
+
+    async def _heartbeat(self) -> int:
+        """Refresh this node's liveness and return how many nodes are alive"""
+        now = _now()
+        await self._nodes.update_one(
+            {"_id": self.node_id},
+            {"$set": {"url": self.node_url, "heartbeat_at": now}},
+            upsert=True,
+        )
+        return await self._nodes.count_documents(
+            {"heartbeat_at": {"$gte": now - timedelta(seconds=self.lease_ttl)}}
+        )
+
+    async def _renew(self) -> None:
+        for strategy_address in list(self.owned):
+            result = await self._leases.update_one(
+                {"_id": strategy_address, "owner": self.node_id},
+                {"$set": {"expires_at": self._expiry()}},
+            )
+            if result.matched_count == 0:
+                # The lease expired and was taken over, stop our copy
+                logger.warning(f"Lost lease on {strategy_address}")
+                self.owned.discard(strategy_address)
+                await self.on_release(strategy_address)
+
+    async def _rebalance(self, alive_nodes: int) -> None:
+        running = [
+            agent["strategy_address"]
+            async for agent in self.mongo_db.db["agents"].find(
+                {"state": "running"}, {"strategy_address": 1}
+            )
+        ]
+        fair_share = math.ceil(len(running) / max(alive_nodes, 1))
+
+        # Agents stopped elsewhere are not ours to keep. Wait for a second tick,
+        # an agent being started is claimed before it is marked running
+        not_running = self.owned - set(running)
+        for strategy_address in not_running & self._not_running:
+            logger.info(f"{strategy_address} is no longer running, releasing it")
+            await self.on_release(strategy_address)
+            await self.release(strategy_address)
+        self._not_running = not_running & self.owned
+
+        # Hand back one agent per tick when above our share, to avoid thrashing
+        if len(self.owned) > fair_share:
+            strategy_address = next(iter(self.owned))
+            logger.info(f"Rebalancing, releasing {strategy_address}")
+            await self.on_release(strategy_address)
+            await self.release(strategy_address)
+            return
+
+        for strategy_address in running:
+            if len(self.owned) >= fair_share:
+                break
+            if strategy_address in self.owned:
+                continue
+            if await self.claim(strategy_address):
+                logger.info(f"Claimed orphaned agent {strategy_address}")
+                try:
+                    await self.on_acquire(strategy_address)
+                except Exception as e:
+                    logger.error(f"Could not start claimed agent {strategy_address}: {e}")
+                    await self.release(strategy_address)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                alive_nodes = await self._heartbeat()
+                await self._renew()
+                await self._rebalance(alive_nodes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Lease maintenance failed: {e}")
+            await asyncio.sleep(self.lease_ttl / 3)
+
+    async def start(self) -> None:
+        await self._leases.create_index("owner")
+        await self._leases.create_index("expires_at")
+        self._task = asyncio.create_task(self._run(), name="lease-manager")
+        logger.info(f"Node {self.node_id} joined at {self.node_url}")
+
+    async def stop(self) -> None:
+        """Leave the cluster, releasing every lease so other nodes take over at once"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+        for strategy_address in list(self.owned):
+            await self.release(strategy_address)
+        await self._nodes.delete_one({"_id": self.node_id})
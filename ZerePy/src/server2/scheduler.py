@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from src.helpers import workers
+
+logger = logging.getLogger("server2/scheduler")
+
+
+class AgentScheduler:
+    """Drives every running agent as a coroutine on the server's event loop
+
+    Blocking connector calls made by the agents are offloaded to one shared,
+    bounded worker pool instead of a dedicated thread per agent, so memory
+    stays flat as the number of hosted strategies grows.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_iterations: Optional[int] = None,
+        start_jitter: Optional[float] = None,
+    ):
+        self.max_concurrent_iterations = max_concurrent_iterations or int(
+            os.getenv("ZEREPY_MAX_CONCURRENT_ITERATIONS", 32)
+        )
+        self.start_jitter = (
+            start_jitter
+            if start_jitter is not None
+            else float(os.getenv("ZEREPY_START_JITTER", 10))
+        )
+
+        # strategy_address -> running loop task / stop event
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stop_events: Dict[str, asyncio.Event] = {}
+
+        # Created lazily so they bind to the running event loop
+        self._limiter: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _ensure_loop_resources(self):
+        if self._limiter is None:
+            self._limiter = asyncio.Semaphore(self.max_concurrent_iterations)
+
+        if self._executor is None:
+            # Agent loops offload to their own pool, sized to the iteration
+            # limit so every admitted iteration gets a worker. The loop's
+            # default executor stays free for request handlers.
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent_iterations,
+                thread_name_prefix="zerepy-agent",
+            )
+
+    def is_running(self, strategy_address: str) -> bool:
+        task = self._tasks.get(strategy_address)
+        return task is not None and not task.done()
+
+    def start(self, strategy_address: str, agent) -> None:
+        """Schedule an agent's loop as a task on the running event loop"""
+        if self.is_running(strategy_address):
+            return
+
+        self._ensure_loop_resources()
+
+        stop_event = asyncio.Event()
+        initial_delay = random.uniform(0, min(self.start_jitter, agent.loop_delay))
+
+        # workers.to_thread calls made by the loop pick the pool from its context
+        context = contextvars.copy_context()
+        context.run(workers.current_executor.set, self._executor)
+        task = asyncio.create_task(
+            agent.run(
+                stop_event=stop_event,
+                limiter=self._limiter,
+                initial_delay=initial_delay,
+            ),
+            name=f"agent:{strategy_address}",
+            context=context,
+        )
+        task.add_done_callback(
+            lambda t, address=strategy_address: self._on_task_done(address, t)
+        )
+
+        self._tasks[strategy_address] = task
+        self._stop_events[strategy_address] = stop_event
+        logger.info(f"Scheduled agent loop for {strategy_address}")
+
+    def _on_task_done(self, strategy_address: str, task: asyncio.Task) -> None:
+        if self._tasks.get(strategy_address) is task:
+            del self._tasks[strategy_address]
+            self._stop_events.pop(strategy_address, None)
+
+        if not task.cancelled() and task.exception():
+            logger.error(
+                f"Agent loop for {strategy_address} crashed: {task.exception()}"
+            )
+
+    async def stop(self, strategy_address: str, timeout: float = 5) -> None:
+        """Signal an agent's loop to stop, cancelling it if it does not exit in time"""
+        task = self._tasks.get(strategy_address)
+        if not task:
+            return
+
+        self._stop_events[strategy_address].set()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+        except Exception:
+            pass
+
+    async def shutdown(self) -> None:
+        """Stop every scheduled agent loop"""
+        await asyncio.gather(
+            *(self.stop(address) for address in list(self._tasks)),
+            return_exceptions=True,
+        )
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __len__(self) -> int:
+        return len(self._tasks)